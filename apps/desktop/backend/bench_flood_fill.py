@@ -0,0 +1,147 @@
+"""
+Benchmark border-trim's flood-fill against the per-pixel deque BFS it replaced.
+
+    python bench_flood_fill.py [images ...] [--edge 1536] [--repeat 3] [--json out.json]
+
+For each image (or a generated product-on-white page when none are given,
+downscaled so its longest side is --edge px, border-trim's cap) the
+background candidates are filled from the perimeter twice: by the old BFS,
+calling a per-pixel is_bg() on every neighbour, and by _flood_fill_mask().
+Reports both timings, the speed-up and whether the masks are identical.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+os.environ.setdefault("UFM_REMBG_MODEL", "border-trim")
+os.environ.setdefault("UFM_CUTOUT_CACHE_MB", "0")
+os.environ.setdefault("UFM_OCR_CACHE_MB", "0")
+
+
+def bfs_fill(rgb, bg, sobel, tolerance, edge_stop):
+    """The original border-trim loop: seed the perimeter, then BFS with is_bg() per pixel."""
+    import numpy as np
+    pixels = rgb.astype(np.int32)
+    h, w = pixels.shape[:2]
+
+    def _is_bg(y, x):
+        if not np.all(np.abs(pixels[y, x] - bg) <= tolerance):
+            return False
+        return sobel[y, x] < edge_stop
+
+    visited = np.zeros((h, w), dtype=bool)
+    queue = deque()
+    for x in range(w):
+        for y in (0, h - 1):
+            if not visited[y, x] and _is_bg(y, x):
+                visited[y, x] = True
+                queue.append((y, x))
+    for y in range(1, h - 1):
+        for x in (0, w - 1):
+            if not visited[y, x] and _is_bg(y, x):
+                visited[y, x] = True
+                queue.append((y, x))
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < h and 0 <= nx < w and not visited[ny, nx] and _is_bg(ny, nx):
+                visited[ny, nx] = True
+                queue.append((ny, nx))
+    return visited
+
+
+def vectorized_fill(rgb, bg, sobel, tolerance, edge_stop):
+    """border_trim_background's candidate mask plus _flood_fill_mask()."""
+    import numpy as np
+    from cutout_service.server import _flood_fill_mask
+    h, w = rgb.shape[:2]
+    candidate = np.ones((h, w), dtype=bool)
+    for c in range(3):
+        candidate &= np.abs(rgb[:, :, c] - bg[c]) <= tolerance
+    candidate &= sobel < edge_stop
+    seeds = np.zeros((h, w), dtype=bool)
+    seeds[0, :] = seeds[h - 1, :] = True
+    seeds[:, 0] = seeds[:, w - 1] = True
+    return _flood_fill_mask(candidate, seeds)
+
+
+def generated_page(edge):
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", (edge, edge * 3 // 4), "white")
+    draw = ImageDraw.Draw(img)
+    w, h = img.size
+    draw.ellipse((w // 4, h // 5, w * 3 // 4, h * 4 // 5), fill=(180, 40, 40))
+    draw.rectangle((w // 10, h // 2, w // 4, h - 20), fill=(240, 235, 210))
+    return img
+
+
+def load(path, edge):
+    from PIL import Image
+    img = Image.open(path).convert("RGB")
+    scale = edge / max(img.size)
+    if scale < 1:
+        img = img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+    return img
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="image files (default: a generated page)")
+    parser.add_argument("--edge", type=int, default=1536, help="longest side in px (border-trim's cap)")
+    parser.add_argument("--tolerance", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine; the median is reported")
+    parser.add_argument("--json", help="also write the summary here")
+    args = parser.parse_args()
+
+    import numpy as np
+    from cutout_service.server import ImageAnalysis
+
+    inputs = [(p, load(p, args.edge)) for p in args.images] or [("generated", generated_page(args.edge))]
+    rows = []
+    for name, img in inputs:
+        analysis = ImageAnalysis(img)
+        edge_stop = 8.0 if analysis.bg_is_near_white else 15.0
+        # Shared inputs (Sobel included) are computed here, outside both timings.
+        fill_args = (analysis.rgb, analysis.bg_color, analysis.sobel_magnitude, args.tolerance, edge_stop)
+        bfs_ms, bfs_mask = timed(lambda: bfs_fill(*fill_args), 1)  # seconds per run at full size
+        vec_ms, vec_mask = timed(lambda: vectorized_fill(*fill_args), args.repeat)
+        row = {
+            "image": name,
+            "size": f"{img.width}x{img.height}",
+            "bfs_ms": round(bfs_ms),
+            "vectorized_ms": round(vec_ms, 1),
+            "speedup": round(bfs_ms / max(vec_ms, 1e-6), 1),
+            "identical": bool(np.array_equal(bfs_mask, vec_mask)),
+        }
+        rows.append(row)
+        print(
+            f"  {name} {row['size']}: BFS {row['bfs_ms']} ms, vectorized {row['vectorized_ms']} ms "
+            f"({row['speedup']}x), identical={row['identical']}"
+        )
+
+    if not all(r["identical"] for r in rows):
+        print("❌ Masks differ")
+        sys.exit(1)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"edge": args.edge, "images": rows}, f, indent=2)
+        print(f"✅ Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the OCR mode profiles (ocr/modes.py) for latency and recall.
+
+    python bench_ocr_modes.py /path/to/flyer-screenshots [more dirs or images] \
+        [--modes full,fast,detect] [--max-side N] [--json out.json]
+
+Runs run_ocr() in-process for every image in every mode. "full" is the
+reference: text recall is the share of its words a mode also reads, and box
+recall the share of its text blocks whose centre falls inside one of the
+mode's boxes (the only recall detect-only mode has). Latency excludes the
+first-call model load, which is reported separately.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+
+def collect_images(inputs):
+    images = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    images.append(os.path.join(item, name))
+        elif os.path.isfile(item):
+            images.append(item)
+    return images
+
+
+def words(result):
+    return {w for text in result.get("rec_texts", []) for w in re.findall(r"[a-z0-9$.]+", text.lower())}
+
+
+def boxes(result):
+    if "boxes" in result:
+        return result["boxes"]
+    return [b for b in result.get("text_blocks", []) if "x" in b]
+
+
+def box_recall(reference, found):
+    ref = boxes(reference)
+    if not ref:
+        return None
+    hit = 0
+    for b in ref:
+        cx, cy = b["x"] + b["width"] / 2, b["y"] + b["height"] / 2
+        if any(f["x"] <= cx <= f["x"] + f["width"] and f["y"] <= cy <= f["y"] + f["height"] for f in boxes(found)):
+            hit += 1
+    return hit / len(ref)
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return round(statistics.mean(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="image files or directories of images")
+    parser.add_argument("--modes", default="full,fast,detect")
+    parser.add_argument("--max-side", type=int, default=None, help="override every mode's cap (0 = none)")
+    parser.add_argument("--json", help="also write the summary here")
+    args = parser.parse_args()
+
+    from ocr.modes import OCR_MODES
+    from ocr.ocr_engine import _get_ocr, cpu_threads, run_ocr
+
+    images = collect_images(args.inputs)
+    if not images:
+        print("❌ No images found")
+        sys.exit(1)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in OCR_MODES]
+    if unknown:
+        print(f"❌ Unknown mode(s): {', '.join(unknown)} (expected {', '.join(OCR_MODES)})")
+        sys.exit(1)
+    if "full" not in modes:
+        modes.insert(0, "full")  # the recall reference
+
+    threads, source = cpu_threads()
+    print(f"▶ {len(images)} images, modes {', '.join(modes)}, {threads} threads ({source})")
+    results = {}
+    summary = {}
+    for mode in modes:
+        t0 = time.perf_counter()
+        _get_ocr(mode)
+        load_ms = round((time.perf_counter() - t0) * 1000)
+        times = []
+        results[mode] = []
+        for path in images:
+            t0 = time.perf_counter()
+            results[mode].append(run_ocr(path, mode, args.max_side)[0])
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        summary[mode] = {
+            "load_ms": load_ms,
+            "mean_ms": round(statistics.mean(times)),
+            "p50_ms": round(times[len(times) // 2]),
+            "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))]),
+        }
+        print(f"  {mode}: model load {load_ms} ms, {summary[mode]['mean_ms']} ms/image")
+
+    for mode in modes:
+        text_recall, blocks_recall = [], []
+        for reference, found in zip(results["full"], results[mode]):
+            ref_words = words(reference)
+            if ref_words and not OCR_MODES[mode]["detect_only"]:
+                text_recall.append(len(ref_words & words(found)) / len(ref_words))
+            blocks_recall.append(box_recall(reference, found))
+        summary[mode]["text_recall"] = mean(text_recall)
+        summary[mode]["box_recall"] = mean(blocks_recall)
+
+    print("\nmode      load_ms  mean_ms  p50_ms  p95_ms  text_recall  box_recall")
+    for mode, row in summary.items():
+        print(
+            f"{mode:<9} {row['load_ms']:>7}  {row['mean_ms']:>7}  {row['p50_ms']:>6}  {row['p95_ms']:>6}  "
+            f"{str(row['text_recall']):>11}  {str(row['box_recall']):>10}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"images": len(images), "max_side": args.max_side, "modes": summary}, f, indent=2)
+        print(f"\n✅ Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,7 +39,12 @@ a = Analysis(
         "cutout_service",
         "cutout_service.server",
         "ocr",
+        "ocr.layout",
+        "ocr.modes",
         "ocr.ocr_engine",
+        "ocr.threads",
+        "ocr.tiling",
+        "ocr.worker",
         # uvicorn internals that are loaded dynamically
         "uvicorn.logging",
         "uvicorn.loops",
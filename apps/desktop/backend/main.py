@@ -8,9 +8,16 @@ Build with:
 The resulting binary accepts --host and --port arguments.
 """
 import argparse
+import multiprocessing
 import sys
 import uvicorn
 
+# The CPU pool (UFM_CPU_POOL_WORKERS) spawns workers that re-run this entry
+# point in frozen builds; let them take over before the server module (and its
+# model preload) is imported.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
 # Eager import so PyInstaller bundles src/cutout_service (uvicorn also loads it by string).
 import cutout_service.server  # noqa: F401
 
@@ -2,11 +2,12 @@
 # FULL FILE — FIXES NameError: io is not defined
 # ALL EXISTING BEHAVIOR PRESERVED
 
-from fastapi import FastAPI, UploadFile, File, Request, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Request, Form, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import os, sys, subprocess, json, asyncio, tempfile, io, gc
+import os, sys, subprocess, json, asyncio, tempfile, io, gc, contextlib, contextvars
 from urllib.parse import unquote, urlparse
+from functools import cached_property, lru_cache
 
 try:
     import psutil as _psutil
@@ -41,14 +42,33 @@ REMBG_MODEL = os.environ.get("UFM_REMBG_MODEL", "border-trim")
 BRIA_ALIASES = ("briaai-rmbg", "bria", "briaai-rmbg-1.4")
 USE_BRIA = REMBG_MODEL in BRIA_ALIASES
 _BLOB_REMOVAL = os.environ.get("UFM_BLOB_REMOVAL", "1") != "0"
+# Opt-in: on white-background images run border-trim and contour-bg at the same
+# time instead of contour-bg only after border-trim fails its quality check.
+_SPECULATIVE_CLASSICAL = os.environ.get("UFM_SPECULATIVE_CLASSICAL", "0") == "1"
+# Default encoding for cutout results when a request doesn't pick one (see
+# _CUTOUT_OUTPUT_FORMATS). "png" keeps PIL's default zlib level 6.
+_CUTOUT_OUTPUT_FORMAT = os.environ.get("UFM_CUTOUT_OUTPUT_FORMAT", "png").strip().lower() or "png"
+# How the default birefnet session gives its ORT workspace back (see _apply_mem_policy):
+#   always  — tear down + reload after every request (previous behaviour)
+#   every-n — after every UFM_BIREFNET_RELOAD_EVERY requests
+#   rss     — only when RSS exceeds UFM_BIREFNET_RSS_BUDGET_MB
+#   idle    — once no request has arrived for UFM_BIREFNET_IDLE_RELOAD_S seconds
+#   arena   — never reload; keep ORT's CPU arena and shrink it after each run
+_BIREFNET_MEM_POLICY = os.environ.get("UFM_BIREFNET_MEM_POLICY", "always").strip().lower()
+if _BIREFNET_MEM_POLICY not in ("always", "every-n", "rss", "idle", "arena"):
+    print(f"[mem] unknown UFM_BIREFNET_MEM_POLICY={_BIREFNET_MEM_POLICY!r} — using 'always'", flush=True)
+    _BIREFNET_MEM_POLICY = "always"
+_BIREFNET_RELOAD_EVERY = max(1, int(os.environ.get("UFM_BIREFNET_RELOAD_EVERY", "5")))
+_BIREFNET_RSS_BUDGET_MB = float(os.environ.get("UFM_BIREFNET_RSS_BUDGET_MB", "4000"))
+_BIREFNET_IDLE_RELOAD_S = float(os.environ.get("UFM_BIREFNET_IDLE_RELOAD_S", "60"))
 
 # Must be set before onnxruntime is imported (rembg pulls it in).
 # ORT_NUM_THREADS is ONNX Runtime's own thread pool — Windows ignores OMP_NUM_THREADS.
 os.environ.setdefault("ORT_NUM_THREADS", os.environ.get("OMP_NUM_THREADS", "2"))
 
 from PIL import Image, ExifTags
-from rembg import remove, new_session
 import threading
+import multiprocessing
 
 # ── ORT profiling (UFM_ORT_PROFILE=1) ────────────────────────────────────────
 # Profiles the first inference and prints a per-op breakdown to stdout.
@@ -99,7 +119,14 @@ def _is_bria_model(model_name: str) -> bool:
     return model_name in BRIA_ALIASES
 
 
-def _make_ort_session_options():
+def _is_policy_managed(model_name: str) -> bool:
+    # Transformer-based models (birefnet) hold ~6 GB of ORT workspace buffers
+    # that gc.collect() cannot free — only destroying the InferenceSession
+    # (or shrinking its arena) releases them.
+    return model_name == REMBG_MODEL and REMBG_MODEL.startswith("birefnet")
+
+
+def _make_ort_session_options(cpu_mem_arena: bool = False):
     import onnxruntime as ort
     _ort_threads = int(os.environ.get("ORT_NUM_THREADS", "2"))
     _opts = ort.SessionOptions()
@@ -107,7 +134,9 @@ def _make_ort_session_options():
     _opts.inter_op_num_threads = 1
     # Disable BFC memory arena: ORT returns native allocs to OS after each
     # inference rather than pooling them. Costs ~10-20% speed.
-    _opts.enable_cpu_mem_arena = False
+    # The "arena" birefnet memory policy keeps the arena and shrinks it after
+    # every run instead (see _ort_run_options).
+    _opts.enable_cpu_mem_arena = cpu_mem_arena
     # Disable memory pattern optimisation: prevents ORT from pre-allocating
     # a single large contiguous workspace for the whole execution graph.
     # Critical for transformer models (birefnet): the pattern buffer for
@@ -121,15 +150,181 @@ def _make_ort_session_options():
 
 
 def _new_rembg_session(model_name: str):
+    # rembg (and onnxruntime behind it) is imported on first use so CPU-pool
+    # workers, which import this module too, never pay for it.
+    from rembg import new_session
+    arena = _BIREFNET_MEM_POLICY == "arena" and _is_policy_managed(model_name)
     try:
-        return new_session(model_name, sess_options=_make_ort_session_options())
+        return new_session(model_name, sess_options=_make_ort_session_options(cpu_mem_arena=arena))
     except TypeError:
         # older rembg doesn't accept sess_options — fall back gracefully
         return new_session(model_name)
 
 
-# Load the model in a background thread so uvicorn can start and pass the
-# health check immediately (important during the first-time ~1 GB download).
+# ── Direct ORT mask inference (UFM_ORT_DIRECT=0 falls back to rembg.remove) ─
+# rembg's predict() wraps every call in PIL conversions, float64 normalisation and
+# a composite of the mask back onto the input. For the single-mask models below
+# we run the session's InferenceSession ourselves with preallocated, IO-bound
+# buffers and hand the raw uint8 mask straight to post-processing.
+_ORT_DIRECT = os.environ.get("UFM_ORT_DIRECT", "1") != "0"
+_IMAGENET_MEAN = (0.485, 0.456, 0.406)
+_IMAGENET_STD = (0.229, 0.224, 0.225)
+# model name -> (mean, std, default input edge, sigmoid on logits) — mirrors each rembg session's predict()
+_ORT_DIRECT_MODELS = {
+    "u2net": (_IMAGENET_MEAN, _IMAGENET_STD, 320, False),
+    "u2netp": (_IMAGENET_MEAN, _IMAGENET_STD, 320, False),
+    "u2net_human_seg": (_IMAGENET_MEAN, _IMAGENET_STD, 320, False),
+    "silueta": (_IMAGENET_MEAN, _IMAGENET_STD, 320, False),
+    "isnet-general-use": ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), 1024, False),
+    "isnet-anime": (_IMAGENET_MEAN, (1.0, 1.0, 1.0), 1024, False),
+    "birefnet-general": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-general-lite": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-portrait": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-dis": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-hrsod": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-cod": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+    "birefnet-massive": (_IMAGENET_MEAN, _IMAGENET_STD, 1024, True),
+}
+
+
+class _OrtMaskEngine:
+    """
+    ndarray in, uint8 mask out, on a rembg session's InferenceSession.
+
+    The NCHW float32 input and (when the model's output shape is static) the
+    output tensor are allocated once and bound through IO binding, so repeated
+    calls reuse the same buffers instead of allocating per request. Models
+    exported with a dynamic batch axis also get one bound (n, 3, h, w) buffer
+    per batch size seen, for predict_masks().
+    """
+
+    def __init__(self, session, model_name: str):
+        mean, std, edge, self.sigmoid = _ORT_DIRECT_MODELS[model_name]
+        self.model_name = model_name
+        self._sess = session.inner_session
+        inp = self._sess.get_inputs()[0]
+        h, w = (d if isinstance(d, int) and d > 0 else edge for d in inp.shape[2:4])
+        self.size = (w, h)
+        self._mean, self._std = mean, std
+        self._input_name = inp.name
+        self._out = self._sess.get_outputs()[0]
+        # Anything but a fixed positive batch dimension ("batch_size", None, -1) is dynamic.
+        self.batchable = not (isinstance(inp.shape[0], int) and inp.shape[0] > 0)
+        self._batches = {}  # n -> (input buffer, io binding, output buffer or None)
+        self._input, self._binding, self._output = self._bound_buffers(1)
+
+    def _bound_buffers(self, n: int):
+        import numpy as np
+        import onnxruntime as ort
+        if n in self._batches:
+            return self._batches[n]
+        w, h = self.size
+        buf = np.empty((n, 3, h, w), dtype=np.float32)
+        binding = self._sess.io_binding()
+        binding.bind_ortvalue_input(self._input_name, ort.OrtValue.ortvalue_from_numpy(buf))
+        out_shape = list(self._out.shape)
+        if out_shape and not (isinstance(out_shape[0], int) and out_shape[0] > 0):
+            out_shape[0] = n
+        if all(isinstance(d, int) and d > 0 for d in out_shape):
+            output = np.empty(out_shape, dtype=np.float32)
+            binding.bind_ortvalue_output(self._out.name, ort.OrtValue.ortvalue_from_numpy(output))
+        else:
+            output = None
+            binding.bind_output(self._out.name)
+        self._batches[n] = (buf, binding, output)
+        return self._batches[n]
+
+    def _fill(self, rgb, dst):
+        import numpy as np
+        small = np.asarray(Image.fromarray(rgb, "RGB").resize(self.size, Image.Resampling.LANCZOS))
+        # rembg scales by the image's own peak value before mean/std normalisation.
+        # One channel at a time in float64 (rembg's precision, so masks match it
+        # exactly) written straight into the bound float32 input.
+        peak = max(int(small.max()), 1e-6)
+        for c in range(3):
+            np.divide(
+                small[:, :, c] / peak - self._mean[c], self._std[c],
+                out=dst[c], casting="unsafe",
+            )
+
+    def _to_mask(self, pred, src_size):
+        import numpy as np
+        if self.sigmoid:
+            pred = 1 / (1 + np.exp(-pred))
+        mi, ma = pred.min(), pred.max()
+        pred = (pred - mi) / (ma - mi)
+        mask = (pred.clip(0, 1) * 255).astype(np.uint8)
+        return np.asarray(Image.fromarray(mask, "L").resize(src_size, Image.Resampling.LANCZOS))
+
+    def predict_mask(self, rgb, run_options=None):
+        """Return the model's uint8 alpha mask for a uint8 RGB array, at the array's size."""
+        src_h, src_w = rgb.shape[:2]
+        self._fill(rgb, self._input[0])
+        self._sess.run_with_iobinding(self._binding, run_options)
+        pred = self._output if self._output is not None else self._binding.copy_outputs_to_cpu()[0]
+        return self._to_mask(pred[0, 0], (src_w, src_h))
+
+    def predict_masks(self, rgbs, run_options=None):
+        """predict_mask() for each array, stacked into one ORT run when the batch axis is dynamic."""
+        if len(rgbs) == 1 or not self.batchable:
+            return [self.predict_mask(rgb, run_options) for rgb in rgbs]
+        buf, binding, output = self._bound_buffers(len(rgbs))
+        for i, rgb in enumerate(rgbs):
+            self._fill(rgb, buf[i])
+        self._sess.run_with_iobinding(binding, run_options)
+        preds = output if output is not None else binding.copy_outputs_to_cpu()[0]
+        return [self._to_mask(preds[i, 0], (rgb.shape[1], rgb.shape[0])) for i, rgb in enumerate(rgbs)]
+
+
+def _mask_engine(session, model_name: str):
+    """The session's cached _OrtMaskEngine, or None when the direct path doesn't apply."""
+    if not (_ORT_DIRECT and model_name in _ORT_DIRECT_MODELS and hasattr(session, "inner_session")):
+        return None
+    engine = getattr(session, "_ufm_mask_engine", None)
+    if engine is None:
+        engine = _OrtMaskEngine(session, model_name)
+        session._ufm_mask_engine = engine
+    return engine
+
+
+def _rembg_mask(rgb, session, model_name: str, run_options=None):
+    """uint8 alpha mask for `rgb` from a rembg session — direct ORT when supported.
+
+    `run_options` (ORT RunOptions) only applies on the direct path.
+    """
+    import numpy as np
+    engine = _mask_engine(session, model_name)
+    if engine is not None:
+        return engine.predict_mask(rgb, run_options)
+    from rembg import remove
+    return np.asarray(remove(rgb, session=session, only_mask=True))
+
+
+def _rembg_masks(rgbs, session, model_name: str, run_options=None):
+    """_rembg_mask() for a list of arrays — one batched ORT run when the model allows it."""
+    import numpy as np
+    engine = _mask_engine(session, model_name)
+    if engine is not None:
+        return engine.predict_masks(rgbs, run_options)
+    from rembg import remove
+    return [np.asarray(remove(rgb, session=session, only_mask=True)) for rgb in rgbs]
+
+
+def _naive_cutout_array(rgb, mask):
+    """
+    RGBA array equal to rembg's naive_cutout (PIL composite over transparent black).
+
+    Uses PIL's integer blend: out = ((t >> 8) + t) >> 8 with t = value * mask + 128.
+    """
+    import numpy as np
+    m = mask.astype(np.uint16)[..., None]
+    t = rgb.astype(np.uint16) * m + 128
+    out = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+    out[..., :3] = ((t >> 8) + t) >> 8
+    out[..., 3] = mask
+    return out
+
+
 _rembg_session = None
 _bria_model = None
 _model_ready = threading.Event()
@@ -203,18 +398,16 @@ def _load_model():
     finally:
         _model_ready.set()
 
-threading.Thread(target=_load_model, daemon=True).start()
-
 
-def _run_bria_inference(img_bytes: bytes) -> bytes:
-    """Run BRIA RMBG-1.4 inference on PNG bytes; return RGBA PNG bytes."""
+def _run_bria_inference(rgb):
+    """Run BRIA RMBG-1.4 inference on a uint8 RGB array; return the uint8 alpha mask."""
     import torch
     import torch.nn.functional as _F
     import numpy as np
     # F.sigmoid was removed in PyTorch 2.0; BRIA's custom forward() still calls it.
     if not hasattr(_F, "sigmoid"):
         _F.sigmoid = torch.sigmoid
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    img = Image.fromarray(rgb, "RGB")
     orig_size = img.size  # (w, h)
     img_1024 = img.resize((1024, 1024), Image.BILINEAR)
     arr = np.array(img_1024).astype(np.float32) / 255.0
@@ -233,21 +426,118 @@ def _run_bria_inference(img_bytes: bytes) -> bytes:
         pred = (pred - mi) / (ma - mi)
     # Preserve BRIA's soft alpha matte. Hard-thresholding turns pale backgrounds
     # into opaque white blobs and makes transparent packaging look jagged.
-    mask_arr = (pred.detach().numpy() * 255).astype(np.uint8)
-    out = img.convert("RGBA")
-    out.putalpha(Image.fromarray(mask_arr))
-    buf = io.BytesIO()
-    out.save(buf, format="PNG")
-    return buf.getvalue()
+    return (pred.detach().numpy() * 255).astype(np.uint8)
+
+
+# ── Override-model session cache ─────────────────────────────────────────────
+# Per-request `model` overrides (the JS fallback chain) used to build, run and
+# destroy a fresh InferenceSession every time. Sessions are now kept in an LRU
+# keyed by model + session options, bounded by entry count and by the summed
+# RSS each session added on its first run (load + workspace).
+_SESSION_CACHE_SIZE = max(0, int(os.environ.get("UFM_SESSION_CACHE_SIZE", "2")))
+_SESSION_CACHE_BUDGET_MB = float(os.environ.get("UFM_SESSION_CACHE_BUDGET_MB", "1500"))
+
+
+class _SessionCache:
+    def __init__(self, max_entries: int, budget_mb: float):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self.budget_mb = budget_mb
+        self._entries = OrderedDict()  # key -> (session, footprint_mb)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, session, footprint_mb: float) -> bool:
+        """Cache `session`, evicting LRU entries to fit. Returns False if it can never fit."""
+        with self._lock:
+            if self.max_entries == 0 or footprint_mb > self.budget_mb:
+                self.rejected += 1
+                return False
+            self._entries[key] = (session, footprint_mb)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries or self._total_mb() > self.budget_mb:
+                old_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                print(f"[session-cache] evicted {old_key[0]}", flush=True)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _total_mb(self) -> float:
+        return sum(mb for _, mb in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": [{"model": key[0], "footprint_mb": round(mb, 1)} for key, (_, mb) in self._entries.items()],
+                "max_entries": self.max_entries,
+                "budget_mb": self.budget_mb,
+                "used_mb": round(self._total_mb(), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+            }
+
+
+_session_cache = _SessionCache(_SESSION_CACHE_SIZE, _SESSION_CACHE_BUDGET_MB)
+
+
+def _session_cache_key(model_name: str) -> tuple:
+    # Everything _make_ort_session_options() varies on.
+    return (
+        model_name,
+        int(os.environ.get("ORT_NUM_THREADS", "2")),
+        _BIREFNET_MEM_POLICY == "arena" and _is_policy_managed(model_name),
+        _ORT_PROFILE,
+    )
 
 
-def _run_rembg_with_new_session(img_bytes: bytes, model_name: str) -> bytes:
+@contextlib.contextmanager
+def _override_session(model_name: str):
+    """Session for an override model: a cached one, or a new one offered to the cache on exit."""
+    key = _session_cache_key(model_name)
+    session = _session_cache.get(key)
+    if session is not None:
+        yield session
+        return
+
+    before_mb = _rss_mb()
     session = _new_rembg_session(model_name)
+    cached = False
     try:
-        return remove(img_bytes, session=session)
+        yield session
+        footprint_mb = max(0.0, _rss_mb() - before_mb)
+        cached = _session_cache.put(key, session, footprint_mb)
+        if cached:
+            print(f"[session-cache] cached {model_name} (~{footprint_mb:.0f} MB)", flush=True)
     finally:
         del session
-        gc.collect()
+        if not cached:
+            gc.collect()
+
+
+def _run_rembg_with_new_session(rgbs, model_name: str):
+    """Masks for each of `rgbs` from an override model, reusing a cached session when one is available."""
+    with _override_session(model_name) as session:
+        return _rembg_masks(rgbs, session, model_name)
 
 
 def _prefer_base_cutout_source(cutout_path: str) -> str | None:
@@ -305,32 +595,418 @@ def _teardown_and_reload_session():
 
     For transformer-based models (birefnet), ORT's workspace/scratch buffers are NOT
     freed by gc.collect() — only the C++ InferenceSession destructor releases them.
-    Setting _rembg_session = None triggers that destructor (once GC runs), returning
+    Dropping the session triggers that destructor (once GC runs), returning
     several GB of native memory to the OS between inferences.
 
-    Called from inside _cutout_lock so there is never a concurrent inference.
-    The _model_ready event is cleared before reload starts and set again when done,
+    Called from inside _model_gate so there is never a concurrent inference.
+    The reload goes through _primary_model, so it gets the same warm-up
+    inference and load accounting (/health) as any other load. The
+    _model_ready event is cleared before reload starts and set again when done,
     so the next request waits safely if it arrives during the short reload window.
     """
-    global _rembg_session
-    before_mb = _rss_mb()
-    _model_ready.clear()
-    _rembg_session = None
-    gc.collect()
-    after_teardown_mb = _rss_mb()
-    print(
-        f"[mem] birefnet session teardown: {before_mb:.0f} -> {after_teardown_mb:.0f} MB "
-        f"(freed {before_mb - after_teardown_mb:.0f} MB)",
-        flush=True,
-    )
-    # Reload synchronously in this thread; _model_ready is cleared so any concurrent
-    # health checks will report not-ready until the new session is live.
-    _load_model()
+    import time as _time
+    with _primary_model.lock:  # keep the idle sweeper out while the session is swapped
+        t0 = _time.perf_counter()
+        before_mb = _rss_mb()
+        _model_ready.clear()
+        _primary_model.unload()
+        after_teardown_mb = _rss_mb()
+        print(
+            f"[mem] birefnet session teardown: {before_mb:.0f} -> {after_teardown_mb:.0f} MB "
+            f"(freed {before_mb - after_teardown_mb:.0f} MB)",
+            flush=True,
+        )
+        # Reload synchronously in this thread; _model_ready is cleared so any concurrent
+        # health checks will report not-ready until the new session is live.
+        try:
+            _primary_model.ensure_loaded()
+        except Exception:
+            # ensure_loaded() left the model cold with its error; the next
+            # request retries the load instead of finding no session.
+            print(f"[mem] {REMBG_MODEL} reload failed — model left cold", flush=True)
+        finally:
+            _model_ready.set()
+    return {
+        "freed_mb": round(before_mb - after_teardown_mb, 1),
+        "reload_ms": round((_time.perf_counter() - t0) * 1000),
+        "rss_after_mb": round(_rss_mb(), 1),
+    }
+
+
+# ── Birefnet memory policy (UFM_BIREFNET_MEM_POLICY) ─────────────────────────
+_mem_policy_state = {
+    "policy": _BIREFNET_MEM_POLICY,
+    "requests_since_reload": 0,
+    "requests_total": 0,
+    "reloads": 0,
+    "reload_ms_total": 0,
+    "last_reload": None,
+    "last_request_at": None,
+    "max_rss_after_request_mb": 0.0,
+}
+_ort_run_options_cache = {}
+
+
+def _ort_run_options(model_name: str):
+    """RunOptions for the default session: arena shrinkage under the "arena" policy, else None."""
+    if _BIREFNET_MEM_POLICY != "arena" or not _is_policy_managed(model_name):
+        return None
+    if "arena" not in _ort_run_options_cache:
+        import onnxruntime as ort
+        run_options = ort.RunOptions()
+        run_options.add_run_config_entry("memory.enable_memory_arena_shrinkage", "cpu:0")
+        _ort_run_options_cache["arena"] = run_options
+    return _ort_run_options_cache["arena"]
+
+
+def _mem_policy_reload_reason(rss_mb: float) -> str | None:
+    state = _mem_policy_state
+    if _BIREFNET_MEM_POLICY == "always":
+        return "always"
+    if _BIREFNET_MEM_POLICY == "every-n" and state["requests_since_reload"] >= _BIREFNET_RELOAD_EVERY:
+        return f"every {_BIREFNET_RELOAD_EVERY} requests"
+    if _BIREFNET_MEM_POLICY == "rss" and rss_mb > _BIREFNET_RSS_BUDGET_MB:
+        return f"rss {rss_mb:.0f} MB > {_BIREFNET_RSS_BUDGET_MB:.0f} MB budget"
+    return None
+
+
+async def _reload_for_policy(reason: str):
+    """Tear down + reload the default session under _model_gate and record the result."""
+    # Background priority: queued requests run first, and the reload is not tied
+    # to the (already answered) request that scheduled it.
+    _current_job.set(_Job("policy-reload", "background"))
+    async with _model_gate.slot():
+        state = _mem_policy_state
+        if state["requests_since_reload"] == 0:
+            return  # nothing ran on this session since the last reload
+        if _primary_model is not None and _primary_model.state != "warm":
+            state["requests_since_reload"] = 0
+            return  # already unloaded by the idle sweeper
+        print(f"[mem] policy={_BIREFNET_MEM_POLICY}: reloading session ({reason})", flush=True)
+        stats = await asyncio.to_thread(_teardown_and_reload_session)
+        state["requests_since_reload"] = 0
+        state["reloads"] += 1
+        state["reload_ms_total"] += stats["reload_ms"]
+        state["last_reload"] = {"reason": reason, **stats}
+
+
+async def _idle_reload_check(request_seq: int):
+    # Only the check scheduled by the most recent request may fire.
+    if _mem_policy_state["requests_total"] == request_seq:
+        await _reload_for_policy(f"idle {_BIREFNET_IDLE_RELOAD_S:g}s")
+
+
+async def _apply_mem_policy(model_names):
+    """
+    After-response hook (BackgroundTasks) for requests that ran the default model.
+
+    Reloads run after the response has been sent, never on the request's own
+    critical path; a request that was already queued on _model_gate simply
+    runs first on the warm session.
+    """
+    import time as _time
+    if not any(_is_policy_managed(m) for m in model_names):
+        return
+    state = _mem_policy_state
+    rss_mb = _rss_mb()
+    state["requests_since_reload"] += 1
+    state["requests_total"] += 1
+    state["last_request_at"] = _time.time()
+    state["max_rss_after_request_mb"] = round(max(state["max_rss_after_request_mb"], rss_mb), 1)
+    if _BIREFNET_MEM_POLICY == "idle":
+        asyncio.get_running_loop().call_later(
+            _BIREFNET_IDLE_RELOAD_S,
+            lambda seq=state["requests_total"]: asyncio.ensure_future(_idle_reload_check(seq)),
+        )
+        return
+    reason = _mem_policy_reload_reason(rss_mb)
+    if reason:
+        await _reload_for_policy(reason)
+
+
+# ── CPU process pool (UFM_CPU_POOL_WORKERS) ──────────────────────────────────
+# border-trim, contour-bg, white-bg substitution and blob removal can run in a
+# spawn-context multiprocessing.Pool instead of on threads, so they stop
+# competing for this process's GIL with the event loop (/health), the RSS
+# sampler and ORT's Python side. Pixels go through multiprocessing.shared_memory
+# blocks the caller allocates for both input and output; only block names,
+# shapes and small arguments are pickled. 0 = threads in-process (default).
+_CPU_POOL_WORKERS = max(0, int(os.environ.get("UFM_CPU_POOL_WORKERS", "0")))
+# Pool workers import this module to find the stage functions; this flag keeps
+# them from starting model loads and the idle sweeper.
+_IN_CPU_POOL_WORKER = "PoolWorker" in multiprocessing.current_process().name
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+_cpu_pool_stats = {"tasks": 0, "errors": 0, "ms_total": 0}
+_cpu_pool_stats_lock = threading.Lock()  # stages call in from several threads
+
+
+def _cpu_pool_stats_snapshot() -> dict:
+    with _cpu_pool_stats_lock:
+        return dict(_cpu_pool_stats)
+
+
+def _cpu_pool_worker_init():
+    # One OpenCV thread per worker: the pool itself is the parallelism.
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            import time as _time
+            t0 = _time.perf_counter()
+            _cpu_pool = multiprocessing.get_context("spawn").Pool(
+                _CPU_POOL_WORKERS, initializer=_cpu_pool_worker_init
+            )
+            print(
+                f"[cpu-pool] started {_CPU_POOL_WORKERS} worker processes "
+                f"({(_time.perf_counter() - t0) * 1000:.0f} ms)",
+                flush=True,
+            )
+        return _cpu_pool
+
+
+def _cpu_pool_task(stage: str, src_spec: tuple, out_spec: tuple | None, kwargs: dict):
+    """Worker side: attach the shared blocks, run `stage`, write its result in place."""
+    import numpy as np
+    from multiprocessing import shared_memory
+    blocks = [shared_memory.SharedMemory(name=src_spec[0])]
+    src = out = None
+    try:
+        src = np.ndarray(src_spec[1], dtype=np.uint8, buffer=blocks[0].buf)
+        if out_spec is not None:
+            blocks.append(shared_memory.SharedMemory(name=out_spec[0]))
+            out = np.ndarray(out_spec[1], dtype=np.uint8, buffer=blocks[1].buf)
+        if stage == "border-trim":
+            out[:] = np.asarray(border_trim_background(None, analysis=ImageAnalysis.from_rgb(src), **kwargs))
+        elif stage == "contour-bg":
+            out[:] = np.asarray(contour_background(Image.fromarray(src, "RGB"), ImageAnalysis.from_rgb(src)))
+        elif stage == "white-bg":
+            _substitute_white_background(src, np.asarray(kwargs["bg_color"]))
+        elif stage == "blob-removal":
+            out[:] = np.asarray(remove_stray_blobs(Image.fromarray(src, "RGBA"), **kwargs))
+        else:
+            raise ValueError(f"unknown CPU pool stage {stage!r}")
+    finally:
+        src = out = None  # drop the buffer exports before closing the blocks
+        for block in blocks:
+            block.close()
+
+
+def _run_in_cpu_pool(stage: str, src, out_shape: tuple | None = None, **kwargs):
+    """
+    Run a CPU stage on uint8 array `src` in the process pool and wait for it.
+
+    Returns a new array of `out_shape`, or — when `out_shape` is None — writes
+    the stage's in-place result back into `src` and returns it.
+    """
+    import time as _time
+    import numpy as np
+    from multiprocessing import shared_memory
+    t0 = _time.perf_counter()
+    blocks = []
+    shared_src = None
+    try:
+        blocks.append(shared_memory.SharedMemory(create=True, size=max(1, src.nbytes)))
+        shared_src = np.ndarray(src.shape, dtype=np.uint8, buffer=blocks[0].buf)
+        shared_src[:] = src
+        out_spec = None
+        if out_shape is not None:
+            blocks.append(shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(out_shape)))))
+            out_spec = (blocks[1].name, out_shape)
+        try:
+            _get_cpu_pool().apply(_cpu_pool_task, (stage, (blocks[0].name, src.shape), out_spec, kwargs))
+        except Exception:
+            with _cpu_pool_stats_lock:
+                _cpu_pool_stats["errors"] += 1
+            raise
+        if out_shape is None:
+            src[:] = shared_src
+            result = src
+        else:
+            result = np.ndarray(out_shape, dtype=np.uint8, buffer=blocks[1].buf).copy()
+        with _cpu_pool_stats_lock:
+            _cpu_pool_stats["tasks"] += 1
+            _cpu_pool_stats["ms_total"] += round((_time.perf_counter() - t0) * 1000)
+        return result
+    finally:
+        shared_src = None
+        for block in blocks:
+            block.close()
+            block.unlink()
+
 
 app = FastAPI()
-ocr_lock = asyncio.Lock()
-_cutout_lock = asyncio.Lock()
-_sam_lock = asyncio.Lock()
+
+# ── Cutout scheduling ─────────────────────────────────────────────────────────
+# Heavy work waits in _PriorityGates rather than plain locks:
+#   _model_gate      ML inference and policy reloads — one model run at a time
+#   _sam_gate        MobileSAM runs for /interactive-cutout
+#   _cutout_workers  cutout CPU stages (decode, analysis, classical segmentation,
+#                    compositing, encoding), which run alongside inference
+#   _ocr_gate        OCR jobs, one per OCR worker process (see the OCR pool)
+# Waiters are served by job priority (interactive > batch > background), then
+# arrival order, and a waiting job is dropped as soon as its client disconnects.
+# UFM_CUTOUT_WORKERS=0 picks half the cores (1–4). Above UFM_CUTOUT_WORKER_RSS_MB
+# (0 = off) new CPU work only starts when nothing else is running.
+_CUTOUT_WORKERS = int(os.environ.get("UFM_CUTOUT_WORKERS", "0")) or max(1, min(4, (os.cpu_count() or 2) // 2))
+_CUTOUT_WORKER_RSS_MB = float(os.environ.get("UFM_CUTOUT_WORKER_RSS_MB", "0"))
+_JOB_PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+_QUEUE_DISCONNECT_POLL_S = 0.25
+
+
+class _Job:
+    """The request a coroutine is working for — read by the gates through _current_job."""
+
+    def __init__(self, endpoint: str, priority: str, request: Request | None = None):
+        import time as _time
+        self.endpoint = endpoint
+        self.priority = priority
+        self.request = request
+        self.created = _time.monotonic()
+
+
+_current_job = contextvars.ContextVar("ufm_current_job", default=None)
+
+
+def _start_job(endpoint: str, request: Request | None, priority: str | None, default: str = "batch") -> _Job:
+    """Tag the current request with a priority for every gate it waits on. Raises _CutoutStageError(400)."""
+    name = (priority or default).strip().lower()
+    if name not in _JOB_PRIORITIES:
+        raise _CutoutStageError(400, f"Unknown priority {name!r} (expected one of {', '.join(_JOB_PRIORITIES)})")
+    job = _Job(endpoint, name, request)
+    _current_job.set(job)
+    return job
+
+
+class _PriorityGate:
+    """
+    Async semaphore that grants free slots by job priority, then arrival order.
+
+    With `rss_limit_mb` set it drops to one slot while the process RSS is over
+    the limit. Raises _CutoutStageError(499) in a waiter whose client went away.
+    """
+
+    def __init__(self, name: str, capacity: int, rss_limit_mb: float = 0.0):
+        import itertools
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.rss_limit_mb = rss_limit_mb
+        self.active = 0
+        self.peak_active = 0
+        self.throttled = 0  # grants delayed by the RSS limit
+        self.dropped = 0  # waiters whose client disconnected
+        self._waiters = []  # heap of [priority, seq, future, job]
+        self._seq = itertools.count()
+        self._waits = {p: {"count": 0, "total_ms": 0.0, "max_ms": 0.0} for p in _JOB_PRIORITIES}
+
+    def _limit(self) -> int:
+        if self.rss_limit_mb > 0 and self.active and _rss_mb() > self.rss_limit_mb:
+            return 1
+        return self.capacity
+
+    def _record_wait(self, job: _Job | None, waited_s: float):
+        stats = self._waits[job.priority if job is not None else "batch"]
+        ms = waited_s * 1000
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def _grant(self):
+        import heapq
+        while self._waiters:
+            if self.active >= self._limit():
+                return
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # dropped while queued
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            future.set_result(None)
+
+    async def acquire(self):
+        import heapq
+        import time as _time
+        job = _current_job.get()
+        t0 = _time.monotonic()
+        if not self._waiters and self.active < self._limit():
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self._record_wait(job, 0.0)
+            return
+        if not self._waiters and self.active < self.capacity:
+            self.throttled += 1
+        priority = _JOB_PRIORITIES[job.priority] if job is not None else _JOB_PRIORITIES["batch"]
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), future, job])
+        self._grant()
+        try:
+            while not future.done():
+                await asyncio.wait({future}, timeout=_QUEUE_DISCONNECT_POLL_S)
+                if future.done():
+                    break
+                if job is not None and job.request is not None and await job.request.is_disconnected():
+                    self.dropped += 1
+                    print(f"[queue] {self.name}: dropped queued {job.endpoint} job — client disconnected", flush=True)
+                    raise _CutoutStageError(499, "client disconnected")
+                self._grant()  # RSS may have fallen back under the limit
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release()  # granted in the same instant — pass the slot on
+            else:
+                future.cancel()
+            raise
+        self._record_wait(job, _time.monotonic() - t0)
+
+    def release(self):
+        self.active -= 1
+        self._grant()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self) -> dict:
+        import time as _time
+        now = _time.monotonic()
+        queued = [w for w in sorted(self._waiters) if not w[2].done()]
+        return {
+            "capacity": self.capacity,
+            "rss_limit_mb": self.rss_limit_mb,
+            "active": self.active,
+            "peak_active": self.peak_active,
+            "queued": len(queued),
+            "queued_by_priority": {p: sum(1 for w in queued if w[3] is not None and w[3].priority == p) for p in _JOB_PRIORITIES},
+            "waiting": [
+                {"endpoint": w[3].endpoint, "priority": w[3].priority, "age_s": round(now - w[3].created, 2)}
+                for w in queued if w[3] is not None
+            ],
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "wait_ms": {
+                p: {
+                    "count": st["count"],
+                    "avg": round(st["total_ms"] / st["count"], 1) if st["count"] else None,
+                    "max": round(st["max_ms"], 1),
+                }
+                for p, st in self._waits.items()
+            },
+        }
+
+
+_model_gate = _PriorityGate("model", 1)
+_sam_gate = _PriorityGate("sam", 1)
+_cutout_workers = _PriorityGate("cpu", _CUTOUT_WORKERS, _CUTOUT_WORKER_RSS_MB)
 
 # ── MobileSAM lazy loader ─────────────────────────────────────────────────────
 _mobile_sam_predictor = None
@@ -396,6 +1072,594 @@ def _get_sam_predictor():
     return _mobile_sam_predictor
 
 
+# ── MobileSAM image-embedding cache (UFM_SAM_EMBED_CACHE_MB) ──────────────────
+# pred.set_image() runs the full image encoder; pred.predict() only the small
+# prompt / mask decoder. Each click in the smart-cutout editor re-sends the
+# same photo with one more point, so embeddings are kept in an in-memory LRU
+# keyed by the source file (path, mtime, size) and how it was prepared for
+# SAM, bounded by their summed size (~4 MB each). 0 disables it.
+_SAM_EMBED_CACHE_MB = float(os.environ.get("UFM_SAM_EMBED_CACHE_MB", "64"))
+
+
+class _SamEmbeddingCache:
+    def __init__(self, budget_mb: float):
+        from collections import OrderedDict
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> ((features, original_size, input_size), nbytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, embedding, nbytes: int) -> bool:
+        with self._lock:
+            if nbytes > self.budget_bytes:
+                return False
+            self._entries[key] = (embedding, nbytes)
+            self._entries.move_to_end(key)
+            while self._total_bytes() > self.budget_bytes:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _total_bytes(self) -> int:
+        return sum(nbytes for _, nbytes in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "budget_mb": round(self.budget_bytes / (1024 * 1024), 1),
+                "used_mb": round(self._total_bytes() / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+_sam_embeddings = _SamEmbeddingCache(_SAM_EMBED_CACHE_MB)
+
+
+def _sam_embedding_key(source_path: str, size: tuple, composited: bool):
+    """(path, mtime, size, SAM input size, composited over white), or None if the file can't be stat'ed."""
+    try:
+        st = os.stat(source_path)
+    except OSError:
+        return None
+    return (os.path.realpath(source_path), st.st_mtime_ns, st.st_size, tuple(size), composited)
+
+
+def _sam_set_image(pred, rgb, key) -> bool:
+    """
+    pred.set_image(rgb), or restore the cached embedding for `key` so only the
+    decoder runs. Returns True on a cache hit. Callers hold _sam_gate, so the
+    predictor is never shared mid-request.
+    """
+    embedding = _sam_embeddings.get(key) if key is not None and _SAM_EMBED_CACHE_MB > 0 else None
+    if embedding is not None:
+        pred.reset_image()
+        pred.features, pred.original_size, pred.input_size = embedding
+        pred.is_image_set = True
+        return True
+    pred.set_image(rgb)
+    if key is not None and _SAM_EMBED_CACHE_MB > 0:
+        features = pred.features
+        _sam_embeddings.put(
+            key, (features, pred.original_size, pred.input_size), features.element_size() * features.nelement(),
+        )
+    return False
+
+
+# ── OCR worker pool (UFM_OCR_WORKERS) ─────────────────────────────────────────
+# /ocr used to spawn a fresh `python -c` per call that imported paddleocr and
+# built PaddleOCR from scratch. OCR now runs in long-lived spawned processes
+# (ocr.worker.serve) that build the model once and take jobs over a pipe —
+# still isolated from the server, so a Paddle crash only costs a worker.
+# A worker that dies or overruns UFM_OCR_JOB_TIMEOUT_S is restarted in the
+# background; one that has run UFM_OCR_WORKER_MAX_JOBS jobs or grown past
+# UFM_OCR_WORKER_RSS_MB is recycled. Workers start on first use and exit after
+# UFM_OCR_IDLE_EXIT_S idle (defaults to UFM_MODEL_IDLE_UNLOAD_S; 0 = never).
+_OCR_WORKERS = max(1, int(os.environ.get("UFM_OCR_WORKERS", "1")))
+_OCR_WORKER_MAX_JOBS = max(0, int(os.environ.get("UFM_OCR_WORKER_MAX_JOBS", "200")))
+_OCR_WORKER_RSS_MB = float(os.environ.get("UFM_OCR_WORKER_RSS_MB", "3000"))
+_OCR_START_TIMEOUT_S = float(os.environ.get("UFM_OCR_START_TIMEOUT_S", "300"))
+_OCR_JOB_TIMEOUT_S = float(os.environ.get("UFM_OCR_JOB_TIMEOUT_S", "180"))
+_OCR_IDLE_EXIT_S = float(os.environ.get("UFM_OCR_IDLE_EXIT_S", os.environ.get("UFM_MODEL_IDLE_UNLOAD_S", "0")))
+# Each worker's Paddle threads come from UFM_OCR_THREADS (0 = auto; see
+# ocr/threads.py). With UFM_OCR_AUTOTUNE=1 and auto threads, worker 0 times a
+# calibration image at a few thread counts on its first start and saves the
+# fastest to UFM_OCR_TUNE_FILE; workers started later load it from there.
+_OCR_AUTOTUNE = os.environ.get("UFM_OCR_AUTOTUNE", "0") == "1"
+
+
+def _ocr_modes_from_env() -> tuple[str, tuple[str, ...]]:
+    # Requests without a `mode` use UFM_OCR_MODE (profiles in ocr/modes.py).
+    # Workers build the engines for UFM_OCR_WARM_MODES at start-up (default:
+    # that mode plus "fast"); any other mode loads inside its first job.
+    from ocr.modes import DEFAULT_MODE, OCR_MODES
+    mode = os.environ.get("UFM_OCR_MODE", DEFAULT_MODE).strip()
+    if mode not in OCR_MODES:
+        print(f"[ocr-pool] unknown UFM_OCR_MODE {mode!r}, using {DEFAULT_MODE!r}", flush=True)
+        mode = DEFAULT_MODE
+    warm = os.environ.get("UFM_OCR_WARM_MODES", f"{mode},fast")
+    return mode, tuple(dict.fromkeys(m.strip() for m in warm.split(",") if m.strip() in OCR_MODES))
+
+
+_OCR_MODE, _OCR_WARM_MODES = _ocr_modes_from_env()
+
+
+class _OcrWorkerError(RuntimeError):
+    pass
+
+
+class _OcrWorker:
+    """One OCR process and the parent end of its pipe. `lock` serialises start, stop and jobs."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.lock = threading.Lock()
+        self.busy = False  # claimed by a request (event-loop side)
+        self.proc = None
+        self.conn = None
+        self.state = "stopped"
+        self.jobs = 0
+        self.rss_mb = None
+        self.load_ms = None
+        self.threads = None
+        self.starts = 0
+        self.last_used = None
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.is_alive()
+
+    def start(self):
+        """Spawn the process and wait for its model to load. Caller holds `lock`."""
+        import time as _time
+        from ocr import worker as _ocr_worker
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.state = "starting"
+        autotune = _OCR_AUTOTUNE and self.index == 0
+        proc = ctx.Process(
+            target=_ocr_worker.serve, args=(child_conn, _OCR_WARM_MODES, autotune), name=f"OCRWorker-{self.index}",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self.proc, self.conn = proc, parent_conn
+        # Autotuning builds and times the engine once per candidate thread count.
+        start_timeout_s = _OCR_START_TIMEOUT_S * (2 if autotune else 1)
+        try:
+            if not parent_conn.poll(start_timeout_s):
+                raise _OcrWorkerError(f"OCR worker {self.index} not ready after {start_timeout_s:.0f}s")
+            status, detail, rss_mb = parent_conn.recv()
+        except (EOFError, OSError):
+            self.stop(kill=True)
+            raise _OcrWorkerError(f"OCR worker {self.index} exited during start-up (code {proc.exitcode})")
+        except _OcrWorkerError:
+            self.stop(kill=True)
+            raise
+        if status != "ready":
+            self.stop(kill=True)
+            raise _OcrWorkerError(f"OCR worker {self.index} failed to load PaddleOCR: {detail}")
+        self.state = "ready"
+        self.jobs = 0
+        self.load_ms = detail["load_ms"]
+        self.threads = f"{detail['threads']} ({detail['threads_source']})"
+        self.rss_mb = rss_mb
+        self.starts += 1
+        self.last_used = _time.monotonic()
+        if detail["tune"]:
+            print(f"[ocr-pool] worker {self.index} thread autotune: {detail['tune']}", flush=True)
+        print(
+            f"[ocr-pool] worker {self.index} ready (pid {proc.pid}, model load {self.load_ms} ms, "
+            f"{self.threads} threads, {rss_mb:.0f} MB)",
+            flush=True,
+        )
+
+    def stop(self, kill: bool = False):
+        """Ask the process to exit (or kill it) and drop the pipe. Caller holds `lock`."""
+        proc, conn = self.proc, self.conn
+        self.proc = self.conn = None
+        self.state = "stopped"
+        if proc is None:
+            return
+        if not kill:
+            with contextlib.suppress(OSError, ValueError):
+                conn.send(None)
+            proc.join(10)
+        if proc.is_alive():
+            proc.kill()
+            proc.join(5)
+        with contextlib.suppress(OSError):
+            conn.close()
+
+    def status(self) -> dict:
+        return {
+            "index": self.index,
+            "pid": self.proc.pid if self.proc is not None else None,
+            "state": "busy" if self.busy and self.state == "ready" else self.state,
+            "jobs": self.jobs,
+            "rss_mb": round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            "load_ms": self.load_ms,
+            "threads": self.threads,
+            "starts": self.starts,
+        }
+
+
+class _OcrWorkerPool:
+    """Runs OCR jobs on warm worker processes; `_ocr_gate` bounds concurrency to the pool size."""
+
+    def __init__(self, size: int):
+        self.workers = [_OcrWorker(i) for i in range(size)]
+        self.jobs = 0
+        self.failures = 0
+        self.crashes = 0
+        self.timeouts = 0
+        self.recycles = 0
+        self.idle_exits = 0
+        self.job_ms_total = 0
+
+    async def run(self, kind: str, payload: dict, on_item=None):
+        """
+        Run one job on a free worker (queued by the current job's priority).
+        Streamed ("item", ...) messages go to on_item(*fields) on a worker
+        thread. Raises _OcrWorkerError.
+        """
+        async with _ocr_gate.slot():
+            free = [w for w in self.workers if not w.busy]
+            # Prefer a warm worker over one that is stopped or still restarting.
+            worker = next((w for w in free if w.state == "ready" and not w.lock.locked()), free[0])
+            worker.busy = True
+            try:
+                return await asyncio.to_thread(self._run_on, worker, kind, payload, on_item)
+            finally:
+                worker.busy = False
+
+    def _run_on(self, worker: _OcrWorker, kind: str, payload: dict, on_item=None):
+        import time as _time
+        with worker.lock:
+            if not worker.alive():
+                if worker.state == "ready":
+                    self.crashes += 1
+                    print(f"[ocr-pool] worker {worker.index} died while idle — restarting", flush=True)
+                    worker.stop(kill=True)
+                worker.start()
+            t0 = _time.perf_counter()
+            try:
+                worker.conn.send((kind, payload))
+                while True:
+                    # Per message, so a batch job gets the timeout per image.
+                    if not worker.conn.poll(_OCR_JOB_TIMEOUT_S):
+                        self.timeouts += 1
+                        worker.stop(kill=True)
+                        self._respawn(worker)
+                        raise _OcrWorkerError(f"OCR job timed out after {_OCR_JOB_TIMEOUT_S:.0f}s — worker killed")
+                    message = worker.conn.recv()
+                    if message[0] != "item":
+                        break
+                    if on_item is not None:
+                        on_item(*message[1:])
+                status, result, rss_mb = message
+            except (EOFError, OSError) as e:
+                self.crashes += 1
+                worker.proc.join(1)
+                code = worker.proc.exitcode
+                worker.stop(kill=True)
+                self._respawn(worker)
+                raise _OcrWorkerError(f"OCR worker {worker.index} died mid-job (exit code {code}): {e}")
+            worker.jobs += 1
+            worker.rss_mb = rss_mb
+            worker.last_used = _time.monotonic()
+            self.jobs += 1
+            self.job_ms_total += (_time.perf_counter() - t0) * 1000
+
+            recycle = None
+            if _OCR_WORKER_MAX_JOBS and worker.jobs >= _OCR_WORKER_MAX_JOBS:
+                recycle = f"{worker.jobs} jobs"
+            elif _OCR_WORKER_RSS_MB > 0 and rss_mb > _OCR_WORKER_RSS_MB:
+                recycle = f"RSS {rss_mb:.0f} MB > {_OCR_WORKER_RSS_MB:.0f} MB"
+            if recycle:
+                self.recycles += 1
+                print(f"[ocr-pool] recycling worker {worker.index} after {recycle}", flush=True)
+                worker.stop()
+                self._respawn(worker)
+
+        if status != "ok":
+            self.failures += 1
+            raise _OcrWorkerError(result)
+        return result
+
+    def _respawn(self, worker: _OcrWorker):
+        """Bring a replacement up off the request path; it takes `lock`, so the next job waits for it."""
+        def _start():
+            with worker.lock:
+                if worker.alive():
+                    return
+                try:
+                    worker.start()
+                except Exception as e:
+                    print(f"[ocr-pool] restart of worker {worker.index} failed: {e}", flush=True)
+        threading.Thread(target=_start, daemon=True).start()
+
+    def stop_idle(self, now: float):
+        """Stop workers idle longer than UFM_OCR_IDLE_EXIT_S (lifecycle sweeper)."""
+        if _OCR_IDLE_EXIT_S <= 0:
+            return
+        for w in self.workers:
+            if w.busy or w.last_used is None or now - w.last_used < _OCR_IDLE_EXIT_S:
+                continue
+            if not w.lock.acquire(blocking=False):
+                continue
+            try:
+                if w.alive() and not w.busy:
+                    w.stop()
+                    self.idle_exits += 1
+                    print(f"[ocr-pool] worker {w.index} exited after {now - w.last_used:.0f}s idle", flush=True)
+            finally:
+                w.lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.workers),
+            "default_mode": _OCR_MODE,
+            "warm_modes": list(_OCR_WARM_MODES),
+            "workers": [w.status() for w in self.workers],
+            "jobs": self.jobs,
+            "failures": self.failures,
+            "crashes": self.crashes,
+            "timeouts": self.timeouts,
+            "recycles": self.recycles,
+            "idle_exits": self.idle_exits,
+            "avg_job_ms": round(self.job_ms_total / self.jobs) if self.jobs else None,
+            "max_jobs": _OCR_WORKER_MAX_JOBS,
+            "rss_limit_mb": _OCR_WORKER_RSS_MB,
+            "idle_exit_s": _OCR_IDLE_EXIT_S,
+        }
+
+
+_ocr_gate = _PriorityGate("ocr", _OCR_WORKERS)
+_ocr_pool = _OcrWorkerPool(_OCR_WORKERS)
+
+
+# ── Model lifecycle (idle unload / on-demand load / warm-up) ──────────────────
+# Each resident model family (the default rembg session or BRIA, and MobileSAM)
+# goes cold → loading → warm, and back to evicted after UFM_MODEL_IDLE_UNLOAD_S
+# (UFM_SAM_IDLE_UNLOAD_S for SAM) without use; the next request reloads it.
+# 0 disables idle unload. A tiny synthetic inference runs after every load so
+# the first real request doesn't pay ORT / torch first-run setup.
+_MODEL_IDLE_UNLOAD_S = float(os.environ.get("UFM_MODEL_IDLE_UNLOAD_S", "0"))
+_SAM_IDLE_UNLOAD_S = float(os.environ.get("UFM_SAM_IDLE_UNLOAD_S", str(_MODEL_IDLE_UNLOAD_S)))
+_MODEL_WARMUP = os.environ.get("UFM_MODEL_WARMUP", "1") != "0"
+_MODEL_PRELOAD = os.environ.get("UFM_MODEL_PRELOAD", "1") != "0"
+
+
+class _ModelLifecycle:
+    """
+    State machine for one lazily-held model: cold / loading / warm / evicted.
+
+    `load`, `unload` and `warmup` run on the calling thread. Callers bracket
+    inference with acquire() / release() (or `with use():`) so the idle
+    sweeper never unloads a model mid-request.
+    """
+
+    def __init__(self, name: str, load, unload, warmup=None, idle_unload_s: float = 0.0):
+        self.name = name
+        self._load = load
+        self._unload = unload
+        self._warmup = warmup
+        self.idle_unload_s = idle_unload_s
+        self.lock = threading.RLock()
+        self.state = "cold"
+        self.in_use = 0
+        self.last_used = None
+        self.loads = 0
+        self.unloads = 0
+        self.load_ms = None
+        self.warmup_ms = None
+        self.error = None
+
+    def ensure_loaded(self):
+        import time as _time
+        with self.lock:
+            if self.state == "warm":
+                return
+            self.state = "loading"
+            t0 = _time.perf_counter()
+            try:
+                self._load()
+                self.load_ms = round((_time.perf_counter() - t0) * 1000)
+                if _MODEL_WARMUP and self._warmup is not None:
+                    t1 = _time.perf_counter()
+                    self._warmup()
+                    self.warmup_ms = round((_time.perf_counter() - t1) * 1000)
+                    print(f"[lifecycle] {self.name} warm-up inference: {self.warmup_ms} ms", flush=True)
+            except Exception as e:
+                self.state = "cold"
+                self.error = str(e)
+                print(f"[lifecycle] {self.name} failed to load: {e}", flush=True)
+                raise
+            self.state = "warm"
+            self.error = None
+            self.loads += 1
+            self.last_used = _time.monotonic()
+
+    def acquire(self):
+        with self.lock:
+            self.in_use += 1
+        try:
+            self.ensure_loaded()
+        except Exception:
+            pass  # callers see the missing model and report it (503 / fallback)
+
+    def release(self):
+        import time as _time
+        with self.lock:
+            self.in_use = max(0, self.in_use - 1)
+            self.last_used = _time.monotonic()
+
+    @contextlib.contextmanager
+    def use(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def unload(self):
+        """Drop the model now; the next ensure_loaded() loads it again."""
+        with self.lock:
+            if self.state != "warm":
+                return
+            self._unload()
+            gc.collect()
+            self.state = "evicted"
+            self.unloads += 1
+
+    def maybe_unload(self, now: float):
+        with self.lock:
+            if self.state != "warm" or self.in_use or self.idle_unload_s <= 0 or self.last_used is None:
+                return
+            idle_s = now - self.last_used
+            if idle_s < self.idle_unload_s:
+                return
+            before_mb = _rss_mb()
+            self.unload()
+            print(
+                f"[lifecycle] {self.name} unloaded after {idle_s:.0f}s idle "
+                f"({before_mb:.0f} -> {_rss_mb():.0f} MB)",
+                flush=True,
+            )
+
+    def status(self) -> dict:
+        # Read without the lock: /health must answer even while a load holds it.
+        import time as _time
+        return {
+            "state": self.state,
+            "idle_s": round(_time.monotonic() - self.last_used, 1) if self.last_used is not None else None,
+            "idle_unload_s": self.idle_unload_s,
+            "in_use": self.in_use,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+        }
+
+
+def _load_primary_model():
+    _load_model()
+    if _rembg_session is None and _bria_model is None:
+        raise RuntimeError(f"{REMBG_MODEL} failed to load")
+
+
+def _unload_primary_model():
+    global _rembg_session, _bria_model
+    _rembg_session = None
+    _bria_model = None
+
+
+def _warmup_primary_model():
+    import numpy as np
+    rgb = np.full((64, 64, 3), 127, dtype=np.uint8)
+    if _bria_model is not None:
+        _run_bria_inference(rgb)
+    elif _rembg_session is not None:
+        _rembg_mask(rgb, _rembg_session, REMBG_MODEL, _ort_run_options(REMBG_MODEL))
+
+
+def _unload_sam_predictor():
+    global _mobile_sam_predictor
+    _mobile_sam_predictor = None
+    _sam_embeddings.clear()
+
+
+def _warmup_sam_predictor():
+    import numpy as np
+    pred = _get_sam_predictor()
+    pred.set_image(np.full((64, 64, 3), 127, dtype=np.uint8))
+    pred.predict(
+        point_coords=np.array([[32, 32]], dtype=np.float32),
+        point_labels=np.array([1], dtype=np.int32),
+        multimask_output=False,
+    )
+
+
+# border-trim / contour-bg need no resident ML model.
+_primary_model = (
+    None if REMBG_MODEL in ("border-trim", "contour-bg") else _ModelLifecycle(
+        "bria" if USE_BRIA else "rembg",
+        _load_primary_model, _unload_primary_model, _warmup_primary_model, _MODEL_IDLE_UNLOAD_S,
+    )
+)
+_sam_model = _ModelLifecycle(
+    "mobile_sam", _get_sam_predictor, _unload_sam_predictor, _warmup_sam_predictor, _SAM_IDLE_UNLOAD_S,
+)
+_lifecycle_models = [m for m in (_primary_model, _sam_model) if m is not None]
+
+
+def _lifecycle_sweeper():
+    import time as _time
+    idle_limits = [m.idle_unload_s for m in _lifecycle_models if m.idle_unload_s > 0]
+    if _OCR_IDLE_EXIT_S > 0:
+        idle_limits.append(_OCR_IDLE_EXIT_S)
+    interval = max(1.0, min(30.0, min(idle_limits) / 4))
+    while True:
+        _time.sleep(interval)
+        for m in _lifecycle_models:
+            try:
+                m.maybe_unload(_time.monotonic())
+            except Exception as e:
+                print(f"[lifecycle] {m.name} unload failed: {e}", flush=True)
+        try:
+            _ocr_pool.stop_idle(_time.monotonic())
+        except Exception as e:
+            print(f"[ocr-pool] idle stop failed: {e}", flush=True)
+
+
+def _preload_primary_model():
+    try:
+        _primary_model.ensure_loaded()
+    except Exception:
+        pass  # logged by ensure_loaded; requests report the 503
+    finally:
+        _model_ready.set()
+
+
+# Load the model in a background thread so uvicorn can start and pass the
+# health check immediately (important during the first-time ~1 GB download).
+# With UFM_MODEL_PRELOAD=0 it stays cold until the first request needs it.
+if _IN_CPU_POOL_WORKER:
+    pass  # a CPU-pool worker only needs the stage functions
+elif _primary_model is None:
+    _load_model()
+elif _MODEL_PRELOAD:
+    threading.Thread(target=_preload_primary_model, daemon=True).start()
+else:
+    _model_ready.set()
+if not _IN_CPU_POOL_WORKER and (any(m.idle_unload_s > 0 for m in _lifecycle_models) or _OCR_IDLE_EXIT_S > 0):
+    threading.Thread(target=_lifecycle_sweeper, daemon=True).start()
+# Spawn the CPU pool up front so the first cutout doesn't pay for worker start-up.
+if not _IN_CPU_POOL_WORKER and _CPU_POOL_WORKERS:
+    threading.Thread(target=_get_cpu_pool, daemon=True).start()
+
+
 def _cutout_max_edge_px() -> int:
     raw = os.environ.get("UFM_CUTOUT_MAX_EDGE_PX", "1536").strip()
     try:
@@ -433,6 +1697,19 @@ def _maybe_downscale_for_rembg(img: Image.Image, model_name: str | None = None)
 
 class OCRRequest(BaseModel):
     image_path: str
+    priority: str | None = None
+    mode: str | None = None  # "full" | "fast" | "detect"; None = UFM_OCR_MODE
+    max_side: int | None = None  # cap on the longest side fed to detection; None = mode default, 0 = none
+    tiled: bool | None = None  # OCR as overlapping tiles; None = only past UFM_OCR_TILE_AUTO_SIDE
+    layout: bool = False  # add "layout": lines / columns / candidate product cells
+
+
+class OCRBatchRequest(BaseModel):
+    image_paths: list[str]
+    priority: str | None = None
+    mode: str | None = None
+    max_side: int | None = None
+    layout: bool = False
 
 
 class SmartCutoutPoint(BaseModel):
@@ -446,11 +1723,17 @@ class SmartCutoutRequest(BaseModel):
     positive_points: list[SmartCutoutPoint] = []
     negative_points: list[SmartCutoutPoint] = []
     point_radius: int = 18
+    output_format: str | None = None
+    priority: str | None = None
 
 
 @app.get("/health")
 def health():
-    return {"ok": True, "ready": _model_ready.is_set()}
+    return {
+        "ok": True,
+        "ready": _model_ready.is_set(),
+        "models": {m.name: m.status() for m in _lifecycle_models},
+    }
 
 
 @app.get("/debug/mem")
@@ -465,6 +1748,20 @@ def debug_mem():
         "ort_profile_active": _ORT_PROFILE,
         "ort_profile_fired": _ort_profile_state["fired"],
         "tracemalloc_active": tracemalloc.is_tracing(),
+        "session_cache": _session_cache.stats(),
+        "sam_embedding_cache": _sam_embeddings.stats(),
+        "cutout_workers": _cutout_workers.status(),
+        "cpu_pool": {"workers": _CPU_POOL_WORKERS, "started": _cpu_pool is not None, **_cpu_pool_stats_snapshot()},
+        "cutout_cache": _cutout_cache.stats(),
+        "ocr_cache": _ocr_cache.stats(),
+        "ocr_pool": _ocr_pool.stats(),
+        "birefnet_mem_policy": {
+            **_mem_policy_state,
+            "reload_every": _BIREFNET_RELOAD_EVERY,
+            "rss_budget_mb": _BIREFNET_RSS_BUDGET_MB,
+            "idle_reload_s": _BIREFNET_IDLE_RELOAD_S,
+            "managed": REMBG_MODEL.startswith("birefnet"),
+        },
     }
     if tracemalloc.is_tracing():
         snapshot = tracemalloc.take_snapshot()
@@ -473,83 +1770,250 @@ def debug_mem():
     return result
 
 
+@app.get("/queue")
+def queue_status():
+    """Scheduling queues: active and queued jobs per gate, drops and wait times by priority."""
+    return {
+        "priorities": list(_JOB_PRIORITIES),
+        "gates": {gate.name: gate.status() for gate in (_model_gate, _sam_gate, _cutout_workers, _ocr_gate)},
+    }
+
+
 # ---------- IMAGE ORIENTATION NORMALIZATION ----------
 # FILE: apps/desktop/backend/src/cutout_service/server.py
 # ACTION: REMOVE SHAPE-BASED ROTATION, KEEP EXIF ONLY
 # DROP-IN REPLACEMENT FOR normalize_orientation()
 
-def _substitute_white_background(img: Image.Image, fill: tuple = (127, 127, 127), tolerance: int = 28) -> Image.Image:
+def _estimate_bg_color(rgb, patch: int = 12):
+    """Robust background colour from `patch`×`patch` samples in the 4 corners.
+
+    Drops corners that are significantly different from the median (e.g. a
+    product that bleeds into one corner of the image).
+    """
+    import numpy as np
+    h, w = rgb.shape[:2]
+    corners = [
+        rgb[:patch, :patch],
+        rgb[:patch, max(0, w - patch):],
+        rgb[max(0, h - patch):, :patch],
+        rgb[max(0, h - patch):, max(0, w - patch):],
+    ]
+    corner_means = np.array([c.mean(axis=(0, 1)) for c in corners])  # (4, 3)
+    median = np.median(corner_means, axis=0)
+    distances = np.linalg.norm(corner_means - median, axis=1)
+    med_dist = float(np.median(distances))
+    inlier_mask = distances <= max(2.5 * med_dist, 30.0)  # 30 px floor avoids all-same edge case
+    return corner_means[inlier_mask].mean(axis=0) if inlier_mask.sum() >= 2 else median
+
+
+class ImageAnalysis:
+    """Lazily computed per-image statistics shared by every cutout stage.
+
+    Built once per decoded (RGB, already composited) image and handed to
+    border-trim, contour-bg, white-bg substitution and the white-bg check, so the
+    RGB conversion, corner background estimate, grayscale and edge maps are each
+    computed at most once per request. Every array is read-only shared state —
+    stages that need a writable buffer call rgba().
+    """
+
+    def __init__(self, img: Image.Image):
+        self.img = img
+
+    @classmethod
+    def from_rgb(cls, rgb) -> "ImageAnalysis":
+        """Analysis over an existing uint8 RGB array (e.g. one in shared memory)."""
+        analysis = cls(None)
+        analysis.rgb = rgb
+        return analysis
+
+    @cached_property
+    def rgb(self):
+        import numpy as np
+        return np.asarray(self.img.convert("RGB"), dtype=np.uint8)
+
+    @property
+    def shape(self) -> tuple:
+        return self.rgb.shape[:2]
+
+    @cached_property
+    def bg_color(self):
+        return _estimate_bg_color(self.rgb)
+
+    @cached_property
+    def bg_is_near_white(self) -> bool:
+        import numpy as np
+        return bool(np.all(self.bg_color > 200))
+
+    @cached_property
+    def white_fraction(self) -> float:
+        return _border_white_fraction(self.rgb)
+
+    @property
+    def is_white_bg(self) -> bool:
+        return self.white_fraction > 0.85
+
+    @cached_property
+    def mean_gray(self):
+        """Unweighted channel mean as float32 (border-trim's Sobel input)."""
+        import numpy as np
+        return np.mean(self.rgb, axis=2).astype(np.float32)
+
+    @cached_property
+    def near_white(self):
+        """Pixels whose channel mean is > 215 — the ring-cleanup criterion."""
+        return self.mean_gray > 215
+
+    @cached_property
+    def gray(self):
+        """cv2 luma grayscale (contour-bg's Canny input)."""
+        import cv2
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+
+    @cached_property
+    def sobel_magnitude(self):
+        import numpy as np
+        import cv2
+        sx = cv2.Sobel(self.mean_gray, cv2.CV_32F, 1, 0, ksize=3)
+        sy = cv2.Sobel(self.mean_gray, cv2.CV_32F, 0, 1, ksize=3)
+        return np.sqrt(sx ** 2 + sy ** 2)
+
+    @cached_property
+    def canny_edges(self):
+        """Canny edges of the CLAHE-enhanced, blurred grayscale."""
+        import cv2
+        # CLAHE (Contrast Limited Adaptive Histogram Equalization) sharpens subtle
+        # transitions — e.g. pale yellow pear against white — without blowing out
+        # areas that already have good contrast.
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        enhanced = clahe.apply(self.gray)
+        blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
+        return cv2.Canny(blurred, threshold1=20, threshold2=60)
+
+    def rgba(self):
+        """Fresh, writable, fully opaque RGBA copy of the image."""
+        import numpy as np
+        h, w = self.shape
+        out = np.empty((h, w, 4), dtype=np.uint8)
+        out[:, :, :3] = self.rgb
+        out[:, :, 3] = 255
+        return out
+
+
+def _flood_fill_mask(candidate, seeds):
+    """Return the pixels of `candidate` that are 4-connected to a seed pixel.
+
+    Whole-array equivalent of a BFS flood-fill from `seeds` that may only step
+    onto `candidate` pixels: label the candidate mask once with OpenCV's C-level
+    connected-components pass, then keep every label that contains a seed.
+    Both arguments are (h, w) bool arrays; seeds outside `candidate` are ignored.
+    """
+    import numpy as np
+    cand_u8 = candidate.astype(np.uint8)
+    try:
+        import cv2
+    except ImportError:
+        cv2 = None
+
+    if cv2 is not None:
+        num_labels, labels = cv2.connectedComponents(cand_u8, connectivity=4, ltype=cv2.CV_32S)
+        seed_labels = np.unique(labels[seeds & candidate])
+        seed_labels = seed_labels[seed_labels != 0]  # label 0 is the non-candidate area
+        if seed_labels.size == 0:
+            return np.zeros(candidate.shape, dtype=bool)
+        keep = np.zeros(num_labels, dtype=bool)
+        keep[seed_labels] = True
+        return keep[labels]
+
+    # No cv2 — geodesic reconstruction with array shifts. Still loop-free per
+    # pixel, but needs one pass per step of the longest fill path.
+    filled = seeds & candidate
+    while True:
+        grown = filled.copy()
+        grown[1:, :] |= filled[:-1, :]
+        grown[:-1, :] |= filled[1:, :]
+        grown[:, 1:] |= filled[:, :-1]
+        grown[:, :-1] |= filled[:, 1:]
+        grown &= candidate
+        if np.array_equal(grown, filled):
+            return filled
+        filled = grown
+
+
+def _substitute_white_background(arr, bg_color=None, fill: tuple = (127, 127, 127), tolerance: int = 28):
     """Flood-fill corner-connected white/near-white background with a mid-gray.
 
     Gives rembg / BiRefNet a contrast signal when the product itself is white or
     light-coloured against a white background — without touching the product pixels.
-    Returns a new RGB image; the caller should apply the resulting alpha mask to the
-    *original* image so pixel colours are preserved.
+    `arr` is a uint8 RGB array (usually a view into the padded model input) and is
+    modified in place; the caller should apply the resulting alpha mask to the
+    *original* pixels so colours are preserved. Pass `bg_color` when the corner
+    estimate is already known (ImageAnalysis.bg_color).
     """
     import numpy as np
-    from collections import deque
 
-    arr = np.array(img.convert("RGB"), dtype=np.int32)
     h, w = arr.shape[:2]
-
-    # Sample representative background colour from a 12×12 patch in each corner.
-    def _corner_mean(y0, x0):
-        return arr[y0:y0 + 12, x0:x0 + 12].mean(axis=(0, 1))
-
-    _c_means = np.array([
-        _corner_mean(0, 0), _corner_mean(0, w - 12),
-        _corner_mean(h - 12, 0), _corner_mean(h - 12, w - 12),
-    ])
-    _c_median = np.median(_c_means, axis=0)
-    _c_dist = np.linalg.norm(_c_means - _c_median, axis=1)
-    _c_med_dist = float(np.median(_c_dist))
-    _c_inliers = _c_dist <= max(2.5 * _c_med_dist, 30.0)
-    bg_color = _c_means[_c_inliers].mean(axis=0) if _c_inliers.sum() >= 2 else _c_median
+    if bg_color is None:
+        bg_color = _estimate_bg_color(arr)
 
     # Only apply when the detected background is near-white.
     if np.any(bg_color < 200):
-        return img.convert("RGB")  # coloured background — no substitution needed
+        return arr  # coloured background — no substitution needed
 
-    def _is_bg(y: int, x: int) -> bool:
-        return bool(np.all(np.abs(arr[y, x] - bg_color) <= tolerance))
-
-    visited = np.zeros((h, w), dtype=bool)
-    queue: deque = deque()
+    candidate = np.ones((h, w), dtype=bool)
+    for c in range(3):
+        candidate &= np.abs(arr[:, :, c] - bg_color[c]) <= tolerance
 
     # Seed from all 4 corners + edge mid-points for better coverage on non-square images.
-    seeds = [
+    seeds = np.zeros((h, w), dtype=bool)
+    for sy, sx in (
         (0, 0), (0, w - 1), (h - 1, 0), (h - 1, w - 1),
         (0, w // 2), (h - 1, w // 2), (h // 2, 0), (h // 2, w - 1),
-    ]
-    for sy, sx in seeds:
-        if _is_bg(sy, sx) and not visited[sy, sx]:
-            visited[sy, sx] = True
-            queue.append((sy, sx))
-
-    while queue:
-        y, x = queue.popleft()
-        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w and not visited[ny, nx] and _is_bg(ny, nx):
-                visited[ny, nx] = True
-                queue.append((ny, nx))
+    ):
+        seeds[sy, sx] = True
+    visited = _flood_fill_mask(candidate, seeds)
 
-    result = arr.copy()
-    result[visited] = fill
+    arr[visited] = fill
     print(
         f"[cutout] white-bg substitution: replaced {int(visited.sum())} / {h * w} pixels "
         f"({visited.mean():.1%}) with gray — bg_color=({bg_color[0]:.0f},{bg_color[1]:.0f},{bg_color[2]:.0f})",
         flush=True,
     )
-    return Image.fromarray(result.astype(np.uint8), "RGB")
+    return arr
+
+
+def _build_model_input(analysis: "ImageAnalysis", border: int = 40):
+    """Build the padded RGB array fed to the ML model, in a single buffer.
+
+    The source is copied once into the centre of a pad-coloured canvas; for
+    white-background images the corner-connected background is then swapped for
+    gray directly inside that canvas. No PIL paste and no PNG encode — rembg and
+    BRIA take the array as-is.
+    """
+    import numpy as np
+    h, w = analysis.shape
+    # Contrasting gray pad (not white) on white-bg images so the edge is visible.
+    pad_color = (140, 140, 140) if analysis.is_white_bg else (255, 255, 255)
+    padded = np.empty((h + border * 2, w + border * 2, 3), dtype=np.uint8)
+    padded[:] = pad_color
+    inner = padded[border:border + h, border:border + w]
+    inner[:] = analysis.rgb
+    if analysis.is_white_bg:
+        _white_bg_substitution_stage(inner, analysis.bg_color)
+    return padded
+
+
+# border-trim's colour tolerance and alpha feather (also in the cutout cache key).
+_BORDER_TRIM_TOLERANCE = 25
+_BORDER_TRIM_FEATHER_PX = 2
 
 
 def border_trim_background(
     img: Image.Image,
-    tolerance: int = 25,
-    feather_px: int = 2,
+    tolerance: int = _BORDER_TRIM_TOLERANCE,
+    feather_px: int = _BORDER_TRIM_FEATHER_PX,
+    analysis: ImageAnalysis | None = None,
 ) -> Image.Image:
-    """Remove background by BFS flood-fill from the image perimeter.
+    """Remove background by flood-fill from the image perimeter.
 
     Uses two stopping conditions:
     1. Colour similarity — pixel must be within `tolerance` of the detected
@@ -558,9 +2022,12 @@ def border_trim_background(
        colour difference is subtle (e.g. ivory packaging on white background).
        This prevents JPEG-blended edge pixels from letting the fill bleed into
        the product's off-white/ivory areas.
+
+    `img` must be opaque (composite RGBA inputs over white first). Pass the
+    request's ImageAnalysis to reuse its RGB array, background colour and
+    Sobel map.
     """
     import numpy as np
-    from collections import deque
 
     try:
         import cv2
@@ -568,34 +2035,19 @@ def border_trim_background(
     except ImportError:
         _HAS_CV2 = False
 
-    rgb = np.array(img.convert("RGB"), dtype=np.int32)
-    h, w = rgb.shape[:2]
+    if analysis is None:
+        analysis = ImageAnalysis(img)
+    rgb = analysis.rgb
+    h, w = analysis.shape
 
-    # Sample background colour from 12×12 patches in all 4 corners.
-    patch = 12
-    corners = [
-        rgb[:patch, :patch],
-        rgb[:patch, max(0, w - patch):],
-        rgb[max(0, h - patch):, :patch],
-        rgb[max(0, h - patch):, max(0, w - patch):],
-    ]
-    # Robust bg estimate: drop corners that are significantly different from the
-    # median (e.g. a product that bleeds into one corner of the image).
-    corner_means = np.array([c.mean(axis=(0, 1)) for c in corners])  # (4, 3)
-    median = np.median(corner_means, axis=0)
-    distances = np.linalg.norm(corner_means - median, axis=1)
-    med_dist = float(np.median(distances))
-    inlier_mask = distances <= max(2.5 * med_dist, 30.0)  # 30 px floor avoids all-same edge case
-    bg = corner_means[inlier_mask].mean(axis=0) if inlier_mask.sum() >= 2 else median
-    is_white_bg = np.all(bg > 200)
+    # Background colour from 12×12 patches in all 4 corners.
+    bg = analysis.bg_color
+    is_white_bg = analysis.bg_is_near_white
 
-    # Compute Sobel edge strength so we can stop at product boundaries even
+    # Sobel edge strength so we can stop at product boundaries even
     # when the colour difference between product and background is small.
     if _HAS_CV2:
-        gray = np.mean(rgb, axis=2).astype(np.float32)
-        sx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
-        sy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
-        edge_strength = np.sqrt(sx ** 2 + sy ** 2)
+        edge_strength = analysis.sobel_magnitude
         # Threshold: edges above this are treated as product boundaries.
         # For white backgrounds, use 8 so BFS crosses weak bottle-shadow gradients
         # and drains enclosed white floor areas that would otherwise remain.
@@ -605,37 +2057,21 @@ def border_trim_background(
         edge_strength = None
         EDGE_STOP = None
 
-    def _is_bg(y: int, x: int) -> bool:
-        # Must be colour-similar to background.
-        if not np.all(np.abs(rgb[y, x] - bg) <= tolerance):
-            return False
-        # Must NOT be at a product boundary (visible edge).
-        if edge_strength is not None and edge_strength[y, x] >= EDGE_STOP:
-            return False
-        return True
-
-    # Seed flood-fill from every pixel on the perimeter.
-    visited = np.zeros((h, w), dtype=bool)
-    queue: deque = deque()
-
-    for x in range(w):
-        for y_seed in (0, h - 1):
-            if not visited[y_seed, x] and _is_bg(y_seed, x):
-                visited[y_seed, x] = True
-                queue.append((y_seed, x))
-    for y in range(1, h - 1):
-        for x_seed in (0, w - 1):
-            if not visited[y, x_seed] and _is_bg(y, x_seed):
-                visited[y, x_seed] = True
-                queue.append((y, x_seed))
-
-    while queue:
-        y, x = queue.popleft()
-        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-            ny, nx = y + dy, x + dx
-            if 0 <= ny < h and 0 <= nx < w and not visited[ny, nx] and _is_bg(ny, nx):
-                visited[ny, nx] = True
-                queue.append((ny, nx))
+    # Background candidates in one pass: colour-similar to the background AND
+    # not on a product boundary (visible edge). Compared per channel so the
+    # temporaries stay (h, w) instead of (h, w, 3).
+    candidate = np.ones((h, w), dtype=bool)
+    for c in range(3):
+        candidate &= np.abs(rgb[:, :, c] - bg[c]) <= tolerance
+    if edge_strength is not None:
+        candidate &= edge_strength < EDGE_STOP
+
+    # Flood-fill from every pixel on the perimeter: keep the candidate regions
+    # 4-connected to the image border.
+    seeds = np.zeros((h, w), dtype=bool)
+    seeds[0, :] = seeds[h - 1, :] = True
+    seeds[:, 0] = seeds[:, w - 1] = True
+    visited = _flood_fill_mask(candidate, seeds)
 
     # Erode the background mask by 1 px so JPEG-blurred edge pixels that slipped
     # past the Sobel gate are not claimed as background.
@@ -648,7 +2084,7 @@ def border_trim_background(
         visited = visited & visited_eroded
 
     # Build RGBA: background → transparent, product → opaque.
-    rgba = np.array(img.convert("RGBA"), dtype=np.uint8)
+    rgba = analysis.rgba()
     rgba[visited, 3] = 0
 
     # Feather the alpha channel at the boundary for natural-looking edges.
@@ -675,13 +2111,13 @@ def border_trim_background(
     # 4 passes removes ~4px of fringe (1 more than before, compensating for
     # skipping erode which had been wasting 1 pass undoing its own work).
     if is_white_bg and _HAS_CV2:
+        near_white = analysis.near_white
         for _ in range(4):
             a_ch = rgba[:, :, 3]
             bg_mask = (a_ch == 0).astype(np.uint8)
             bg_dilated = cv2.dilate(bg_mask, np.ones((3, 3), np.uint8))
             ring = bg_dilated.astype(bool) & (a_ch > 0)
-            near_white_ring = rgba[:, :, :3].mean(axis=2) > 215
-            rgba[ring & near_white_ring, 3] = 0
+            rgba[ring & near_white, 3] = 0
 
     pct = float(visited.sum()) / (h * w)
     print(
@@ -692,7 +2128,7 @@ def border_trim_background(
     return Image.fromarray(rgba, "RGBA")
 
 
-def contour_background(img: Image.Image) -> Image.Image:
+def contour_background(img: Image.Image, analysis: ImageAnalysis | None = None) -> Image.Image:
     """Remove background using the largest-enclosed-shape technique.
 
     Instead of flood-filling from the background colour, this finds the largest
@@ -710,6 +2146,8 @@ def contour_background(img: Image.Image) -> Image.Image:
       5. Pick the largest remaining contour by area
       6. Fill it as the product mask
       7. 4-pass near-white ring cleanup (same as border_trim_background)
+
+    Pass the request's ImageAnalysis to reuse its grayscale and edge map.
     """
     import numpy as np
     try:
@@ -718,21 +2156,13 @@ def contour_background(img: Image.Image) -> Image.Image:
         # cv2 unavailable — fall back gracefully by returning original as RGBA
         return img.convert("RGBA")
 
-    rgb = np.array(img.convert("RGB"), dtype=np.uint8)
-    h, w = rgb.shape[:2]
-    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
-
-    # Step 1: Boost local contrast before edge detection.
-    # CLAHE (Contrast Limited Adaptive Histogram Equalization) sharpens subtle
-    # transitions — e.g. pale yellow pear against white — without blowing out
-    # areas that already have good contrast.  This gives Canny much more to work
-    # with on low-contrast products.
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
+    if analysis is None:
+        analysis = ImageAnalysis(img)
+    h, w = analysis.shape
 
-    # Step 2: Canny edge detection on the contrast-enhanced image.
-    blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
-    edges = cv2.Canny(blurred, threshold1=20, threshold2=60)
+    # Steps 1-2: CLAHE contrast boost, then Canny edge detection. The boost
+    # gives Canny much more to work with on low-contrast products.
+    edges = analysis.canny_edges
 
     # Step 3: Close gaps — thickens and connects broken edge lines into loops.
     close_kernel = np.ones((5, 5), np.uint8)
@@ -800,18 +2230,18 @@ def contour_background(img: Image.Image) -> Image.Image:
     mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, gap_kernel, iterations=1)
 
     # Build RGBA with the contour mask as alpha.
-    rgba = np.array(img.convert("RGBA"), dtype=np.uint8)
+    rgba = analysis.rgba()
     rgba[:, :, 3] = mask
 
     # Step 7: 4-pass near-white ring cleanup (same as border_trim_background).
     # Removes JPEG-blurred fringe at the product boundary.
+    near_white = analysis.near_white
     for _ in range(4):
         a_ch = rgba[:, :, 3]
         bg_mask_arr = (a_ch == 0).astype(np.uint8)
         bg_dilated = cv2.dilate(bg_mask_arr, np.ones((3, 3), np.uint8))
         ring = bg_dilated.astype(bool) & (a_ch > 0)
-        near_white_ring = rgba[:, :, :3].mean(axis=2) > 215
-        rgba[ring & near_white_ring, 3] = 0
+        rgba[ring & near_white, 3] = 0
 
     print(
         f"[contour-bg] best contour area={pct_covered:.1%} of image  "
@@ -821,10 +2251,13 @@ def contour_background(img: Image.Image) -> Image.Image:
     return Image.fromarray(rgba, "RGBA")
 
 
-def _border_white_fraction(img: Image.Image, threshold: int = 240, border_px: int = 8) -> float:
-    """Fraction of border-strip pixels that are near-white (all channels > threshold)."""
+def _border_white_fraction(img, threshold: int = 240, border_px: int = 8) -> float:
+    """Fraction of border-strip pixels that are near-white (all channels > threshold).
+
+    Accepts a PIL image or an RGB uint8 array.
+    """
     import numpy as np
-    arr = np.array(img.convert("RGB"))
+    arr = np.asarray(img.convert("RGB")) if isinstance(img, Image.Image) else img
     h, w = arr.shape[:2]
     b = max(1, min(border_px, h // 4, w // 4))
     strips = [arr[:b, :], arr[h - b:, :], arr[b:h - b, :b], arr[b:h - b, w - b:]]
@@ -832,12 +2265,6 @@ def _border_white_fraction(img: Image.Image, threshold: int = 240, border_px: in
     return float(np.mean(np.all(border > threshold, axis=1)))
 
 
-def _alpha_coverage(img_rgba: Image.Image) -> float:
-    """Fraction of pixels with alpha > 10 (considered opaque/foreground)."""
-    import numpy as np
-    return float(np.mean(np.array(img_rgba.getchannel("A")) > 10))
-
-
 def _composite_over_white(img: Image.Image) -> Image.Image:
     """Flatten images with alpha onto white without exposing hidden transparent RGB pixels."""
     if img.mode == "RGBA":
@@ -852,81 +2279,118 @@ def _composite_over_white(img: Image.Image) -> Image.Image:
     return img.convert("RGB")
 
 
-def _alpha_border_fraction(img_rgba: Image.Image, threshold: int = 10, border_px: int = 6) -> float:
-    """Fraction of border-strip pixels still considered foreground by alpha."""
+def _quality_sample_edge_px() -> int:
+    """UFM_QUALITY_SAMPLE_EDGE_PX: estimate quality metrics on a grid with at most
+    this many samples per edge. 0 (default) measures every pixel."""
+    raw = os.environ.get("UFM_QUALITY_SAMPLE_EDGE_PX", "0").strip()
+    try:
+        v = int(raw)
+    except ValueError:
+        return 0
+    return max(0, min(v, 4096))
+
+
+def _quality_metrics(
+    alpha,
+    rgb,
+    threshold: int = 10,
+    border_px: int = 6,
+    min_component_area: int = 75,
+    sample_edge_px: int = 0,
+) -> dict:
+    """Every cutout-quality metric from one alpha plane and its RGB pixels.
+
+    The foreground mask (alpha > threshold) is built once and shared by the
+    coverage, bbox, component and light-halo measurements; the halo colour test
+    only looks at the semi-transparent foreground pixels instead of the whole
+    image.
+
+    With `sample_edge_px` > 0 the image is strided down to at most that many
+    samples per edge and the area-based metrics are estimated on the grid
+    (component areas are scaled by the stride²). The border fraction is always
+    measured on the full-resolution strips — they are cheap and it is the metric
+    closest to its thresholds.
+    """
     import numpy as np
-    alpha = np.array(img_rgba.getchannel("A"), dtype=np.uint8)
     h, w = alpha.shape[:2]
+
+    # Border strips at full resolution.
     b = max(1, min(border_px, h // 4, w // 4))
     strips = [alpha[:b, :], alpha[h - b:, :], alpha[b:h - b, :b], alpha[b:h - b, w - b:]]
-    border = np.concatenate([s.reshape(-1) for s in strips])
-    return float(np.mean(border > threshold))
-
-
-def _alpha_bbox_metrics(img_rgba: Image.Image, threshold: int = 10) -> dict:
-    import numpy as np
-    alpha = np.array(img_rgba.getchannel("A"), dtype=np.uint8)
-    mask = alpha > threshold
-    if not np.any(mask):
-        return {"bbox_area_ratio": 0.0, "bbox_fill_ratio": 0.0}
-    ys, xs = np.where(mask)
-    bbox_area = int((xs.max() - xs.min() + 1) * (ys.max() - ys.min() + 1))
-    img_area = int(alpha.shape[0] * alpha.shape[1])
-    fg_count = int(np.count_nonzero(mask))
-    return {
-        "bbox_area_ratio": float(bbox_area / img_area) if img_area else 0.0,
-        "bbox_fill_ratio": float(fg_count / bbox_area) if bbox_area else 0.0,
+    border_total = sum(s.size for s in strips)
+    border_fg = sum(int(np.count_nonzero(s > threshold)) for s in strips)
+    border_alpha = border_fg / border_total if border_total else 0.0
+
+    step = 1
+    if sample_edge_px > 0 and max(h, w) > sample_edge_px:
+        step = -(-max(h, w) // sample_edge_px)  # ceil
+        alpha = alpha[::step, ::step]
+        rgb = rgb[::step, ::step]
+        min_component_area = max(1, int(round(min_component_area / (step * step))))
+
+    fg = alpha > threshold
+    img_area = int(fg.size)
+    fg_count = int(np.count_nonzero(fg))
+    metrics = {
+        "coverage": fg_count / img_area if img_area else 0.0,
+        "border_alpha": border_alpha,
+        "bbox_area_ratio": 0.0,
+        "bbox_fill_ratio": 0.0,
+        "component_count": 0,
+        "light_halo": 0.0,
+        "sample_step": step,
     }
+    if fg_count == 0:
+        return metrics
 
+    rows = np.flatnonzero(fg.any(axis=1))
+    cols = np.flatnonzero(fg.any(axis=0))
+    bbox_area = int((cols[-1] - cols[0] + 1) * (rows[-1] - rows[0] + 1))
+    metrics["bbox_area_ratio"] = bbox_area / img_area
+    metrics["bbox_fill_ratio"] = fg_count / bbox_area
 
-def _component_count(img_rgba: Image.Image, threshold: int = 10, min_area: int = 75) -> int:
-    import numpy as np
     try:
         import cv2
+        _, _, stats, _ = cv2.connectedComponentsWithStats(fg.view(np.uint8), connectivity=8)
+        metrics["component_count"] = int(np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] >= min_component_area))
     except ImportError:
-        return 0
-    alpha = np.array(img_rgba.getchannel("A"), dtype=np.uint8)
-    mask = (alpha > threshold).astype(np.uint8) * 255
-    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
-    count = 0
-    for label_id in range(1, num_labels):
-        if int(stats[label_id, cv2.CC_STAT_AREA]) >= min_area:
-            count += 1
-    return count
+        pass
+
+    # Pale/gray semi-background retained as foreground.
+    semi = fg & (alpha < 250)
+    light = np.count_nonzero(np.all(rgb[semi] > 215, axis=1))
+    metrics["light_halo"] = int(light) / fg_count
+    return metrics
 
 
-def _light_halo_fraction(img_rgba: Image.Image) -> float:
-    """Approximate how much retained foreground is pale/gray semi-background."""
+def _cutout_quality(img_rgba, is_white_bg: bool, sample_edge_px: int | None = None) -> dict:
+    """Score a cutout and name the first failed check in `quality_reason` (None = ok).
+
+    Accepts an RGBA PIL image or an (h, w, 4) uint8 array. `sample_edge_px`
+    defaults to UFM_QUALITY_SAMPLE_EDGE_PX (0 = exact).
+    """
     import numpy as np
-    arr = np.array(img_rgba.convert("RGBA"), dtype=np.uint8)
-    rgb = arr[:, :, :3]
-    alpha = arr[:, :, 3]
-    fg = alpha > 10
-    fg_count = int(np.count_nonzero(fg))
-    if fg_count == 0:
-        return 0.0
-    light = np.all(rgb > 215, axis=2)
-    semi = (alpha > 10) & (alpha < 250)
-    return float(np.count_nonzero(fg & light & semi) / fg_count)
-
-
-def _cutout_quality(img_rgba: Image.Image, is_white_bg: bool) -> dict:
-    coverage = _alpha_coverage(img_rgba)
-    border_alpha = _alpha_border_fraction(img_rgba)
-    bbox = _alpha_bbox_metrics(img_rgba)
-    component_count = _component_count(img_rgba)
-    light_halo = _light_halo_fraction(img_rgba)
+    if isinstance(img_rgba, Image.Image):
+        img_rgba = np.asarray(img_rgba if img_rgba.mode == "RGBA" else img_rgba.convert("RGBA"))
+    if sample_edge_px is None:
+        sample_edge_px = _quality_sample_edge_px()
+    m = _quality_metrics(img_rgba[:, :, 3], img_rgba[:, :, :3], sample_edge_px=sample_edge_px)
+    coverage = m["coverage"]
+    border_alpha = m["border_alpha"]
+    component_count = m["component_count"]
+    light_halo = m["light_halo"]
+    bbox_area_ratio = m["bbox_area_ratio"]
     reason = None
 
     if coverage < 0.04:
         reason = "foreground-too-small"
-    elif (not is_white_bg) and coverage > 0.87 and bbox["bbox_area_ratio"] > 0.94:
+    elif (not is_white_bg) and coverage > 0.87 and bbox_area_ratio > 0.94:
         reason = "background-retained"
     elif border_alpha > 0.55:
         reason = "opaque-border"
     elif border_alpha > 0.22 and coverage > 0.65:
         reason = "border-background-retained"
-    elif bbox["bbox_area_ratio"] > 0.94 and coverage > 0.80:
+    elif bbox_area_ratio > 0.94 and coverage > 0.80:
         reason = "full-rectangle-mask"
     elif component_count > 25:
         reason = "fragmented-mask"
@@ -937,8 +2401,8 @@ def _cutout_quality(img_rgba: Image.Image, is_white_bg: bool) -> dict:
         "alpha_coverage": round(coverage, 3),
         "border_alpha": round(border_alpha, 3),
         "component_count": component_count,
-        "bbox_area_ratio": round(bbox["bbox_area_ratio"], 3),
-        "bbox_fill_ratio": round(bbox["bbox_fill_ratio"], 3),
+        "bbox_area_ratio": round(bbox_area_ratio, 3),
+        "bbox_fill_ratio": round(m["bbox_fill_ratio"], 3),
         "light_halo": round(light_halo, 3),
         "quality_reason": reason,
     }
@@ -970,19 +2434,18 @@ def remove_stray_blobs(
     num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
     keep_threshold = max(abs_min_px, int(total_fg * rel_threshold))
 
-    removed_count = 0
-    removed_px = 0
-    keep_mask = np.zeros_like(alpha, dtype=bool)
-    for label_id in range(1, num_labels):  # label 0 is always background in OpenCV
-        area = int(stats[label_id, cv2.CC_STAT_AREA])
-        if area >= keep_threshold:
-            keep_mask |= (labels == label_id)
-        else:
-            removed_count += 1
-            removed_px += area
+    # Per-label keep flags, then one lookup over the label image (a mask per
+    # label would rescan every pixel once per component).
+    areas = stats[:, cv2.CC_STAT_AREA]
+    keep = areas >= keep_threshold
+    keep[0] = False  # label 0 is always background in OpenCV
+    removed = ~keep[1:]
+    removed_count = int(removed.sum())
+    removed_px = int(areas[1:][removed].sum())
 
     if removed_count == 0:
         return img_rgba
+    keep_mask = keep[labels]
 
     print(
         f"[cutout] blob removal: kept {num_labels - 1 - removed_count}/{num_labels - 1} components, "
@@ -1053,250 +2516,1109 @@ def _defringe_white_bg(img_rgba: Image.Image) -> Image.Image:
     return Image.fromarray(result.astype(_np.uint8), "RGBA")
 
 
-# ---------- CUTOUT ----------
-@app.post("/cutout")
-async def cutout(request: Request, file: UploadFile = File(...), model: str | None = Form(None)):
-    async with _cutout_lock:
-        try:
-            request_model = (model or REMBG_MODEL).strip()
-            if not request_model:
-                request_model = REMBG_MODEL
-            data = await file.read()
-            if request_model != REMBG_MODEL:
-                print(f"[cutout] model override requested: {REMBG_MODEL} -> {request_model}", flush=True)
-            print(f"[cutout] received {len(data)} bytes, filename={file.filename}, content_type={file.content_type}")
+def _border_trim_stage(img: Image.Image, analysis: ImageAnalysis) -> Image.Image:
+    if not _CPU_POOL_WORKERS:
+        return border_trim_background(img, analysis=analysis)
+    h, w = analysis.shape
+    return Image.fromarray(_run_in_cpu_pool("border-trim", analysis.rgb, (h, w, 4)), "RGBA")
 
-            # If the Node.js client already aborted, skip rembg entirely
-            await asyncio.sleep(0)
-            if await request.is_disconnected():
-                print("[cutout] client disconnected before processing — skipping")
-                return JSONResponse(status_code=499, content={"error": "client disconnected"})
 
-            # Validate we can open this as an image first
+def _contour_stage(img: Image.Image, analysis: ImageAnalysis) -> Image.Image:
+    if not _CPU_POOL_WORKERS:
+        return contour_background(img, analysis)
+    h, w = analysis.shape
+    return Image.fromarray(_run_in_cpu_pool("contour-bg", analysis.rgb, (h, w, 4)), "RGBA")
+
+
+def _white_bg_substitution_stage(arr, bg_color):
+    if not _CPU_POOL_WORKERS:
+        return _substitute_white_background(arr, bg_color)
+    return _run_in_cpu_pool("white-bg", arr, bg_color=[float(c) for c in bg_color])
+
+
+def _blob_removal_stage(img_rgba: Image.Image) -> Image.Image:
+    if not _CPU_POOL_WORKERS:
+        return remove_stray_blobs(img_rgba)
+    import numpy as np
+    arr = np.asarray(img_rgba)
+    return Image.fromarray(_run_in_cpu_pool("blob-removal", arr, arr.shape), "RGBA")
+
+
+async def _speculative_classical(img: Image.Image, analysis: ImageAnalysis):
+    """Race border-trim against contour-bg on a white-background image.
+
+    Both run on worker threads (their heavy steps are NumPy / OpenCV calls that
+    release the GIL, so they occupy separate cores). A winner is taken as soon
+    as it is decidable, walking candidates in priority order: border-trim wins
+    the moment it passes _cutout_quality; contour-bg wins as soon as it passes
+    *and* border-trim has finished and failed. contour-bg usually finishes
+    first on white backgrounds, so a plain first-to-pass race would swap the
+    primary algorithm on images border-trim handles; with this tie-break the
+    result is always the one the sequential path would return, only sooner.
+    If neither passes, the border-trim result is returned (low confidence).
+    The loser is discarded; a still-running loser finishes in the background
+    and its result is dropped.
+
+    Returns (img, quality, model_used).
+    """
+    import time as _time
+    t0 = _time.perf_counter()
+    # Shared inputs of both stages — compute once before the threads fork.
+    analysis.near_white
+
+    def _border_trim():
+        out = _defringe_white_bg(_border_trim_stage(img, analysis))
+        return out, _cutout_quality(out, True)
+
+    def _contour():
+        out = _contour_stage(img, analysis)
+        return out, _cutout_quality(out, True)
+
+    order = ("border-trim", "contour-bg")
+    tasks = {
+        asyncio.ensure_future(asyncio.to_thread(_border_trim)): "border-trim",
+        asyncio.ensure_future(asyncio.to_thread(_contour)): "contour-bg",
+    }
+    results: dict = {}
+    errors: dict = {}
+    winner = None
+    pending = set(tasks)
+    while pending and winner is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = tasks[task]
             try:
-                src_img = Image.open(io.BytesIO(data))
-                print(f"[cutout] input image: format={src_img.format}, size={src_img.size}, mode={src_img.mode}")
-                src_img = _maybe_downscale_for_rembg(src_img, request_model)
-                # Convert animated / palette / CMYK images to RGBA for rembg compatibility
-                if src_img.mode not in ("RGB", "RGBA"):
-                    src_img = src_img.convert("RGBA")
-                    buf = io.BytesIO()
-                    src_img.save(buf, format="PNG")
-                    data = buf.getvalue()
-                    print(f"[cutout] converted to RGBA PNG ({len(data)} bytes)")
+                results[name] = task.result()
             except Exception as e:
-                print(f"[cutout] PIL cannot open input: {e}")
-                return JSONResponse(status_code=400, content={"error": f"Invalid image: {e}"})
+                errors[name] = e
+                print(f"[speculative] {name} failed: {e}", flush=True)
+        for name in order:
+            if name not in results and name not in errors:
+                break  # higher-priority candidate still running — cannot decide yet
+            if name in results and results[name][1]["quality_reason"] is None:
+                winner = name
+                break
 
-            # ── Border-trim fast path (no ML model) ──────────────────────────────
-            # Flood-fill from image perimeter removes edge-connected background
-            # directly as alpha transparency. Bypasses all model loading / padding.
-            if request_model == "border-trim":
-                # If the input is an RGBA image (e.g. a shadow/cutout PNG re-sent for
-                # a redo), PIL's convert("RGB") would fill transparent pixels with black,
-                # making bg=(0,0,0) and causing dark product pixels to be eaten.
-                # Composite over white first so transparent areas become white background.
-                if src_img.mode == "RGBA":
-                    src_img_bt = _composite_over_white(src_img)
-                    print("[border-trim] RGBA input composited over white before BFS")
-                else:
-                    src_img_bt = src_img
-                img_bt = await asyncio.to_thread(border_trim_background, src_img_bt)
-                is_white_bg_bt = _border_white_fraction(src_img_bt) > 0.85
-                if is_white_bg_bt:
-                    img_bt = _defringe_white_bg(img_bt)
-                quality = _cutout_quality(img_bt, is_white_bg_bt)
-
-                # If border-trim is low-confidence on a white-background image,
-                # try the contour-based approach before falling back to heavy ML.
-                model_used = "border-trim"
-                if quality["quality_reason"] is not None and is_white_bg_bt:
-                    print("[border-trim] low confidence on white-bg — trying contour-bg", flush=True)
-                    img_cb = await asyncio.to_thread(contour_background, src_img_bt)
-                    quality_cb = _cutout_quality(img_cb, is_white_bg_bt)
-                    if quality_cb["quality_reason"] is None:
-                        img_bt = img_cb
-                        quality = quality_cb
-                        model_used = "contour-bg"
-                        print("[border-trim] contour-bg passed quality check — using it", flush=True)
-                    else:
-                        print("[border-trim] contour-bg also low confidence — leaving for ML fallback", flush=True)
-
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-                    img_bt.save(f.name, format="PNG")
-                    return {
-                        "output_path": f.name,
-                        "alpha_coverage": quality["alpha_coverage"],
-                        "low_confidence": quality["quality_reason"] is not None,
-                        "model": model_used,
-                        **quality,
-                    }
-
-            # ── Contour-cut fast path (largest-enclosed-shape, no ML model) ─────
-            # Edge-detection based: finds the largest closed contour that does not
-            # touch the image border.  Works even when product colour == background
-            # colour (transparent bags, white products on white surfaces).
-            if request_model == "contour-bg":
-                if src_img.mode == "RGBA":
-                    src_img_cb = _composite_over_white(src_img)
-                    print("[contour-bg] RGBA input composited over white", flush=True)
-                else:
-                    src_img_cb = src_img
-                img_cb = await asyncio.to_thread(contour_background, src_img_cb)
-                is_white_bg_cb = _border_white_fraction(src_img_cb) > 0.85
-                if is_white_bg_cb:
-                    img_cb = _defringe_white_bg(img_cb)
-                quality_cb = _cutout_quality(img_cb, is_white_bg_cb)
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-                    img_cb.save(f.name, format="PNG")
-                    return {
-                        "output_path": f.name,
-                        "alpha_coverage": quality_cb["alpha_coverage"],
-                        "low_confidence": quality_cb["quality_reason"] is not None,
-                        "model": "contour-bg",
-                        **quality_cb,
-                    }
-
-            # Option B: detect clean white background before rembg.
-            # White-background images (official product shots) work fine with rembg, but
-            # knowing the bg is clean lets us skip the false-positive high-coverage check.
-            white_bg_fraction = _border_white_fraction(src_img)
-            is_white_bg = white_bg_fraction > 0.85
-            if is_white_bg:
-                print(f"[cutout] white background detected ({white_bg_fraction:.0%}) — rembg should produce clean result", flush=True)
-
-            # For white-background images, substitute the corner-connected white background
-            # with mid-gray before sending to the model. This gives all models (rembg,
-            # BiRefNet, SAM) a visible contrast edge to work with when the product itself
-            # is light-coloured or white. The alpha mask from the model is later re-applied
-            # to the *original* pixels so product colours are fully preserved.
-            BORDER = 40
-            src_rgb = _composite_over_white(src_img)
-            if is_white_bg:
-                model_input_rgb = await asyncio.to_thread(_substitute_white_background, src_rgb)
-                pad_color = (140, 140, 140)  # contrasting gray — not white — so edge is visible
-            else:
-                model_input_rgb = src_rgb
-                pad_color = (255, 255, 255)
-            padded = Image.new("RGB", (src_img.width + BORDER * 2, src_img.height + BORDER * 2), pad_color)
-            padded.paste(model_input_rgb, (BORDER, BORDER))
-            pad_buf = io.BytesIO()
-            padded.save(pad_buf, format="PNG")
-            padded_data = pad_buf.getvalue()
-
-            # Wait for background model load (handles first-time download gracefully)
-            if not _model_ready.is_set():
-                print("[cutout] waiting for model to finish loading …", flush=True)
-                await asyncio.to_thread(_model_ready.wait, 3600)
-            request_uses_bria = _is_bria_model(request_model)
+    for task in pending:
+        # Threads cannot be interrupted — drop the result (and any error) when it lands.
+        task.add_done_callback(lambda t: t.exception())
+
+    if winner is None:
+        if "border-trim" not in results:
+            raise errors["border-trim"]
+        winner = "border-trim"
+        print("[speculative] neither candidate passed quality check — leaving for ML fallback", flush=True)
+    out, quality = results[winner]
+    loser = "contour-bg" if winner == "border-trim" else "border-trim"
+    print(
+        f"[speculative] winner={winner} in {(_time.perf_counter() - t0) * 1000:.0f} ms "
+        f"({loser} {'discarded' if loser in results else 'still running — discarded'})",
+        flush=True,
+    )
+    return out, quality, winner
+
+
+# ---------- CUTOUT ----------
+_CLASSICAL_MODELS = ("border-trim", "contour-bg")
+
+
+class _CutoutStageError(Exception):
+    """A cutout stage failed in a way the endpoint reports with a specific HTTP status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _prepare_cutout_source(img: Image.Image, model_name: str) -> Image.Image:
+    """Downscale for `model_name` and normalise the mode to RGB / RGBA.
+
+    `img` may be a lazily-opened PIL image; it is decoded once and can be
+    prepared again for another model without re-reading the upload.
+    """
+    img = _maybe_downscale_for_rembg(img, model_name)
+    # Convert animated / palette / CMYK images to RGBA for rembg compatibility
+    if img.mode not in ("RGB", "RGBA"):
+        print(f"[cutout] converting {img.mode} input to RGBA")
+        img = img.convert("RGBA")
+    return img
+
+
+def _opaque_source(src_img: Image.Image) -> Image.Image:
+    # If the input is an RGBA image (e.g. a shadow/cutout PNG re-sent for
+    # a redo), PIL's convert("RGB") would fill transparent pixels with black,
+    # making bg=(0,0,0) and causing dark product pixels to be eaten.
+    # Composite over white once so transparent areas become white background;
+    # every stage shares this opaque image and its ImageAnalysis.
+    if src_img.mode == "RGBA":
+        print("[cutout] RGBA input composited over white", flush=True)
+        return _composite_over_white(src_img)
+    return src_img
+
+
+async def _classical_cutout(src_opaque: Image.Image, analysis: ImageAnalysis, model_name: str):
+    """Run border-trim (with its contour-bg fallback) or contour-bg. Returns (img, quality, model_used)."""
+    # ── Contour-cut (largest-enclosed-shape, no ML model) ──────────────────────
+    # Edge-detection based: finds the largest closed contour that does not
+    # touch the image border.  Works even when product colour == background
+    # colour (transparent bags, white products on white surfaces).
+    if model_name == "contour-bg":
+        img_cb = await asyncio.to_thread(_contour_stage, src_opaque, analysis)
+        if analysis.is_white_bg:
+            img_cb = _defringe_white_bg(img_cb)
+        return img_cb, _cutout_quality(img_cb, analysis.is_white_bg), "contour-bg"
+
+    # ── Border-trim (no ML model) ──────────────────────────────────────────────
+    # Flood-fill from image perimeter removes edge-connected background
+    # directly as alpha transparency. Bypasses all model loading / padding.
+    if _SPECULATIVE_CLASSICAL and analysis.is_white_bg:
+        return await _speculative_classical(src_opaque, analysis)
+
+    img_bt = await asyncio.to_thread(_border_trim_stage, src_opaque, analysis)
+    is_white_bg_bt = analysis.is_white_bg
+    if is_white_bg_bt:
+        img_bt = _defringe_white_bg(img_bt)
+    quality = _cutout_quality(img_bt, is_white_bg_bt)
+
+    # If border-trim is low-confidence on a white-background image,
+    # try the contour-based approach before falling back to heavy ML.
+    model_used = "border-trim"
+    if quality["quality_reason"] is not None and is_white_bg_bt:
+        print("[border-trim] low confidence on white-bg — trying contour-bg", flush=True)
+        img_cb = await asyncio.to_thread(_contour_stage, src_opaque, analysis)
+        quality_cb = _cutout_quality(img_cb, is_white_bg_bt)
+        if quality_cb["quality_reason"] is None:
+            img_bt = img_cb
+            quality = quality_cb
+            model_used = "contour-bg"
+            print("[border-trim] contour-bg passed quality check — using it", flush=True)
+        else:
+            print("[border-trim] contour-bg also low confidence — leaving for ML fallback", flush=True)
+    return img_bt, quality, model_used
+
+
+# Border (px) added around the model input; _build_model_input pads, _ml_finish crops.
+_ML_INPUT_BORDER = 40
+
+
+def _ml_prepare(src_img: Image.Image, model_name: str, analysis: ImageAnalysis | None = None) -> dict:
+    """CPU half of an ML cutout before inference: analysis + padded model input."""
+    if analysis is None:
+        analysis = ImageAnalysis(_opaque_source(src_img))
+
+    # Option B: detect clean white background before rembg.
+    # White-background images (official product shots) work fine with rembg, but
+    # knowing the bg is clean lets us skip the false-positive high-coverage check.
+    if analysis.is_white_bg:
+        print(f"[cutout] white background detected ({analysis.white_fraction:.0%}) — rembg should produce clean result", flush=True)
+
+    # For white-background images, substitute the corner-connected white background
+    # with mid-gray before sending to the model. This gives all models (rembg,
+    # BiRefNet, SAM) a visible contrast edge to work with when the product itself
+    # is light-coloured or white. The alpha mask from the model is later re-applied
+    # to the *original* pixels so product colours are fully preserved.
+    padded = _build_model_input(analysis, _ML_INPUT_BORDER)
+    return {"analysis": analysis, "padded": padded, "is_white_bg": analysis.is_white_bg}
+
+
+async def _ml_infer(paddeds: list, model_name: str) -> list:
+    """Masks for prepared model inputs — one batched ORT run where the session allows it.
+
+    Raises _CutoutStageError(503) when the requested model failed to load.
+    """
+    # Wait for background model load (handles first-time download gracefully)
+    if not _model_ready.is_set():
+        print("[cutout] waiting for model to finish loading …", flush=True)
+        await asyncio.to_thread(_model_ready.wait, 3600)
+    # Only the model run itself is serialised; callers do their CPU stages outside.
+    async with _model_gate.slot():
+        # Reloads the default model on demand if it was unloaded while idle.
+        lifecycle = _primary_model if model_name == REMBG_MODEL else None
+        if lifecycle is not None:
+            if lifecycle.state != "warm":
+                print(f"[cutout] {model_name} is {lifecycle.state} — loading on demand", flush=True)
+            await asyncio.to_thread(lifecycle.acquire)
+        try:
+            request_uses_bria = _is_bria_model(model_name)
             if request_uses_bria and _bria_model is None:
-                return JSONResponse(status_code=503, content={"error": "BRIA model failed to load"})
-            if not request_uses_bria and request_model != "border-trim" and request_model == REMBG_MODEL and _rembg_session is None:
-                return JSONResponse(status_code=503, content={"error": "Model failed to load"})
+                raise _CutoutStageError(503, "BRIA model failed to load")
+            if not request_uses_bria and model_name == REMBG_MODEL and _rembg_session is None:
+                raise _CutoutStageError(503, "Model failed to load")
 
             before_mb = _rss_mb()
-            print(f"[mem] before inference ({request_model}, {padded.width}x{padded.height}px): {before_mb:.0f} MB", flush=True)
+            shape = f"{paddeds[0].shape[1]}x{paddeds[0].shape[0]}px"
+            if len(paddeds) > 1:
+                shape = f"{len(paddeds)} images, first {shape}"
+            print(f"[mem] before inference ({model_name}, {shape}): {before_mb:.0f} MB", flush=True)
             if request_uses_bria:
-                out_padded, peak_mb = await asyncio.to_thread(
-                    _run_with_peak_rss, _run_bria_inference, padded_data
+                masks, peak_mb = await asyncio.to_thread(
+                    _run_with_peak_rss, lambda: [_run_bria_inference(p) for p in paddeds]
                 )
-            elif request_model != REMBG_MODEL:
-                out_padded, peak_mb = await asyncio.to_thread(
-                    _run_with_peak_rss, _run_rembg_with_new_session, padded_data, request_model
+            elif model_name != REMBG_MODEL:
+                masks, peak_mb = await asyncio.to_thread(
+                    _run_with_peak_rss, _run_rembg_with_new_session, paddeds, model_name
                 )
             else:
-                out_padded, peak_mb = await asyncio.to_thread(
-                    _run_with_peak_rss, remove, padded_data, session=_rembg_session
+                masks, peak_mb = await asyncio.to_thread(
+                    _run_with_peak_rss, _rembg_masks, paddeds, _rembg_session, model_name, _ort_run_options(model_name)
                 )
-            after_mb = _rss_mb()
-            print(f"[mem] inference peak: {peak_mb:.0f} MB  (after={after_mb:.0f} MB, delta=+{peak_mb - before_mb:.0f} MB)", flush=True)
-
-            if _ORT_PROFILE and not _ort_profile_state["fired"]:
-                _ort_profile_state["fired"] = True
-                import glob as _glob
-                profiles = sorted(_glob.glob(f"{_ort_profile_prefix}*.json"))
-                if profiles:
-                    await asyncio.to_thread(_summarize_ort_profile, profiles[-1])
-                else:
-                    print(f"[ort-profile] WARNING: no JSON found at prefix {_ort_profile_prefix}", flush=True)
+        finally:
+            if lifecycle is not None:
+                lifecycle.release()
+    after_mb = _rss_mb()
+    print(f"[mem] inference peak: {peak_mb:.0f} MB  (after={after_mb:.0f} MB, delta=+{peak_mb - before_mb:.0f} MB)", flush=True)
+
+    if _ORT_PROFILE and not _ort_profile_state["fired"]:
+        _ort_profile_state["fired"] = True
+        import glob as _glob
+        profiles = sorted(_glob.glob(f"{_ort_profile_prefix}*.json"))
+        if profiles:
+            await asyncio.to_thread(_summarize_ort_profile, profiles[-1])
+        else:
+            print(f"[ort-profile] WARNING: no JSON found at prefix {_ort_profile_prefix}", flush=True)
+    return masks
 
-            src_w, src_h = src_img.width, src_img.height
-            # Preserve original pixels for re-application when background was substituted.
-            original_rgb_for_mask = src_rgb if is_white_bg else None
-            del data, src_img, src_rgb, model_input_rgb, padded, pad_buf, padded_data  # free input buffers before GC so they're actually collected
-            gc.collect()
-            print(f"[mem] after gc.collect(): {_rss_mb():.0f} MB", flush=True)
-            print(f"[cutout] rembg produced {len(out_padded)} bytes")
-
-            # Crop back to the original dimensions (strip the added border)
-            padded_result = Image.open(io.BytesIO(out_padded)).convert("RGBA")
-            img = padded_result.crop((BORDER, BORDER, BORDER + src_w, BORDER + src_h))
-
-            # Re-apply alpha mask to original (non-substituted) pixels so the product
-            # retains its true colours — the gray-substituted version was only used to
-            # help the model find edges, not as the final colour source.
-            if original_rgb_for_mask is not None:
-                import numpy as _np
-                alpha_channel = _np.array(img.getchannel("A"))
-                orig_rgba = original_rgb_for_mask.convert("RGBA")
-                orig_arr = _np.array(orig_rgba)
-                orig_arr[:, :, 3] = alpha_channel
-                img = Image.fromarray(orig_arr, "RGBA")
-                del original_rgb_for_mask
-                img = _defringe_white_bg(img)
-
-            # Remove floating brand badge blobs (small disconnected foreground islands)
-            if _BLOB_REMOVAL:
-                img = remove_stray_blobs(img)
-
-            img = normalize_orientation(img)
-
-            quality = _cutout_quality(img, is_white_bg)
-            coverage = quality["alpha_coverage"]
-            low_confidence = quality["quality_reason"] is not None
-            if low_confidence:
-                print(
-                    f"[cutout] low confidence cutout: reason={quality['quality_reason']}, "
-                    f"coverage={coverage:.1%}, border_alpha={quality['border_alpha']:.1%}, "
-                    f"components={quality['component_count']}, white_bg={is_white_bg}",
-                    flush=True,
-                )
+
+def _ml_finish(prepared: dict, mask_padded, model_name: str):
+    """CPU half of an ML cutout after inference. Consumes `prepared`; returns (img, quality)."""
+    import numpy as _np
+    analysis, padded, is_white_bg = prepared.pop("analysis"), prepared.pop("padded"), prepared["is_white_bg"]
+    BORDER = _ML_INPUT_BORDER
+    src_h, src_w = analysis.shape
+    # Crop back to the original dimensions (strip the added border)
+    alpha = mask_padded[BORDER:BORDER + src_h, BORDER:BORDER + src_w]
+    # Re-apply alpha mask to original (non-substituted) pixels so the product
+    # retains its true colours — the gray-substituted version was only used to
+    # help the model find edges, not as the final colour source.
+    if is_white_bg:
+        out_rgba = _np.dstack((analysis.rgb, alpha))
+    elif _is_bria_model(model_name):
+        out_rgba = _np.dstack((padded[BORDER:BORDER + src_h, BORDER:BORDER + src_w], alpha))
+    else:
+        # rembg's own output blends RGB toward transparent black by the mask.
+        out_rgba = _naive_cutout_array(padded[BORDER:BORDER + src_h, BORDER:BORDER + src_w], alpha)
+    del padded, analysis, mask_padded, alpha  # free input buffers before GC so they're actually collected
+    gc.collect()
+    print(f"[mem] after gc.collect(): {_rss_mb():.0f} MB", flush=True)
+    print(f"[cutout] model produced {src_w}x{src_h} alpha mask")
+
+    img = Image.fromarray(out_rgba, "RGBA")
+    del out_rgba
+    if is_white_bg:
+        img = _defringe_white_bg(img)
+
+    # Remove floating brand badge blobs (small disconnected foreground islands)
+    if _BLOB_REMOVAL:
+        img = _blob_removal_stage(img)
+
+    img = normalize_orientation(img)
+
+    quality = _cutout_quality(img, is_white_bg)
+    coverage = quality["alpha_coverage"]
+    if quality["quality_reason"] is not None:
+        print(
+            f"[cutout] low confidence cutout: reason={quality['quality_reason']}, "
+            f"coverage={coverage:.1%}, border_alpha={quality['border_alpha']:.1%}, "
+            f"components={quality['component_count']}, white_bg={is_white_bg}",
+            flush=True,
+        )
+    else:
+        print(
+            f"[cutout] cutout ok: coverage={coverage:.1%}, "
+            f"border_alpha={quality['border_alpha']:.1%}, white_bg={is_white_bg}",
+            flush=True,
+        )
+    return img, quality
+
+
+async def _ml_cutout(src_img: Image.Image, model_name: str, analysis: ImageAnalysis | None = None):
+    """Run one ML model (rembg session or BRIA) on a prepared source. Returns (img, quality).
+
+    Raises _CutoutStageError(503) when the requested model failed to load.
+    """
+    async with _cutout_workers.slot():
+        prepared = await asyncio.to_thread(_ml_prepare, src_img, model_name, analysis)
+    del analysis
+    (mask_padded,) = await _ml_infer([prepared["padded"]], model_name)
+    async with _cutout_workers.slot():
+        return await asyncio.to_thread(_ml_finish, prepared, mask_padded, model_name)
+
+
+async def _cutout_stage(src_full: Image.Image, model_name: str, shared: dict | None = None):
+    """Prepare `src_full` for `model_name` and run it. Returns (img, quality, model_used).
+
+    `shared` carries the opaque source + ImageAnalysis between stages of one
+    request so a stage at the same resolution reuses them.
+    """
+    def _sources():
+        src_img = _prepare_cutout_source(src_full, model_name)
+        if shared is not None and shared.get("size") == src_img.size:
+            return src_img, shared["opaque"], shared["analysis"]
+        src_opaque = _opaque_source(src_img)
+        analysis = ImageAnalysis(src_opaque)
+        if shared is not None:
+            shared.update(size=src_img.size, opaque=src_opaque, analysis=analysis)
+        return src_img, src_opaque, analysis
+
+    async with _cutout_workers.slot():
+        src_img, src_opaque, analysis = await asyncio.to_thread(_sources)
+        if model_name in _CLASSICAL_MODELS:
+            return await _classical_cutout(src_opaque, analysis, model_name)
+    img, quality = await _ml_cutout(src_img, model_name, analysis)
+    return img, quality, model_name
+
+
+_RAW_CHANNEL_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+
+
+async def _read_cutout_input(
+    file: UploadFile | None,
+    image_path: str | None,
+    raw_path: str | None,
+    raw_width: int | None,
+    raw_height: int | None,
+    raw_channels: int | None,
+    tag: str = "cutout",
+) -> Image.Image:
+    """Open the cutout input from an upload, a local image path, or a raw pixel file.
+
+    Local callers (Electron main) pass `image_path` so the file is never wrapped
+    in multipart and buffered here, or `raw_path` + shape for an uncompressed
+    HxWxC uint8 buffer that is read in one call instead of decoded.
+    Raises ValueError / OSError for missing or malformed input.
+    """
+    if raw_path:
+        import numpy as np
+        path = _normalize_local_path(raw_path)
+        if not raw_width or not raw_height or raw_channels not in _RAW_CHANNEL_MODES:
+            raise ValueError("raw_path requires raw_width, raw_height and raw_channels (1, 3 or 4)")
+        expected = raw_width * raw_height * raw_channels
+        actual = os.path.getsize(path)
+        if actual != expected:
+            raise ValueError(
+                f"raw buffer is {actual} bytes, expected {expected} for {raw_width}x{raw_height}x{raw_channels}"
+            )
+        shape = (raw_height, raw_width) if raw_channels == 1 else (raw_height, raw_width, raw_channels)
+        # Read, not memory-mapped: a live mapping would keep the file open for the
+        # whole request, and on Windows the client could not delete its temp file.
+        pixels = np.fromfile(path, dtype=np.uint8, count=expected).reshape(shape)
+        img = Image.fromarray(pixels)
+        print(f"[{tag}] raw input: {path} ({raw_width}x{raw_height}, {_RAW_CHANNEL_MODES[raw_channels]})")
+        return img
+    if image_path:
+        path = _normalize_local_path(image_path)
+        if not os.path.isfile(path):
+            raise ValueError(f"image_path does not exist: {image_path!r}")
+        print(f"[{tag}] reading {path} ({os.path.getsize(path)} bytes)")
+        return Image.open(path)
+    if file is None:
+        raise ValueError("one of file, image_path or raw_path is required")
+    data = await file.read()
+    print(f"[{tag}] received {len(data)} bytes, filename={file.filename}, content_type={file.content_type}")
+    return Image.open(io.BytesIO(data))
+
+
+# Output encodings: (file suffix, PIL format, save kwargs, alpha channel only).
+# Encode time / size for a ~0.35 MP RGBA photo cutout (noisy, 6 images):
+#   png       258 ms  764 KB     png-raw   36 ms  1382 KB     mask  2 ms  5 KB
+#   png-fast   79 ms  870 KB     webp      16 ms   290 KB
+# "mask" is an 8-bit alpha PNG for callers that already hold the original RGB.
+# "webp" is lossless with exact=True so RGB under transparent pixels survives
+# (/interactive-cutout may reuse a cutout as its SAM source).
+_CUTOUT_OUTPUT_FORMATS = {
+    "png": (".png", "PNG", {}, False),
+    "png-fast": (".png", "PNG", {"compress_level": 1}, False),
+    "png-raw": (".png", "PNG", {"compress_level": 0}, False),
+    "webp": (".webp", "WEBP", {"lossless": True, "quality": 0, "method": 0, "exact": True}, False),
+    "mask": (".png", "PNG", {"compress_level": 1}, True),
+}
+
+
+def _resolve_output_format(output_format: str | None) -> str:
+    name = (output_format or _CUTOUT_OUTPUT_FORMAT).strip().lower()
+    if name not in _CUTOUT_OUTPUT_FORMATS:
+        raise _CutoutStageError(
+            400, f"Unknown output_format {name!r} (expected one of {', '.join(_CUTOUT_OUTPUT_FORMATS)})"
+        )
+    return name
+
+
+def _write_cutout_output(img: Image.Image, output_format: str) -> str:
+    suffix, pil_format, save_kwargs, alpha_only = _CUTOUT_OUTPUT_FORMATS[output_format]
+    if alpha_only:
+        img = img.getchannel("A")
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        img.save(f.name, format=pil_format, **save_kwargs)
+        return f.name
+
+
+def _save_cutout(img: Image.Image, quality: dict, model_used: str, output_format: str = "png") -> dict:
+    output_path = _write_cutout_output(img, output_format)
+    print(f"[cutout] saved to {output_path} ({output_format})")
+    return {
+        "output_path": output_path,
+        "output_format": output_format,
+        "alpha_coverage": quality["alpha_coverage"],
+        "low_confidence": quality["quality_reason"] is not None,
+        "model": model_used,
+        **quality,
+    }
+
+
+# ── On-disk result caches ─────────────────────────────────────────────────────
+class _DiskLruCache:
+    """
+    Size-bounded LRU of JSON results on disk, content-addressed by the caller's key.
+
+    <key>.json holds {"suffix", "result"}; a result that comes with an output
+    file keeps a copy of it in <key><suffix>. LRU order is the .json mtime, so
+    it survives restarts. A budget of 0 MB disables the cache.
+    """
+
+    def __init__(self, tag: str, directory: str, budget_mb: float):
+        from collections import OrderedDict
+        self.tag = tag
+        self.directory = directory
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> (output file or None, bytes incl. metadata)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def _load(self):
+        # Caller holds _lock. Index whatever earlier runs left behind, oldest first.
+        self._loaded = True
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path) as f:
+                    suffix = json.load(f)["suffix"]
+                data_path = os.path.join(self.directory, key + suffix) if suffix else None
+                size = os.path.getsize(meta_path) + (os.path.getsize(data_path) if data_path else 0)
+                found.append((os.path.getmtime(meta_path), key, data_path, size))
+            except (OSError, ValueError, KeyError):
+                continue
+        for _, key, data_path, size in sorted(found):
+            self._entries[key] = (data_path, size)
+        self._evict()
+
+    def _evict(self):
+        while self._entries and self._bytes() > self.budget_bytes:
+            key, (data_path, _) = self._entries.popitem(last=False)
+            self._remove_files(key, data_path)
+            self.evictions += 1
+
+    def _remove_files(self, key: str, data_path: str | None):
+        for p in (data_path, self._meta_path(key)):
+            if p:
+                with contextlib.suppress(OSError):
+                    os.remove(p)
+
+    def _bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def get(self, key: str):
+        """(result, fresh copy of the output file or None), or None on a miss."""
+        import shutil
+        output_path = None
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(key)
+            if entry is not None:
+                try:
+                    with open(self._meta_path(key)) as f:
+                        result = json.load(f)["result"]
+                    if entry[0]:
+                        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(entry[0])[1], delete=False) as out:
+                            output_path = out.name
+                        shutil.copyfile(entry[0], output_path)
+                    os.utime(self._meta_path(key))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"[{self.tag}] dropping unreadable entry {key[:12]}: {e}", flush=True)
+                    del self._entries[key]
+                    self._remove_files(key, entry[0])
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return result, output_path
+
+    def put(self, key: str, result, output_path: str | None = None) -> bool:
+        """Store `result` (JSON-able) and a copy of `output_path`. Returns False if it can never fit."""
+        import shutil
+        suffix = os.path.splitext(output_path)[1] if output_path else None
+        data_path = os.path.join(self.directory, key + suffix) if output_path else None
+        meta_path = self._meta_path(key)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            try:
+                if output_path:
+                    if os.path.getsize(output_path) > self.budget_bytes:
+                        self.rejected += 1
+                        return False
+                    shutil.copyfile(output_path, data_path + ".tmp")
+                    os.replace(data_path + ".tmp", data_path)
+                with open(meta_path + ".tmp", "w") as f:
+                    json.dump({"suffix": suffix, "result": result}, f, ensure_ascii=False)
+                os.replace(meta_path + ".tmp", meta_path)
+                size = os.path.getsize(meta_path) + (os.path.getsize(data_path) if data_path else 0)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[{self.tag}] could not store {key[:12]}: {e}", flush=True)
+                self.rejected += 1
+                return False
+            self._entries[key] = (data_path, size)
+            self._entries.move_to_end(key)
+            self._evict()
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": self._bytes(),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+            }
+
+
+def _hash_file(path: str, h) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+# The same product photos are cut out over and over (Serper retries, re-runs,
+# re-imported sheets). /cutout, /cutout/auto and /cutout/batch results are cached
+# under a SHA-256 of the input bytes plus the model (for /cutout/auto, the whole
+# cascade), output format and every setting that changes the pixels; a hit copies
+# the stored file out and returns its quality metrics without decoding the image.
+# UFM_CUTOUT_CACHE_MB=0 disables it.
+_CUTOUT_CACHE_MB = float(os.environ.get("UFM_CUTOUT_CACHE_MB", "512"))
+_CUTOUT_CACHE_DIR = os.environ.get("UFM_CUTOUT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ufm-cutout-cache")
+_CUTOUT_CACHE_VERSION = 1  # bump when a pipeline change alters results for unchanged settings
+_cutout_cache = _DiskLruCache("cutout-cache", _CUTOUT_CACHE_DIR, _CUTOUT_CACHE_MB)
+
+
+@lru_cache(maxsize=None)
+def _dist_versions(dists: tuple) -> tuple:
+    """Installed versions of `dists` (None when missing), for cache keys."""
+    from importlib import metadata
+    versions = []
+    for dist in dists:
+        try:
+            versions.append(metadata.version(dist))
+        except metadata.PackageNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+
+async def _cutout_cache_key(
+    file: UploadFile | None,
+    image_path: str | None,
+    raw_path: str | None,
+    raw_width: int | None,
+    raw_height: int | None,
+    raw_channels: int | None,
+    model_name: str,
+    output_format: str,
+    cascade: tuple = (),
+) -> str | None:
+    """Cache key for a /cutout, /cutout/auto or /cutout/batch input, or None when the cache is
+    off or the input can't be read (the normal input path then reports the error).
+    `cascade` lists whatever else picks the models that run (see cutout_auto)."""
+    import hashlib
+    if not _cutout_cache.enabled:
+        return None
+    h = hashlib.sha256()
+    settings = (
+        _CUTOUT_CACHE_VERSION,
+        model_name,
+        cascade,
+        output_format,
+        _cutout_max_edge_px(),
+        _BLOB_REMOVAL,
+        _SPECULATIVE_CLASSICAL,
+        _ORT_DIRECT,
+        _quality_sample_edge_px(),
+        _BORDER_TRIM_TOLERANCE,
+        _BORDER_TRIM_FEATHER_PX,
+        # Model weights ship with the rembg release; ORT upgrades can shift mask values.
+        _dist_versions(("rembg", "onnxruntime")),
+    )
+    h.update(repr(settings).encode())
+    try:
+        if raw_path:
+            h.update(repr(("raw", raw_width, raw_height, raw_channels)).encode())
+            await asyncio.to_thread(_hash_file, _normalize_local_path(raw_path), h)
+        elif image_path:
+            await asyncio.to_thread(_hash_file, _normalize_local_path(image_path), h)
+        elif file is not None:
+            data = await file.read()
+            await file.seek(0)
+            h.update(data)
+        else:
+            return None
+    except (OSError, TypeError):
+        return None
+    return h.hexdigest()
+
+
+def _cache_cutout_result(key: str, result: dict) -> bool:
+    return _cutout_cache.put(key, {k: v for k, v in result.items() if k != "output_path"}, result["output_path"])
+
+
+@app.post("/cutout")
+async def cutout(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile | None = File(None),
+    model: str | None = Form(None),
+    image_path: str | None = Form(None),
+    raw_path: str | None = Form(None),
+    raw_width: int | None = Form(None),
+    raw_height: int | None = Form(None),
+    raw_channels: int | None = Form(None),
+    output_format: str | None = Form(None),
+    priority: str | None = Form(None),
+):
+    """
+    Cut out one image. The input is either an uploaded `file`, a local
+    `image_path`, or a raw uint8 pixel file (`raw_path` + `raw_width` /
+    `raw_height` / `raw_channels`) that is read as-is rather than decoded.
+    `output_format` picks the result encoding (see _CUTOUT_OUTPUT_FORMATS);
+    `priority` (interactive | batch | background, default batch) orders the
+    request in the scheduling queues. Repeat requests are answered from the
+    result cache and carry `"cached": true`.
+    """
+    try:
+        _start_job("cutout", request, priority)
+        output_format = _resolve_output_format(output_format)
+        request_model = (model or REMBG_MODEL).strip()
+        if not request_model:
+            request_model = REMBG_MODEL
+        if request_model != REMBG_MODEL:
+            print(f"[cutout] model override requested: {REMBG_MODEL} -> {request_model}", flush=True)
+
+        # If the Node.js client already aborted, skip rembg entirely
+        await asyncio.sleep(0)
+        if await request.is_disconnected():
+            print("[cutout] client disconnected before processing — skipping")
+            return JSONResponse(status_code=499, content={"error": "client disconnected"})
+
+        cache_key = await _cutout_cache_key(
+            file, image_path, raw_path, raw_width, raw_height, raw_channels, request_model, output_format
+        )
+        if cache_key:
+            hit = await asyncio.to_thread(_cutout_cache.get, cache_key)
+            if hit is not None:
+                cached, output_path = hit
+                print(f"[cutout] cache hit {cache_key[:12]} ({request_model}) -> {output_path}", flush=True)
+                return {**cached, "output_path": output_path, "cached": True}
+
+        async with _cutout_workers.slot():
+            # Validate we can open this as an image first
+            try:
+                src_full = await _read_cutout_input(file, image_path, raw_path, raw_width, raw_height, raw_channels)
+                print(f"[cutout] input image: format={src_full.format}, size={src_full.size}, mode={src_full.mode}")
+                src_img = await asyncio.to_thread(_prepare_cutout_source, src_full, request_model)
+            except Exception as e:
+                print(f"[cutout] PIL cannot open input: {e}")
+                return JSONResponse(status_code=400, content={"error": f"Invalid image: {e}"})
+            del src_full
+
+            if request_model in _CLASSICAL_MODELS:
+                src_opaque = _opaque_source(src_img)
+                img, quality, model_used = await _classical_cutout(src_opaque, ImageAnalysis(src_opaque), request_model)
+                result = await asyncio.to_thread(_save_cutout, img, quality, model_used, output_format)
+                if cache_key:
+                    await asyncio.to_thread(_cache_cutout_result, cache_key, result)
+                return result
+
+        img, quality = await _ml_cutout(src_img, request_model)
+        async with _cutout_workers.slot():
+            result = await asyncio.to_thread(_save_cutout, img, quality, request_model, output_format)
+            if cache_key:
+                await asyncio.to_thread(_cache_cutout_result, cache_key, result)
+        background_tasks.add_task(_apply_mem_policy, [request_model])
+        return result
+
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+def _cutout_fallback_model(primary_model: str) -> str | None:
+    """Next ML model to try after `primary_model` — mirrors getCutoutFallbackModel() in cutoutPipeline.js."""
+    explicit = os.environ.get("UFM_CUTOUT_FALLBACK_MODEL", "").strip()
+    if explicit == "0" or explicit.lower() == "none":
+        return None
+    if explicit and explicit != primary_model:
+        return explicit
+    current = primary_model or REMBG_MODEL or "u2net"
+    if current == "u2net" or current in BRIA_ALIASES:
+        return "isnet-general-use"
+    if current == "isnet-general-use":
+        return "birefnet-general-lite"
+    if current == "birefnet-general-lite":
+        return "birefnet-general"
+    return None
+
+
+@app.post("/cutout/auto")
+async def cutout_auto(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file: UploadFile | None = File(None),
+    image_path: str | None = Form(None),
+    raw_path: str | None = Form(None),
+    raw_width: int | None = Form(None),
+    raw_height: int | None = Form(None),
+    raw_channels: int | None = Form(None),
+    output_format: str | None = Form(None),
+    priority: str | None = Form(None),
+):
+    """
+    Whole cutout cascade on one input: border-trim → ML primary → ML fallback.
+    Accepts the same input, output_format and priority fields as /cutout.
+
+    Applies the same escalation rules runCutoutPipeline used to drive over three
+    /cutout calls, but decodes the image once and shares the downscaled source and
+    its ImageAnalysis between stages. The fallback runs whenever the primary is
+    low-confidence, fails, or is classical; when no stage is confident the one
+    with the most alpha coverage wins. Returns the winning result in the /cutout
+    shape plus `stages` (per-stage quality and timings) and `total_ms`. Repeat
+    requests are answered from the result cache and carry `"cached": true`.
+    """
+    import time as _time
+    try:
+        t_start = _time.perf_counter()
+        _start_job("cutout/auto", request, priority)
+        output_format = _resolve_output_format(output_format)
+
+        await asyncio.sleep(0)
+        if await request.is_disconnected():
+            print("[cutout/auto] client disconnected before processing — skipping")
+            return JSONResponse(status_code=499, content={"error": "client disconnected"})
+
+        # Everything that decides which stages run and what they produce: the
+        # primary model and the fallback it resolves to (UFM_CUTOUT_FALLBACK_MODEL);
+        # border-trim's thresholds are in every cutout key.
+        cascade = (REMBG_MODEL, _cutout_fallback_model(REMBG_MODEL))
+        cache_key = await _cutout_cache_key(
+            file, image_path, raw_path, raw_width, raw_height, raw_channels, "auto", output_format, cascade
+        )
+        if cache_key:
+            hit = await asyncio.to_thread(_cutout_cache.get, cache_key)
+            if hit is not None:
+                cached, output_path = hit
+                print(f"[cutout/auto] cache hit {cache_key[:12]} ({cached['model']}) -> {output_path}", flush=True)
+                total_ms = round((_time.perf_counter() - t_start) * 1000)
+                return {**cached, "output_path": output_path, "cached": True, "total_ms": total_ms}
+
+        try:
+            src_full = await _read_cutout_input(
+                file, image_path, raw_path, raw_width, raw_height, raw_channels, tag="cutout/auto"
+            )
+            async with _cutout_workers.slot():
+                await asyncio.to_thread(src_full.load)
+            print(f"[cutout/auto] input image: format={src_full.format}, size={src_full.size}, mode={src_full.mode}")
+        except Exception as e:
+            print(f"[cutout/auto] PIL cannot open input: {e}")
+            return JSONResponse(status_code=400, content={"error": f"Invalid image: {e}"})
+
+        shared: dict = {}
+        stages: list = []
+        ran_models: list = []
+
+        async def _stage(model_name: str):
+            t0 = _time.perf_counter()
+            try:
+                img, quality, model_used = await _cutout_stage(src_full, model_name, shared)
+            except Exception as e:
+                if isinstance(e, _CutoutStageError) and e.status_code == 499:
+                    raise  # client went away while queued — abandon the cascade
+                ms = round((_time.perf_counter() - t0) * 1000)
+                print(f"[cutout/auto] {model_name} failed after {ms} ms: {e}", flush=True)
+                stages.append({"model": model_name, "ms": ms, "error": str(e)})
+                return None
+            ran_models.append(model_name)
+            ms = round((_time.perf_counter() - t0) * 1000)
+            stages.append({
+                "model": model_name,
+                "model_used": model_used,
+                "ms": ms,
+                "low_confidence": quality["quality_reason"] is not None,
+                **quality,
+            })
+            print(
+                f"[cutout/auto] {model_name}: coverage={quality['alpha_coverage']:.2f}, "
+                f"reason={quality['quality_reason'] or 'ok'} ({ms} ms)",
+                flush=True,
+            )
+            return img, quality, model_used
+
+        best = await _stage("border-trim")
+        if best is None:
+            return JSONResponse(status_code=500, content={"error": stages[-1]["error"], "stages": stages})
+
+        primary = REMBG_MODEL
+        if best[1]["quality_reason"] is not None:
+            print("[cutout/auto] border-trim low-confidence — escalating to ML", flush=True)
+            ml = None
+            if primary in _CLASSICAL_MODELS:
+                # The "ML primary" would be the same deterministic classical pass again.
+                print(f"[cutout/auto] primary model is {primary} — going straight to the fallback", flush=True)
             else:
-                print(
-                    f"[cutout] cutout ok: coverage={coverage:.1%}, "
-                    f"border_alpha={quality['border_alpha']:.1%}, white_bg={is_white_bg}",
-                    flush=True,
-                )
+                ml = await _stage(primary)
+            if ml is not None and ml[1]["quality_reason"] is None:
+                best = ml
+            else:
+                # The primary failed, was low-confidence or was skipped.
+                fb = None
+                fallback_model = _cutout_fallback_model(primary)
+                if fallback_model and fallback_model not in _CLASSICAL_MODELS:
+                    fb = await _stage(fallback_model)
+                if fb is not None and fb[1]["quality_reason"] is None:
+                    best = fb
+                else:
+                    # Everything is low-confidence: keep the most foreground.
+                    best = max(
+                        (c for c in (best, ml, fb) if c is not None),
+                        key=lambda c: c[1]["alpha_coverage"],
+                    )
 
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-                img.save(f.name, format="PNG")
-                print(f"[cutout] saved to {f.name}")
-                result = {
-                    "output_path": f.name,
-                    "alpha_coverage": coverage,
-                    "low_confidence": low_confidence,
-                    "model": request_model,
-                    **quality,
-                }
+        img, quality, model_used = best
+        async with _cutout_workers.slot():
+            result = await asyncio.to_thread(_save_cutout, img, quality, model_used, output_format)
+        result["stages"] = stages
+        result["total_ms"] = round((_time.perf_counter() - t_start) * 1000)
+        if cache_key and not any("error" in stage for stage in stages):
+            await asyncio.to_thread(_cache_cutout_result, cache_key, result)
+        background_tasks.add_task(_apply_mem_policy, ran_models)
+        return result
+
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# Images per /cutout/batch chunk. A chunk is one batched ORT run (when the model
+# has a dynamic batch axis) and one hold of _model_gate, so single /cutout
+# requests can still get in between chunks of a long batch.
+_CUTOUT_BATCH_SIZE = max(1, int(os.environ.get("UFM_CUTOUT_BATCH_SIZE", "4")))
+
+
+@app.post("/cutout/batch")
+async def cutout_batch(
+    request: Request,
+    files: list[UploadFile] | None = File(None),
+    image_paths: list[str] | None = Form(None),
+    model: str | None = Form(None),
+    output_format: str | None = Form(None),
+    priority: str | None = Form(None),
+):
+    """
+    Cut out many images with one model. Inputs are repeated `image_paths`
+    fields (local callers) and/or repeated `files` uploads, indexed in that order.
+
+    Streams NDJSON: one line per image as soon as it is saved — the /cutout
+    result plus `index` and `input`, or `index` + `input` + `error` — then a
+    final {"done": true, "count", "cached", "failed", "total_ms"} line. Images
+    run in chunks of UFM_CUTOUT_BATCH_SIZE; the next chunk is decoded and
+    preprocessed while the current one is on the model. Images cut out before
+    with the same model are answered from the /cutout result cache. `priority`
+    is as for /cutout.
+    """
+    import time as _time
+    try:
+        job = _start_job("cutout/batch", request, priority)
+        output_format = _resolve_output_format(output_format)
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    request_model = (model or REMBG_MODEL).strip() or REMBG_MODEL
+    inputs = [(None, path) for path in image_paths or []] + [(f, None) for f in files or []]
+    if not inputs:
+        return JSONResponse(status_code=400, content={"error": "files or image_paths is required"})
+    classical = request_model in _CLASSICAL_MODELS
+    chunks = [
+        range(start, min(start + _CUTOUT_BATCH_SIZE, len(inputs)))
+        for start in range(0, len(inputs), _CUTOUT_BATCH_SIZE)
+    ]
+    print(
+        f"[cutout/batch] {len(inputs)} images, model={request_model}, "
+        f"{len(chunks)} chunks of <= {_CUTOUT_BATCH_SIZE}",
+        flush=True,
+    )
 
-            # Transformer-based models (birefnet) hold ~6 GB of ORT workspace buffers
-            # that gc.collect() cannot free — only destroying the InferenceSession
-            # releases them. Tear down and synchronously reload here, while still
-            # holding _cutout_lock, so the session is ready for the next request.
-            if request_model == REMBG_MODEL and REMBG_MODEL.startswith("birefnet"):
-                await asyncio.to_thread(_teardown_and_reload_session)
+    def _line(payload: dict) -> str:
+        return json.dumps(payload) + "\n"
 
-            return result
+    keys = {}  # index -> cutout cache key
+    hits = {}  # index -> cached result, streamed without a decode
 
+    async def _load(index: int):
+        """(index, label, prepared source or None, error or None) for one input."""
+        file, image_path = inputs[index]
+        label = image_path if file is None else file.filename
+        try:
+            keys[index] = await _cutout_cache_key(file, image_path, None, None, None, None, request_model, output_format)
+            if keys[index]:
+                hit = await asyncio.to_thread(_cutout_cache.get, keys[index])
+                if hit is not None:
+                    cached, output_path = hit
+                    print(f"[cutout/batch] #{index} cache hit {keys[index][:12]} -> {output_path}", flush=True)
+                    hits[index] = {**cached, "output_path": output_path, "cached": True}
+                    return index, label, None, None
+            src_full = await _read_cutout_input(file, image_path, None, None, None, None, tag="cutout/batch")
+
+            def _decode():
+                src_img = _prepare_cutout_source(src_full, request_model)
+                return src_img if classical else _ml_prepare(src_img, request_model)
+
+            async with _cutout_workers.slot():
+                return index, label, await asyncio.to_thread(_decode), None
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return JSONResponse(status_code=500, content={"error": str(e)})
+            print(f"[cutout/batch] #{index} PIL cannot open input: {e}", flush=True)
+            return index, label, None, f"Invalid image: {e}"
+
+    async def _load_chunk(indices):
+        return await asyncio.gather(*(_load(i) for i in indices))
+
+    # Both return (index, label, saved /cutout result or None, error or None).
+    async def _classical_one(index, label, src_img):
+        try:
+            async with _cutout_workers.slot():
+                src_opaque = _opaque_source(src_img)
+                img, quality, model_used = await _classical_cutout(
+                    src_opaque, ImageAnalysis(src_opaque), request_model
+                )
+                result = await asyncio.to_thread(_save_cutout, img, quality, model_used, output_format)
+                if keys.get(index):
+                    await asyncio.to_thread(_cache_cutout_result, keys[index], result)
+            return index, label, result, None
+        except Exception as e:
+            return index, label, None, str(e)
+
+    async def _finish_one(index, label, prepared, mask):
+        try:
+            async with _cutout_workers.slot():
+                img, quality = await asyncio.to_thread(_ml_finish, prepared, mask, request_model)
+                result = await asyncio.to_thread(_save_cutout, img, quality, request_model, output_format)
+                if keys.get(index):
+                    await asyncio.to_thread(_cache_cutout_result, keys[index], result)
+            return index, label, result, None
+        except Exception as e:
+            return index, label, None, str(e)
+
+    async def _results():
+        _current_job.set(job)  # the stream may be iterated from another task
+        t_start = _time.perf_counter()
+        failed = 0
+        running = []
+        pending = asyncio.create_task(_load_chunk(chunks[0]))
+        try:
+            for chunk_no in range(len(chunks)):
+                loaded = await pending
+                pending = None
+                if chunk_no + 1 < len(chunks):
+                    pending = asyncio.create_task(_load_chunk(chunks[chunk_no + 1]))
+                if await request.is_disconnected():
+                    print(f"[cutout/batch] client disconnected — stopping at chunk {chunk_no + 1}/{len(chunks)}", flush=True)
+                    return
+
+                ready = []
+                for index, label, source, error in loaded:
+                    if error is not None:
+                        failed += 1
+                        yield _line({"index": index, "input": label, "error": error})
+                    elif index in hits:
+                        yield _line({"index": index, "input": label, **hits[index]})
+                    else:
+                        ready.append((index, label, source))
+                if not ready:
+                    continue
+
+                # One task per image (post-processing + save); each line goes out
+                # as soon as its task finishes, not when the whole chunk has.
+                if classical:
+                    running = [asyncio.create_task(_classical_one(*entry)) for entry in ready]
+                else:
+                    try:
+                        masks = await _ml_infer([prepared["padded"] for _, _, prepared in ready], request_model)
+                    except Exception as e:
+                        masks = None
+                        for index, label, _ in ready:
+                            failed += 1
+                            print(f"[cutout/batch] #{index} failed: {e}", flush=True)
+                            yield _line({"index": index, "input": label, "error": str(e)})
+                    running = [
+                        asyncio.create_task(_finish_one(*entry, mask)) for entry, mask in zip(ready, masks or [])
+                    ]
+                    del masks
+                del ready, loaded
+
+                for next_done in asyncio.as_completed(running):
+                    index, label, result, error = await next_done
+                    if error is not None:
+                        failed += 1
+                        print(f"[cutout/batch] #{index} failed: {error}", flush=True)
+                        yield _line({"index": index, "input": label, "error": error})
+                    else:
+                        yield _line({"index": index, "input": label, **result})
+                running = []
+                if not classical:
+                    # Per chunk rather than per batch, so a long batch still gets
+                    # the birefnet reloads a run of single requests would.
+                    await _apply_mem_policy([request_model])
+
+            total_ms = round((_time.perf_counter() - t_start) * 1000)
+            print(f"[cutout/batch] done: {len(inputs)} images, {len(hits)} cached, {failed} failed, "
+                  f"{total_ms} ms", flush=True)
+            yield _line({"done": True, "count": len(inputs), "cached": len(hits), "failed": failed,
+                         "total_ms": total_ms})
+        finally:
+            if pending is not None:
+                pending.cancel()
+            for task in running:
+                task.cancel()
+
+    return StreamingResponse(_results(), media_type="application/x-ndjson")
 
 
 # ---------- INTERACTIVE CUTOUT REFINEMENT ----------
 @app.post("/interactive-cutout")
-async def interactive_cutout(req: SmartCutoutRequest):
+async def interactive_cutout(req: SmartCutoutRequest, request: Request):
     """
     MobileSAM-based interactive cutout refinement.
 
@@ -1304,12 +3626,18 @@ async def interactive_cutout(req: SmartCutoutRequest):
     point prompts. SAM works on learned visual embeddings — edges, textures,
     object shape — not pixel color, so it handles transparent packaging and
     other hard cases that confuse GrabCut's color-cluster approach.
+    The image embedding is cached per source file (UFM_SAM_EMBED_CACHE_MB),
+    so repeat clicks on the same photo only run the mask decoder.
+    Runs at "interactive" priority unless the request sets `priority`.
     """
-    async with _sam_lock:
-        try:
+    try:
+        _start_job("interactive-cutout", request, req.priority, default="interactive")
+        async with _sam_gate.slot():
+            import time as _time
             import numpy as np
             import cv2
 
+            output_format = _resolve_output_format(req.output_format)
             if not req.positive_points and not req.negative_points:
                 return JSONResponse(status_code=400, content={"error": "At least one keep/remove point is required"})
             cutout_path = _existing_cutout_path(req.cutout_path)
@@ -1355,6 +3683,7 @@ async def interactive_cutout(req: SmartCutoutRequest):
             else:
                 source_rgb_img = source.convert("RGB")
             source_rgb = np.array(source_rgb_img, dtype=np.uint8)
+            embedding_key = _sam_embedding_key(source_path, cutout.size, source_path == cutout_path)
 
             # Build SAM point arrays
             pos_coords = [(p.x, p.y) for p in req.positive_points]
@@ -1371,22 +3700,26 @@ async def interactive_cutout(req: SmartCutoutRequest):
                 _source_rgb = source_rgb  # local ref for closure
 
                 def _run_sam():
-                    pred = _get_sam_predictor()
-                    pred.set_image(_source_rgb)
-                    return pred.predict(
-                        point_coords=_all_coords,
-                        point_labels=_all_labels,
-                        multimask_output=True,
-                    )
-
-                masks, scores, _ = await asyncio.to_thread(_run_sam)
+                    with _sam_model.use():
+                        pred = _get_sam_predictor()
+                        cached = _sam_set_image(pred, _source_rgb, embedding_key)
+                        return cached, pred.predict(
+                            point_coords=_all_coords,
+                            point_labels=_all_labels,
+                            multimask_output=True,
+                        )
+
+                t_sam = _time.perf_counter()
+                embedding_cached, (masks, scores, _) = await asyncio.to_thread(_run_sam)
+                sam_ms = round((_time.perf_counter() - t_sam) * 1000)
                 # SAM returns 3 masks at different scales; pick the highest-confidence one
                 best_idx = int(np.argmax(scores))
                 fg_mask = (masks[best_idx].astype(np.uint8)) * 255
 
                 print(
                     f"[interactive-cutout] SAM ok — fg {fg_mask.mean() / 255:.1%} "
-                    f"(score {scores[best_idx]:.3f})",
+                    f"(score {scores[best_idx]:.3f}, {sam_ms} ms, "
+                    f"embedding {'cached' if embedding_cached else 'encoded'})",
                     flush=True,
                 )
             except Exception as sam_err:
@@ -1407,61 +3740,310 @@ async def interactive_cutout(req: SmartCutoutRequest):
             out = Image.fromarray(out_arr, "RGBA")
 
             quality = _cutout_quality(out, _border_white_fraction(source) > 0.85)
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
-                out.save(f.name, format="PNG")
-                return {
-                    "output_path": f.name,
-                    "alpha_coverage": quality["alpha_coverage"],
-                    "low_confidence": quality["quality_reason"] is not None,
-                    **quality,
-                }
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return JSONResponse(status_code=500, content={"error": str(e)})
+            return {
+                "output_path": _write_cutout_output(out, output_format),
+                "output_format": output_format,
+                "alpha_coverage": quality["alpha_coverage"],
+                "low_confidence": quality["quality_reason"] is not None,
+                **quality,
+            }
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 # ---------- OCR ----------
-@app.post("/ocr")
-async def ocr(req: OCRRequest):
-    async with ocr_lock:
-        backend_src = os.path.dirname(
-            os.path.dirname(os.path.dirname(__file__))
-        )
+# ── OCR result cache (UFM_OCR_CACHE_MB) ──────────────────────────────────────
+# Template layout, vision metadata extraction and re-runs OCR the same files
+# again and again. Results are cached under a SHA-256 of the image bytes plus
+# the OCR configuration. Only results with text are stored: run_ocr() fails
+# closed with an empty result, which must not stick. 0 MB disables the cache.
+_OCR_CACHE_MB = float(os.environ.get("UFM_OCR_CACHE_MB", "64"))
+_OCR_CACHE_DIR = os.environ.get("UFM_OCR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ufm-ocr-cache")
+_OCR_CACHE_VERSION = 1  # bump when ocr_engine output changes for the same configuration
+_ocr_cache = _DiskLruCache("ocr-cache", _OCR_CACHE_DIR, _OCR_CACHE_MB)
+
+
+def _ocr_cache_key(image_path: str, mode: str, max_side: int, tiling: tuple | None = None) -> str | None:
+    """Cache key for OCR of `image_path`, or None when the cache is off or the file can't be read."""
+    import hashlib
+    from ocr.modes import OCR_MODES
+    if not _ocr_cache.enabled or not image_path:
+        return None
+    h = hashlib.sha256()
+    # The engine as built by ocr_engine._get_ocr(mode); models ship with paddleocr / paddlex.
+    settings = (
+        _OCR_CACHE_VERSION,
+        "en",
+        mode,
+        OCR_MODES[mode]["engine"],
+        max_side,
+        tiling,
+        _dist_versions(("paddleocr", "paddlex", "paddlepaddle")),
+    )
+    h.update(repr(settings).encode())
+    try:
+        _hash_file(image_path, h)
+    except OSError:
+        return None
+    return h.hexdigest()
 
-        code = """
-import sys, json, contextlib, io
-sys.path.insert(0, sys.argv[2])
-from ocr.ocr_engine import run_ocr
 
-buf = io.StringIO()
-with contextlib.redirect_stdout(buf):
-    result = run_ocr(sys.argv[1])
+def _ocr_has_text(result: list) -> bool:
+    return any(isinstance(item, dict) and (item.get("rec_texts") or item.get("boxes")) for item in result)
 
-json.dump(result, sys.stdout, ensure_ascii=False)
-"""
 
-        # Use async subprocess so the event loop stays free for /health checks
-        # while PaddleOCR runs (subprocess.run blocks the entire loop).
-        proc = await asyncio.create_subprocess_exec(
-            sys.executable, "-u", "-c", code, req.image_path, backend_src,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout_bytes, stderr_bytes = await proc.communicate()
-        stdout_text = stdout_bytes.decode("utf-8", errors="replace")
-        stderr_text = stderr_bytes.decode("utf-8", errors="replace")
+def _ocr_mode(mode: str | None, max_side: int | None) -> tuple[str, int]:
+    """The request's (mode, max_side) with defaults applied. Raises _CutoutStageError(400)."""
+    from ocr.modes import resolve_mode
+    try:
+        return resolve_mode(mode or _OCR_MODE, max_side)
+    except ValueError as e:
+        raise _CutoutStageError(400, str(e)) from e
+
+
+# ── Tiled OCR (UFM_OCR_TILE_*) ────────────────────────────────────────────────
+# Full-page flyer screenshots and scans are thousands of px tall: PaddleOCR
+# either downsizes them, losing small price text, or grinds through them on
+# one core. A tiled request cuts the page into overlapping UFM_OCR_TILE_PX
+# tiles that the OCR workers read in parallel at full resolution; ocr.tiling
+# merges them back into page coordinates, dropping blocks duplicated across
+# seams. The overlap must be taller than a text line. UFM_OCR_TILE_AUTO_SIDE
+# > 0 tiles any page whose longest side exceeds it unless the request says no.
+_OCR_TILE_PX = max(256, int(os.environ.get("UFM_OCR_TILE_PX", "1600")))
+_OCR_TILE_OVERLAP_PX = min(_OCR_TILE_PX // 2, max(0, int(os.environ.get("UFM_OCR_TILE_OVERLAP_PX", "160"))))
+_OCR_TILE_AUTO_SIDE = max(0, int(os.environ.get("UFM_OCR_TILE_AUTO_SIDE", "0")))
+
+
+def _ocr_wants_tiles(image_path: str, tiled: bool | None) -> bool:
+    if tiled is not None:
+        return tiled
+    if not _OCR_TILE_AUTO_SIDE:
+        return False
+    try:
+        with Image.open(image_path) as img:  # header only
+            return max(img.size) > _OCR_TILE_AUTO_SIDE
+    except (OSError, ValueError):
+        return False
 
-        if proc.returncode != 0:
-            print("OCR SUBPROCESS ERROR:", stderr_text)
-            return JSONResponse(content=[])
 
+async def _run_ocr_tiled(image_path: str, mode: str, max_side: int) -> list:
+    """
+    OCR one page as overlapping tiles spread over the OCR workers. The result
+    has "failed_tiles": tiles whose text is missing from it (a partial page).
+    Raises _OcrWorkerError when every tile fails.
+    """
+    import shutil
+    import time as _time
+    from ocr.tiling import merge_tile_results, write_tiles
+    t0 = _time.perf_counter()
+    tiles_dir = tempfile.mkdtemp(prefix="ufm-ocr-tiles-")
+    try:
         try:
-            data = json.loads(stdout_text)
-        except Exception as e:
-            print("OCR JSON PARSE ERROR:", e)
-            print("STDOUT:", stdout_text)
-            print("STDERR:", stderr_text)
-            return JSONResponse(content=[])
+            width, height, tiles = await asyncio.to_thread(
+                write_tiles, image_path, tiles_dir, _OCR_TILE_PX, _OCR_TILE_OVERLAP_PX
+            )
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise _OcrWorkerError(f"could not tile {image_path}: {e}") from e
+
+        # Round-robin, so neighbouring tiles run on different workers.
+        n_chunks = min(len(tiles), len(_ocr_pool.workers))
+        chunks = [list(range(i, len(tiles), n_chunks)) for i in range(n_chunks)]
+        results = [None] * len(tiles)
+
+        async def _run_chunk(indices: list[int]):
+            def _on_item(index, result, error):
+                results[indices[index]] = result
+
+            payload = {"image_paths": [tiles[i][0] for i in indices], "mode": mode, "max_side": max_side}
+            await _ocr_pool.run("ocr_batch", payload, on_item=_on_item)
+
+        outcomes = await asyncio.gather(*(_run_chunk(c) for c in chunks), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, _CutoutStageError):
+                raise outcome
+        failed = sum(r is None for r in results)
+        if failed == len(tiles):
+            errors = [str(o) for o in outcomes if isinstance(o, Exception)]
+            raise _OcrWorkerError(f"all {len(tiles)} tiles failed" + (f": {errors[0]}" if errors else ""))
+        merged = merge_tile_results([rect for _, rect in tiles], results)
+        merged["failed_tiles"] = failed
+    finally:
+        shutil.rmtree(tiles_dir, ignore_errors=True)
+    print(
+        f"[ocr] tiled {width}x{height} into {len(tiles)} tiles on {n_chunks} workers ({mode}): "
+        f"{len(merged['text_blocks'])} blocks, {failed} failed tiles, "
+        f"{(_time.perf_counter() - t0) * 1000:.0f} ms",
+        flush=True,
+    )
+    return [merged]
 
-        return JSONResponse(content=data if isinstance(data, list) else [data])
+
+async def _ocr_response(data: list, layout: bool) -> list:
+    # Layout is derived and cheap (a sort and a sweep over the blocks), so it
+    # is added after the OCR cache rather than stored in it.
+    if not layout:
+        return data
+    from ocr.layout import add_layout
+    return await asyncio.to_thread(lambda: [add_layout(item) if isinstance(item, dict) else item for item in data])
+
+
+@app.post("/ocr")
+async def ocr(req: OCRRequest, request: Request):
+    """
+    OCR one image on a warm worker from the OCR pool. Returns run_ocr()'s
+    [{rec_texts, rec_scores, text_blocks}], or [] when OCR fails. Files OCR'd
+    before are answered from the OCR result cache.
+    `mode` picks the profile from ocr/modes.py: "full", "fast" (mobile models,
+    downscaled detection) or "detect" (empty rec_* plus "boxes", no
+    recognition); `max_side` overrides the mode's detection size cap.
+    `tiled` OCRs a very large page as overlapping tiles across the OCR
+    workers (see Tiled OCR); the result adds "tiles", the tile count, and
+    "failed_tiles" (a partial page when non-zero, which is not cached).
+    `layout` adds "layout": the text_blocks grouped into lines, columns and
+    candidate product cells (ocr/layout.py).
+    `priority` orders the request among queued OCR jobs (default batch).
+    """
+    try:
+        _start_job("ocr", request, req.priority)
+        tiled = await asyncio.to_thread(_ocr_wants_tiles, req.image_path, req.tiled)
+        # Tiles are read at full resolution unless the caller caps them.
+        mode, max_side = _ocr_mode(req.mode, 0 if tiled and req.max_side is None else req.max_side)
+        tiling = (_OCR_TILE_PX, _OCR_TILE_OVERLAP_PX) if tiled else None
+        cache_key = await asyncio.to_thread(_ocr_cache_key, req.image_path, mode, max_side, tiling)
+        if cache_key:
+            hit = await asyncio.to_thread(_ocr_cache.get, cache_key)
+            if hit is not None:
+                print(f"[ocr] cache hit {cache_key[:12]} ({mode}, {req.image_path})", flush=True)
+                return JSONResponse(content=await _ocr_response(hit[0], req.layout))
+        if tiled and os.path.exists(req.image_path):
+            data = await _run_ocr_tiled(req.image_path, mode, max_side)
+        else:
+            data = await _ocr_pool.run("ocr", {"image_path": req.image_path, "mode": mode, "max_side": max_side})
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except _OcrWorkerError as e:
+        print(f"[ocr] {e}", flush=True)
+        return JSONResponse(content=[])
+    data = data if isinstance(data, list) else [data]
+    partial = any(isinstance(item, dict) and item.get("failed_tiles") for item in data)
+    if cache_key and _ocr_has_text(data) and not partial:
+        await asyncio.to_thread(_ocr_cache.put, cache_key, data)
+    return JSONResponse(content=await _ocr_response(data, req.layout))
+
+
+# Images per OCR worker job in /ocr/batch. Chunks run on separate workers in
+# parallel; within a chunk PaddleOCR batches the images through one predict.
+_OCR_BATCH_SIZE = max(1, int(os.environ.get("UFM_OCR_BATCH_SIZE", "8")))
+
+
+@app.post("/ocr/batch")
+async def ocr_batch(req: OCRBatchRequest, request: Request):
+    """
+    OCR many images (a flyer's worth) through PaddleOCR's batched predict.
+
+    Streams NDJSON: one {"index", "input", "rec_texts", "rec_scores",
+    "text_blocks"} line per image as soon as its worker finishes it (or
+    index + input + error), then {"done": true, "count", "failed", "total_ms"}.
+    Cached images are answered first; the rest go to the OCR workers in
+    chunks of UFM_OCR_BATCH_SIZE. `mode`, `max_side`, `layout` and
+    `priority` are as for /ocr.
+    """
+    import time as _time
+    try:
+        mode, max_side = _ocr_mode(req.mode, req.max_side)
+        job = _start_job("ocr/batch", request, req.priority)
+    except _CutoutStageError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    paths = req.image_paths
+    if not paths:
+        return JSONResponse(status_code=400, content={"error": "image_paths is required"})
+
+    def _lookup():
+        keys = [_ocr_cache_key(path, mode, max_side) for path in paths]
+        hits = {}
+        for index, key in enumerate(keys):
+            hit = _ocr_cache.get(key) if key else None
+            if hit is not None and hit[0]:
+                hits[index] = hit[0][0]
+        return keys, hits
+
+    keys, hits = await asyncio.to_thread(_lookup)
+    misses = [index for index in range(len(paths)) if index not in hits]
+    chunks = [misses[i:i + _OCR_BATCH_SIZE] for i in range(0, len(misses), _OCR_BATCH_SIZE)]
+    print(f"[ocr/batch] {len(paths)} images ({mode}): {len(hits)} cached, "
+          f"{len(misses)} in {len(chunks)} chunks of <= {_OCR_BATCH_SIZE}", flush=True)
+
+    def _line(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    def _item(index: int, result: dict) -> str:
+        if req.layout:
+            from ocr.layout import add_layout
+            result = add_layout(result)
+        return _line({"index": index, "input": paths[index], **result})
+
+    async def _results():
+        _current_job.set(job)  # the stream may be iterated from another task
+        t_start = _time.perf_counter()
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()  # ("item", index, result, error) | ("chunk", indices, error)
+
+        async def _run_chunk(indices: list[int]):
+            def _on_item(index, result, error):
+                loop.call_soon_threadsafe(events.put_nowait, ("item", indices[index], result, error))
+
+            # The "chunk" event must always be posted: _results() waits for one per task.
+            # It goes through call_soon so it lands after any items _on_item queued.
+            error = None
+            try:
+                payload = {"image_paths": [paths[i] for i in indices], "mode": mode, "max_side": max_side}
+                await _ocr_pool.run("ocr_batch", payload, on_item=_on_item)
+            except (_OcrWorkerError, _CutoutStageError) as e:
+                error = str(e)
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                error = f"OCR failed: {e}"
+            loop.call_soon(events.put_nowait, ("chunk", indices, error))
+
+        tasks = [asyncio.create_task(_run_chunk(indices)) for indices in chunks]
+        failed = 0
+        reported = set()
+        try:
+            for index, result in hits.items():
+                yield _item(index, result)
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event[0] == "chunk":
+                    _, indices, error = event
+                    remaining -= 1
+                    for index in indices:
+                        if index not in reported:
+                            failed += 1
+                            yield _line({"index": index, "input": paths[index], "error": error or "no OCR result"})
+                    continue
+                _, index, result, error = event
+                reported.add(index)
+                if error is not None:
+                    failed += 1
+                    yield _line({"index": index, "input": paths[index], "error": error})
+                else:
+                    if keys[index] and _ocr_has_text([result]):
+                        await asyncio.to_thread(_ocr_cache.put, keys[index], [result])
+                    yield _item(index, result)
+
+            total_ms = round((_time.perf_counter() - t_start) * 1000)
+            print(f"[ocr/batch] done: {len(paths)} images, {len(hits)} cached, {failed} failed, "
+                  f"{total_ms} ms", flush=True)
+            yield _line({"done": True, "count": len(paths), "cached": len(hits), "failed": failed,
+                         "total_ms": total_ms})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(_results(), media_type="application/x-ndjson")
@@ -0,0 +1,174 @@
+"""
+Layout pass over OCR text_blocks: lines, then columns, then candidate
+product cells.
+
+Everything is a sort plus a sweep, so a dense flyer page with hundreds of
+blocks costs O(n log n) rather than the pairwise comparisons callers would
+otherwise do:
+
+- lines: blocks are swept in order of vertical centre into rows (a block
+  joins the open row whose centre is nearest, within half the smaller
+  height); each row is then sorted by x and split where the horizontal gap
+  is wider than LINE_GAP x the row's height.
+- columns: the x-intervals of lines narrower than half the page are merged
+  (interval union); every line is placed by binary search on its centre.
+  A wider line joins a column only when it overlaps just that one, so
+  banners across several columns belong to none; a page without narrow
+  lines (one product, one list) is a single column.
+- cells: each column's lines, top to bottom, split where the vertical gap
+  exceeds CELL_GAP x the column's median line height — a product title
+  and its price sit closer together than two products do.
+
+No paddle imports here: the server runs it on tiled and cached results too.
+"""
+import bisect
+import re
+import statistics
+from typing import Any, Dict, List, Sequence
+
+LINE_GAP = 1.5  # x row height: wider horizontal gaps end a line
+CELL_GAP = 1.0  # x median line height: taller vertical gaps end a cell
+_PRICE_RE = re.compile(r"\$\s*\d|\d+\.\d{2}\b|\d+\s*/\s*\$|[¢￠]")
+
+
+def _bounds(items: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    x0 = min(i["x"] for i in items)
+    y0 = min(i["y"] for i in items)
+    x1 = max(i["x"] + i["width"] for i in items)
+    y1 = max(i["y"] + i["height"] for i in items)
+    return {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+
+
+def _rows(blocks: Sequence[Dict[str, Any]], order: List[int]) -> List[List[int]]:
+    """Sweep blocks by vertical centre into rows of block indices."""
+    rows: List[Dict[str, Any]] = []
+    active: List[Dict[str, Any]] = []  # rows still within reach of the sweep line
+    for i in order:
+        b = blocks[i]
+        cy, h = b["y"] + b["height"] / 2, max(1, b["height"])
+        # Rows are opened in centre order, so ones far above can be retired for good.
+        active = [r for r in active if cy - r["cy"] <= max(r["h"], h)]
+        best = None
+        for r in active:
+            d = abs(cy - r["cy"])
+            if d <= 0.5 * min(h, r["h"]) and (best is None or d < abs(cy - best["cy"])):
+                best = r
+        if best is None:
+            best = {"cy": cy, "h": h, "members": []}
+            rows.append(best)
+            active.append(best)
+        else:
+            n = len(best["members"])
+            best["cy"] = (best["cy"] * n + cy) / (n + 1)
+            best["h"] = (best["h"] * n + h) / (n + 1)
+        best["members"].append(i)
+    return [r["members"] for r in rows]
+
+
+def _lines(blocks: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    placed = [i for i, b in enumerate(blocks) if "x" in b]
+    placed.sort(key=lambda i: blocks[i]["y"] + blocks[i]["height"] / 2)
+    lines = []
+    for members in _rows(blocks, placed):
+        members.sort(key=lambda i: blocks[i]["x"])
+        height = statistics.median(blocks[i]["height"] for i in members)
+        current = [members[0]]
+        for prev, i in zip(members, members[1:]):
+            gap = blocks[i]["x"] - (blocks[prev]["x"] + blocks[prev]["width"])
+            if gap > LINE_GAP * height:
+                lines.append(current)
+                current = []
+            current.append(i)
+        lines.append(current)
+
+    out = []
+    for members in lines:
+        items = [blocks[i] for i in members]
+        out.append({
+            "text": " ".join(b.get("text", "") for b in items).strip(),
+            "score": round(statistics.fmean(b.get("score", 0.0) for b in items), 4),
+            **_bounds(items),
+            "blocks": members,
+        })
+    return out  # row by row, left to right within a row
+
+
+def _columns(lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not lines:
+        return []
+    page = _bounds(lines)
+    narrow = sorted((l for l in lines if l["width"] <= page["width"] / 2), key=lambda l: l["x"])
+    spans: List[List[float]] = []
+    for l in narrow:
+        x0, x1 = l["x"], l["x"] + l["width"]
+        if spans and x0 <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], x1)
+        else:
+            spans.append([x0, x1])
+    if not spans:
+        return [{**page, "lines": list(range(len(lines)))}]
+    starts = [s[0] for s in spans]
+    members: List[List[int]] = [[] for _ in spans]
+    for li, l in enumerate(lines):
+        if l["width"] > page["width"] / 2:
+            x0, x1 = l["x"], l["x"] + l["width"]
+            # Spans are sorted and disjoint: the ones it overlaps are contiguous.
+            lo = max(0, bisect.bisect_right(starts, x0) - 1)
+            hit = [k for k in range(lo, bisect.bisect_left(starts, x1)) if spans[k][1] > x0]
+            if len(hit) == 1:
+                members[hit[0]].append(li)
+            continue
+        cx = l["x"] + l["width"] / 2
+        k = bisect.bisect_right(starts, cx) - 1
+        if k >= 0 and cx <= spans[k][1]:
+            members[k].append(li)
+    return [
+        {**_bounds([lines[li] for li in m]), "lines": m}  # lines are already top to bottom
+        for m in members if m
+    ]
+
+
+def _cells(lines: List[Dict[str, Any]], columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cells = []
+    for ci, column in enumerate(columns):
+        members = column["lines"]
+        height = statistics.median(lines[li]["height"] for li in members)
+        current = [members[0]]
+        for prev, li in zip(members, members[1:]):
+            gap = lines[li]["y"] - (lines[prev]["y"] + lines[prev]["height"])
+            if gap > CELL_GAP * height:
+                cells.append((ci, current))
+                current = []
+            current.append(li)
+        cells.append((ci, current))
+
+    out = []
+    for ci, members in cells:
+        text = "\n".join(lines[li]["text"] for li in members)
+        out.append({
+            **_bounds([lines[li] for li in members]),
+            "column": ci,
+            "lines": members,
+            "text": text,
+            "has_price": bool(_PRICE_RE.search(text)),
+        })
+    return out
+
+
+def group_layout(text_blocks: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    {"lines", "columns", "cells"} for text_blocks (blocks without x/y are
+    left out). Lines come row by row and list their text_blocks indices
+    left to right; columns and cells list line indices top to bottom. A
+    cell also has its column index, its text (one line per row) and whether
+    it looks like it holds a price. All boxes are {x, y, width, height} in
+    image pixels.
+    """
+    lines = _lines(text_blocks)
+    columns = _columns(lines)
+    return {"lines": lines, "columns": columns, "cells": _cells(lines, columns)}
+
+
+def add_layout(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A run_ocr() result dict with "layout" added."""
+    return {**result, "layout": group_layout(result.get("text_blocks", []))}
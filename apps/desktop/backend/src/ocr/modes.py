@@ -0,0 +1,54 @@
+"""
+OCR mode profiles, shared by ocr_engine (which builds the engines) and the
+server (which validates requests and keys the OCR cache). No paddle imports
+here, so the server can read it cheaply.
+
+Each profile names the engine to build and the default cap on the longest
+side of the image fed to text detection (0 = PaddleOCR's own sizing).
+"""
+from typing import Optional, Tuple
+
+OCR_MODES = {
+    # PaddleOCR's defaults for lang="en" (server-tier models), full resolution.
+    "full": {
+        "detect_only": False,
+        "max_side": 0,
+        "engine": {},
+    },
+    # Mobile-tier detection + recognition without document orientation /
+    # unwarping; the image is downscaled so its longest side is <= 960 px
+    # for detection (recognition still reads crops at full resolution).
+    "fast": {
+        "detect_only": False,
+        "max_side": 960,
+        "engine": {
+            "text_detection_model_name": "PP-OCRv5_mobile_det",
+            "text_recognition_model_name": "PP-OCRv5_mobile_rec",
+            "use_doc_orientation_classify": False,
+            "use_doc_unwarping": False,
+        },
+    },
+    # Text detection only: boxes and scores, no recognition — enough to ask
+    # whether (and where) an image contains text.
+    "detect": {
+        "detect_only": True,
+        "max_side": 960,
+        "engine": {"model_name": "PP-OCRv5_mobile_det"},
+    },
+}
+
+DEFAULT_MODE = "full"
+
+
+def resolve_mode(mode: Optional[str] = None, max_side: Optional[int] = None) -> Tuple[str, int]:
+    """
+    (mode, max_side) with the profile's cap filled in when max_side is None.
+    max_side=0 means no cap, so resolving twice gives the same answer.
+    Raises ValueError for an unknown mode.
+    """
+    mode = mode or DEFAULT_MODE
+    if mode not in OCR_MODES:
+        raise ValueError(f"unknown OCR mode {mode!r} (expected one of {', '.join(OCR_MODES)})")
+    if max_side is None:
+        max_side = OCR_MODES[mode]["max_side"]
+    return mode, max(0, int(max_side))
@@ -1,39 +1,104 @@
 import os
 import sys
 import json
+import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # Suppress PaddleOCR/PaddleX verbose init logs (replaces the removed show_log arg)
 logging.getLogger("paddleocr").setLevel(logging.ERROR)
 logging.getLogger("paddlex").setLevel(logging.ERROR)
 
+from ocr.layout import add_layout
+from ocr.modes import DEFAULT_MODE, OCR_MODES, resolve_mode
+from ocr.threads import apply_thread_env, candidate_threads, calibration_image, configured_threads, save_tuned
+
 # -----------------------------
-# Hard caps for low-end machines
+# CPU threads (see ocr.threads) — the env pools must be sized before paddle loads
 # -----------------------------
-os.environ["OMP_NUM_THREADS"] = "1"
-os.environ["MKL_NUM_THREADS"] = "1"
+_cpu_threads, _cpu_threads_source = configured_threads()
+apply_thread_env(_cpu_threads)
 
 from paddleocr import PaddleOCR
 
 # -----------------------------
-# Singleton OCR instance
+# OCR engines, one per mode (see ocr.modes)
 # -----------------------------
-_ocr = None
+_engines: Dict[str, Any] = {}
+
+def _build_engine(mode: str, cpu_threads: int):
+    profile = OCR_MODES[mode]
+    if profile["detect_only"]:
+        from paddleocr import TextDetection
+        return TextDetection(cpu_threads=cpu_threads, **profile["engine"])
+    return PaddleOCR(
+        use_textline_orientation=False,  # v3 name for use_angle_cls
+        lang="en",
+        # show_log removed — no longer a valid arg in PaddleOCR 3.x
+        cpu_threads=cpu_threads,
+        **profile["engine"],
+    )
+
+
+def _get_ocr(mode: str = DEFAULT_MODE):
+    """PaddleOCR pipeline — or TextDetection model for detect-only modes — for `mode`, built once."""
+    engine = _engines.get(mode)
+    if engine is None:
+        engine = _engines[mode] = _build_engine(mode, _cpu_threads)
+    return engine
+
+
+def cpu_threads() -> Tuple[int, str]:
+    """(threads, source) the engines are built with — source is "env", "tuned" or "auto"."""
+    return _cpu_threads, _cpu_threads_source
+
+
+def autotune_threads(mode: str = DEFAULT_MODE, image_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Time a calibration image (ocr.threads.calibration_image() by default) at
+    each candidate thread count, save the fastest for later starts and build
+    this process's engines with it from now on.
+    Returns {"threads", "timings_ms"}.
+    """
+    global _cpu_threads, _cpu_threads_source
+    image_path = image_path or calibration_image()
+    kwargs = _predict_kwargs(*resolve_mode(mode))
+    timings_ms: Dict[int, float] = {}
+    candidates = candidate_threads()
+    for threads in candidates if len(candidates) > 1 else ():
+        engine = _build_engine(mode, threads)
+        engine.predict(image_path, **kwargs)  # first run allocates and plans
+        best = float("inf")
+        for _ in range(2):
+            t0 = time.perf_counter()
+            engine.predict(image_path, **kwargs)
+            best = min(best, time.perf_counter() - t0)
+        timings_ms[threads] = round(best * 1000)
+        del engine
+    if timings_ms:
+        # Ties (within 5%) go to fewer threads: they leave cores for the rest of the app.
+        fastest = min(timings_ms.values())
+        threads = min(n for n, ms in timings_ms.items() if ms <= fastest * 1.05)
+    else:
+        threads = candidates[0]  # one core per worker: nothing to time
+    save_tuned(threads, timings_ms)
+    _cpu_threads, _cpu_threads_source = threads, "tuned"
+    _engines.clear()
+    return {"threads": threads, "timings_ms": timings_ms}
+
 
-def _get_ocr() -> PaddleOCR:
-    global _ocr
-    if _ocr is None:
-        _ocr = PaddleOCR(
-            use_textline_orientation=False,  # v3 name for use_angle_cls
-            lang="en",
-            # show_log removed — no longer a valid arg in PaddleOCR 3.x
-        )
-    return _ocr
+def _predict_kwargs(mode: str, max_side: int) -> Dict[str, Any]:
+    # "max" downscales so the longest side fits; the default "min" only upscales small images.
+    if not max_side:
+        return {}
+    if OCR_MODES[mode]["detect_only"]:
+        return {"limit_side_len": max_side, "limit_type": "max"}
+    return {"text_det_limit_side_len": max_side, "text_det_limit_type": "max"}
 
 
 def _bbox_from_poly(poly):
-    if not poly:
+    # Polygons may be numpy arrays, so no truthiness test.
+    if poly is None or len(poly) == 0:
         return None
     try:
         pts = [[float(p[0]), float(p[1])] for p in poly]
@@ -61,12 +126,73 @@ def _append_text_block(text_blocks, text, score, poly):
     text_blocks.append(block)
 
 
+def _empty_result() -> Dict[str, Any]:
+    return {"rec_texts": [], "rec_scores": [], "text_blocks": []}
+
+
+def _collect_results(results) -> Dict[str, Any]:
+    """Flatten PaddleOCR results for one image into {rec_texts, rec_scores, text_blocks}."""
+    rec_texts: List[str] = []
+    rec_scores: List[float] = []
+    text_blocks: List[Dict[str, Any]] = []
+
+    # results is a list of OCRResult (dict-like) objects:
+    # each has "rec_texts": [str, ...] and "rec_scores": [float, ...]
+    for res in results:
+        texts = res.get("rec_texts", []) or []
+        scores = res.get("rec_scores", []) or []
+        polys = res.get("rec_polys") or res.get("dt_polys") or []
+
+        for i, text in enumerate(texts):
+            if isinstance(text, str) and text.strip():
+                rec_texts.append(text.strip())
+            score = scores[i] if i < len(scores) else 0.0
+            try:
+                rec_scores.append(float(score))
+            except Exception:
+                rec_scores.append(0.0)
+            poly = polys[i] if i < len(polys) else None
+            _append_text_block(text_blocks, text, score, poly)
+
+    return {"rec_texts": rec_texts, "rec_scores": rec_scores, "text_blocks": text_blocks}
+
+
+def _collect_boxes(results) -> Dict[str, Any]:
+    """Detection-only results for one image: empty rec_* plus boxes [{score, x, y, width, height}]."""
+    boxes: List[Dict[str, Any]] = []
+    for res in results:
+        polys = res.get("dt_polys")
+        scores = res.get("dt_scores")
+        polys = list(polys) if polys is not None else []
+        scores = list(scores) if scores is not None else []
+        for i, poly in enumerate(polys):
+            bbox = _bbox_from_poly(poly)
+            if not bbox:
+                continue
+            score = scores[i] if i < len(scores) else 0.0
+            x, y, w, h = bbox
+            boxes.append({"score": float(score), "x": x, "y": y, "width": w, "height": h})
+    return {**_empty_result(), "boxes": boxes}
+
+
+def _collect(mode: str, results) -> Dict[str, Any]:
+    return _collect_boxes(results) if OCR_MODES[mode]["detect_only"] else _collect_results(results)
+
+
 # -----------------------------
-# Public entry point
+# Public entry points
 # -----------------------------
-def run_ocr(image_path: str) -> List[Dict[str, Any]]:
+def run_ocr(
+    image_path: str, mode: Optional[str] = None, max_side: Optional[int] = None, layout: bool = False,
+) -> List[Dict[str, Any]]:
     """
     OCR on ORIGINAL image only.
+    mode picks a profile from ocr.modes ("full" by default, "fast", or
+    "detect" — which leaves rec_* empty and adds "boxes"); max_side caps the
+    longest side fed to detection (None = the profile's cap, 0 = no cap).
+    layout=True adds "layout": text_blocks grouped into lines, columns and
+    candidate product cells (ocr.layout.group_layout).
+    Raises ValueError for an unknown mode.
     Returns:
       [
         {
@@ -76,54 +202,88 @@ def run_ocr(image_path: str) -> List[Dict[str, Any]]:
         }
       ]
     """
-    empty = [{"rec_texts": [], "rec_scores": [], "text_blocks": []}]
+    mode, max_side = resolve_mode(mode, max_side)
+    result = _ocr_one(image_path, mode, max_side)
+    return [add_layout(result) if layout else result]
+
+
+def _ocr_one(image_path: str, mode: str, max_side: int) -> Dict[str, Any]:
+    empty = _empty_result()
     if not image_path or not os.path.exists(image_path):
         return empty
 
-    ocr = _get_ocr()
+    ocr = _get_ocr(mode)
 
     try:
         # predict() is the v3 API; ocr() is a deprecated alias for it
-        results = ocr.predict(image_path)
+        results = ocr.predict(image_path, **_predict_kwargs(mode, max_side))
     except Exception:
         # Fail closed, never crash caller
         return empty
 
-    rec_texts: List[str] = []
-    rec_scores: List[float] = []
-    text_blocks: List[Dict[str, Any]] = []
+    return _collect(mode, results)
 
-    # results is a list of OCRResult (dict-like) objects:
-    # each has "rec_texts": [str, ...] and "rec_scores": [float, ...]
-    for res in results:
-        texts = res.get("rec_texts", []) or []
-        scores = res.get("rec_scores", []) or []
-        polys = res.get("rec_polys") or res.get("dt_polys") or []
 
-        for i, text in enumerate(texts):
-            if isinstance(text, str) and text.strip():
-                rec_texts.append(text.strip())
-            score = scores[i] if i < len(scores) else 0.0
-            try:
-                rec_scores.append(float(score))
-            except Exception:
-                rec_scores.append(0.0)
-            poly = polys[i] if i < len(polys) else None
-            _append_text_block(text_blocks, text, score, poly)
+def iter_ocr_batch(
+    image_paths: List[str], mode: Optional[str] = None, max_side: Optional[int] = None,
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    OCR many images through one batched PaddleOCR predict (mode / max_side as for run_ocr).
+    Yields (index, result, error) per input as PaddleOCR finishes it — result is
+    the dict run_ocr() wraps in a list, or None with an error message.
+    """
+    mode, max_side = resolve_mode(mode, max_side)
+    existing: List[int] = []
+    for index, image_path in enumerate(image_paths):
+        if image_path and os.path.exists(image_path):
+            existing.append(index)
+        else:
+            yield index, None, "image_path does not exist"
+    if not existing:
+        return
+
+    ocr = _get_ocr(mode)
+    kwargs = _predict_kwargs(mode, max_side)
+    done = 0
+    try:
+        # predict_iter() hands back each image's result as soon as it is ready;
+        # predict() is the same call collected into a list.
+        predict = getattr(ocr, "predict_iter", None) or ocr.predict
+        for res in predict([image_paths[i] for i in existing], **kwargs):
+            result = _collect(mode, [res])
+            yield existing[done], result, None
+            done += 1
+    except Exception:
+        pass
+    # One unreadable image fails the whole batched call: finish the rest one by one.
+    for index in existing[done:]:
+        try:
+            yield index, _collect(mode, ocr.predict(image_paths[index], **kwargs)), None
+        except Exception as e:
+            yield index, None, f"{type(e).__name__}: {e}"
+
 
-    return [{"rec_texts": rec_texts, "rec_scores": rec_scores, "text_blocks": text_blocks}]
+def run_ocr_batch(
+    image_paths: List[str], mode: Optional[str] = None, max_side: Optional[int] = None, layout: bool = False,
+) -> List[List[Dict[str, Any]]]:
+    """Batched run_ocr(): one run_ocr()-shaped list per input path, in input order."""
+    out = [_empty_result() for _ in image_paths]
+    for index, result, _ in iter_ocr_batch(image_paths, mode, max_side):
+        if result is not None:
+            out[index] = result
+    return [[add_layout(result) if layout else result] for result in out]
 
 
 # -----------------------------
 # CLI / subprocess support
 # -----------------------------
 if __name__ == "__main__":
-    # Expected usage:
-    #   python ocr_engine.py /path/to/image.jpg
+    # Expected usage (from backend/src):
+    #   python -m ocr.ocr_engine /path/to/image.jpg [full|fast|detect]
     if len(sys.argv) < 2:
         print(json.dumps([{"rec_texts": [], "rec_scores": [], "text_blocks": []}]))
         sys.exit(0)
 
     image_path = sys.argv[1]
-    result = run_ocr(image_path)
+    result = run_ocr(image_path, sys.argv[2] if len(sys.argv) > 2 else None)
     print(json.dumps(result))
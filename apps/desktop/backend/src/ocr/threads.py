@@ -0,0 +1,123 @@
+"""
+CPU threads for each OCR process.
+
+PaddleOCR runs inference on `cpu_threads` threads, and MKL / OpenMP size
+their pools from OMP_NUM_THREADS / MKL_NUM_THREADS when paddle is imported.
+The count comes from UFM_OCR_THREADS (the app sets 1 on single-thread
+resource profiles); 0 or unset means auto: a count found by autotune and
+saved in UFM_OCR_TUNE_FILE for this machine, else cores / UFM_OCR_WORKERS.
+
+No paddle imports here: apply_thread_env() has to run before paddle loads.
+"""
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+def _cores() -> int:
+    return os.cpu_count() or 1
+
+
+def _workers() -> int:
+    try:
+        return max(1, int(os.environ.get("UFM_OCR_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def default_threads() -> int:
+    """An even share of the cores for each OCR worker."""
+    return max(1, _cores() // _workers())
+
+
+def candidate_threads() -> List[int]:
+    """Thread counts autotune tries: powers of two up to the default share, plus the share itself."""
+    top = default_threads()
+    return sorted({n for n in (1, 2, 4, 8, 16, 32) if n < top} | {top})
+
+
+def tune_file() -> str:
+    return os.environ.get("UFM_OCR_TUNE_FILE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "ufm", "ocr-threads.json"
+    )
+
+
+def _machine() -> Dict[str, object]:
+    # A saved result only holds for the same cores, pool size and Paddle build.
+    from importlib import metadata
+    versions = {}
+    for dist in ("paddleocr", "paddlepaddle"):
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    return {"cores": _cores(), "workers": _workers(), **versions}
+
+
+def load_tuned() -> Optional[int]:
+    try:
+        with open(tune_file()) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("machine") != _machine():
+        return None
+    threads = data.get("threads")
+    if not isinstance(threads, int) or threads < 1:
+        return None
+    return threads
+
+
+def save_tuned(threads: int, timings_ms: Dict[int, float]) -> None:
+    path = tune_file()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {"threads": threads, "timings_ms": {str(k): v for k, v in timings_ms.items()}, "machine": _machine()}
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def configured_threads() -> Tuple[int, str]:
+    """(threads, source) — source is "env", "tuned" or "auto"."""
+    try:
+        threads = int(os.environ.get("UFM_OCR_THREADS", "0"))
+    except ValueError:
+        threads = 0
+    if threads > 0:
+        return threads, "env"
+    tuned = load_tuned()
+    if tuned:
+        return tuned, "tuned"
+    return default_threads(), "auto"
+
+
+def apply_thread_env(threads: int) -> None:
+    """Size the OpenMP / BLAS pools. Only has an effect before paddle is imported."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+
+def calibration_image() -> str:
+    """UFM_OCR_CALIBRATION_IMAGE, or a generated flyer-like page of product lines and prices."""
+    path = os.environ.get("UFM_OCR_CALIBRATION_IMAGE")
+    if path and os.path.exists(path):
+        return path
+    from PIL import Image, ImageDraw, ImageFont
+    path = os.path.join(tempfile.gettempdir(), "ufm-ocr-calibration.png")
+    if os.path.exists(path):
+        return path
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        font = ImageFont.load_default()
+    img = Image.new("RGB", (1080, 1440), "white")
+    draw = ImageDraw.Draw(img)
+    items = ("Fresh Gala Apples", "Whole Milk 4L", "Jasmine Rice 8kg", "Large Eggs 12pk", "Bok Choy")
+    for row in range(24):
+        y = 40 + row * 58
+        draw.text((40, y), f"{items[row % len(items)]} #{row + 1}", fill="black", font=font)
+        draw.text((760, y), f"${(row * 37 % 900 + 99) / 100:.2f} /ea", fill=(200, 0, 0), font=font)
+    img.save(path + ".tmp.png")
+    os.replace(path + ".tmp.png", path)
+    return path
@@ -0,0 +1,118 @@
+"""
+Tiled OCR for very large pages (full-page flyer screenshots and scans).
+
+The page is cut into overlapping tiles that are OCR'd separately — by the
+server's OCR pool, several workers at once — at full resolution, then the
+tile results are shifted back into page coordinates and merged. A line cut
+by a tile seam shows up in both neighbouring tiles (once clipped, once whole
+when the overlap is taller than the line); boxes from different tiles that
+mostly overlap are treated as one block and the larger box wins.
+
+No paddle imports here: the server uses this module directly.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Rect = Tuple[int, int, int, int]  # x0, y0, x1, y1 in page pixels
+
+# Two boxes from different tiles are one block when their intersection covers
+# this much of the smaller box.
+DUPLICATE_OVERLAP = 0.5
+
+
+def _starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)  # last tile flush with the edge
+    return starts
+
+
+def plan_tiles(width: int, height: int, tile: int, overlap: int) -> List[Rect]:
+    """Row-major tile rects covering width x height; neighbours share `overlap` px."""
+    stride = max(1, tile - overlap)
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in _starts(height, tile, stride)
+        for x in _starts(width, tile, stride)
+    ]
+
+
+def write_tiles(image_path: str, out_dir: str, tile: int, overlap: int) -> Tuple[int, int, List[Tuple[str, Rect]]]:
+    """Crop `image_path` into tile PNGs in `out_dir`. Returns (width, height, [(tile_path, rect)])."""
+    from PIL import Image
+    with Image.open(image_path) as img:
+        img.load()
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        width, height = img.size
+        tiles = []
+        for i, rect in enumerate(plan_tiles(width, height, tile, overlap)):
+            path = os.path.join(out_dir, f"tile_{i:03d}.png")
+            # compress_level=1: the tiles are read once and deleted.
+            img.crop(rect).save(path, compress_level=1)
+            tiles.append((path, rect))
+    return width, height, tiles
+
+
+def _overlap_ratio(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    ix = min(a["x"] + a["width"], b["x"] + b["width"]) - max(a["x"], b["x"])
+    iy = min(a["y"] + a["height"], b["y"] + b["height"]) - max(a["y"], b["y"])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    smaller = min(a["width"] * a["height"], b["width"] * b["height"])
+    return ix * iy / max(1, smaller)
+
+
+def _rects_touch(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_boxes(tiles: Sequence[Rect], per_tile: Sequence[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Shift each tile's boxes into page space and drop seam duplicates, in reading order."""
+    shifted, unplaced = [], []
+    for t, boxes in enumerate(per_tile):
+        x0, y0 = tiles[t][0], tiles[t][1]
+        for box in boxes:
+            if "x" not in box:
+                unplaced.append(box)  # no polygon: nothing to place or compare
+                continue
+            shifted.append((t, {**box, "x": box["x"] + x0, "y": box["y"] + y0}))
+
+    # Largest first, so a clipped copy meets its whole counterpart already kept.
+    # Only boxes from overlapping tiles can be duplicates.
+    shifted.sort(key=lambda tb: (-tb[1]["width"] * tb[1]["height"], -tb[1].get("score", 0.0)))
+    kept_by_tile: List[List[Dict[str, Any]]] = [[] for _ in tiles]
+    for t, box in shifted:
+        duplicate = any(
+            _overlap_ratio(box, other) >= DUPLICATE_OVERLAP
+            for u, kept in enumerate(kept_by_tile)
+            if u != t and kept and _rects_touch(tiles[u], tiles[t])
+            for other in kept
+        )
+        if not duplicate:
+            kept_by_tile[t].append(box)
+
+    merged = [box for kept in kept_by_tile for box in kept]
+    merged.sort(key=lambda b: (b["y"], b["x"]))
+    return merged + unplaced
+
+
+def merge_tile_results(tiles: Sequence[Rect], results: Sequence[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merge per-tile run_ocr() results (None for a failed tile) into one
+    page-space result: text_blocks in reading order with rec_texts /
+    rec_scores rebuilt from them, plus "boxes" for detect-only results and
+    the tile count.
+    """
+    results = [r or {} for r in results]
+    text_blocks = _merge_boxes(tiles, [r.get("text_blocks", []) for r in results])
+    merged: Dict[str, Any] = {
+        "rec_texts": [b["text"] for b in text_blocks],
+        "rec_scores": [b.get("score", 0.0) for b in text_blocks],
+        "text_blocks": text_blocks,
+        "tiles": len(tiles),
+    }
+    if any("boxes" in r for r in results):
+        merged["boxes"] = _merge_boxes(tiles, [r.get("boxes", []) for r in results])
+    return merged
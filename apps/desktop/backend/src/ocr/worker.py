@@ -0,0 +1,82 @@
+"""
+Long-lived OCR worker process, spawned by the OCR pool in cutout_service.server.
+
+The engines for `warm_modes` (see ocr.modes) are built once when the process
+starts — other modes load on first use — then jobs arrive over a
+multiprocessing Pipe as (kind, payload) tuples. With `autotune`, a worker
+whose thread count isn't pinned or already tuned first times the thread
+counts (ocr_engine.autotune_threads). The worker first sends ("ready",
+{load_ms, threads, threads_source, tune}, rss_mb) — or ("failed", message,
+rss_mb) and exits — and then
+answers every job with ("ok", result, rss_mb) or ("error", message, rss_mb).
+Batch jobs first stream ("item", index, result, error) per image as it finishes.
+None (or the parent closing the pipe) ends the loop.
+
+Only this module and ocr_engine are imported here, never the server.
+"""
+import contextlib
+import io
+import time
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 ** 2)
+    except ImportError:
+        return -1.0
+
+
+def _run_job(conn, kind: str, payload: dict):
+    from ocr.ocr_engine import iter_ocr_batch, run_ocr
+    mode, max_side = payload.get("mode"), payload.get("max_side")
+    if kind == "ocr":
+        return run_ocr(payload["image_path"], mode, max_side)
+    if kind == "ocr_batch":
+        for index, result, error in iter_ocr_batch(payload["image_paths"], mode, max_side):
+            conn.send(("item", index, result, error))
+        return None
+    raise ValueError(f"unknown OCR job kind {kind!r}")
+
+
+def serve(conn, warm_modes=("full",), autotune=False):
+    t0 = time.perf_counter()
+    tune = None
+    try:
+        # PaddleOCR / PaddleX print model download and init chatter to stdout.
+        with contextlib.redirect_stdout(io.StringIO()):
+            from ocr.ocr_engine import _get_ocr, autotune_threads, cpu_threads
+            if autotune and cpu_threads()[1] == "auto":
+                try:
+                    tune = autotune_threads(warm_modes[0] if warm_modes else "full")
+                except Exception as e:
+                    tune = {"error": f"{type(e).__name__}: {e}"}
+            for mode in warm_modes:
+                _get_ocr(mode)
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}", _rss_mb()))
+        return
+    threads, source = cpu_threads()
+    info = {
+        "load_ms": round((time.perf_counter() - t0) * 1000),
+        "threads": threads,
+        "threads_source": source,
+        "tune": tune,
+    }
+    conn.send(("ready", info, _rss_mb()))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return  # parent went away
+        if job is None:
+            return
+        kind, payload = job
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = _run_job(conn, kind, payload)
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", _rss_mb()))
+            continue
+        conn.send(("ok", result, _rss_mb()))
@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# The server module is imported for its helpers only: no ML model, no on-disk caches.
+os.environ.setdefault("UFM_REMBG_MODEL", "border-trim")
+os.environ.setdefault("UFM_CUTOUT_CACHE_MB", "0")
+os.environ.setdefault("UFM_OCR_CACHE_MB", "0")
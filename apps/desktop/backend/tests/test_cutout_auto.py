@@ -0,0 +1,124 @@
+"""/cutout/auto's escalation rules, with each stage's verdict scripted."""
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from cutout_service import server
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """Run /cutout/auto with stage outcomes from `script`: model -> coverage, "ok" coverage or an exception."""
+    script = {}
+    ran = []
+
+    async def fake_stage(src_full, model_name, shared=None):
+        ran.append(model_name)
+        outcome = script[model_name]
+        if isinstance(outcome, Exception):
+            raise outcome
+        coverage, ok = outcome
+        quality = {"alpha_coverage": coverage, "quality_reason": None if ok else "foreground-too-small"}
+        return Image.new("RGBA", (8, 8)), quality, model_name
+
+    async def no_mem_policy(model_names):
+        return None
+
+    monkeypatch.setattr(server, "_cutout_stage", fake_stage)
+    monkeypatch.setattr(server, "_apply_mem_policy", no_mem_policy)
+    monkeypatch.setattr(server, "REMBG_MODEL", "u2net")
+    monkeypatch.delenv("UFM_CUTOUT_FALLBACK_MODEL", raising=False)
+    client = TestClient(server.app)
+
+    def run(**outcomes):
+        script.clear()
+        ran.clear()
+        script.update({name.replace("_", "-"): value for name, value in outcomes.items()})
+        response = client.post("/cutout/auto", files={"file": ("a.png", _png(), "image/png")})
+        assert response.status_code == 200, response.text
+        return response.json(), list(ran)
+
+    return run
+
+
+def test_confident_border_trim_stops_there(cascade):
+    result, ran = cascade(border_trim=(0.4, True))
+    assert ran == ["border-trim"]
+    assert result["model"] == "border-trim"
+
+
+def test_confident_primary_wins(cascade):
+    result, ran = cascade(border_trim=(0.9, False), u2net=(0.3, True))
+    assert ran == ["border-trim", "u2net"]
+    assert result["model"] == "u2net"
+
+
+def test_low_confidence_primary_escalates_to_fallback(cascade):
+    result, ran = cascade(border_trim=(0.2, False), u2net=(0.3, False), isnet_general_use=(0.35, True))
+    assert ran == ["border-trim", "u2net", "isnet-general-use"]
+    assert result["model"] == "isnet-general-use"
+
+
+def test_failed_primary_still_tries_fallback(cascade):
+    result, ran = cascade(
+        border_trim=(0.2, False), u2net=RuntimeError("model failed to load"), isnet_general_use=(0.3, True)
+    )
+    assert ran == ["border-trim", "u2net", "isnet-general-use"]
+    assert result["model"] == "isnet-general-use"
+    assert "error" in result["stages"][1]
+
+
+def test_all_low_confidence_keeps_the_most_coverage(cascade):
+    result, _ = cascade(border_trim=(0.2, False), u2net=(0.5, False), isnet_general_use=(0.3, False))
+    assert result["model"] == "u2net"
+    result, _ = cascade(border_trim=(0.6, False), u2net=(0.5, False), isnet_general_use=(0.3, False))
+    assert result["model"] == "border-trim"
+
+
+def test_classical_primary_goes_to_an_ml_fallback(cascade, monkeypatch):
+    monkeypatch.setattr(server, "REMBG_MODEL", "border-trim")
+    result, ran = cascade(border_trim=(0.2, False))
+    assert ran == ["border-trim"]  # no fallback configured for a classical primary
+    monkeypatch.setenv("UFM_CUTOUT_FALLBACK_MODEL", "isnet-general-use")
+    result, ran = cascade(border_trim=(0.2, False), isnet_general_use=(0.3, True))
+    assert ran == ["border-trim", "isnet-general-use"]
+    assert result["model"] == "isnet-general-use"
+
+
+def test_repeat_request_is_a_cache_hit(cascade, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_cutout_cache", server._DiskLruCache("cutout-cache", str(tmp_path), 64))
+    outcomes = {"border_trim": (0.2, False), "u2net": (0.3, False), "isnet_general_use": (0.35, True)}
+    first, ran = cascade(**outcomes)
+    assert ran == ["border-trim", "u2net", "isnet-general-use"]
+    assert "cached" not in first
+
+    second, ran = cascade(**outcomes)
+    assert ran == []
+    assert second["cached"] is True
+    assert second["model"] == "isnet-general-use"
+    assert second["stages"] == first["stages"]
+    assert second["output_path"] != first["output_path"]
+
+    # A different cascade is a different key.
+    monkeypatch.setenv("UFM_CUTOUT_FALLBACK_MODEL", "birefnet-general")
+    _, ran = cascade(border_trim=(0.2, False), u2net=(0.3, False), birefnet_general=(0.4, True))
+    assert ran == ["border-trim", "u2net", "birefnet-general"]
+    monkeypatch.setattr(server, "REMBG_MODEL", "isnet-general-use")
+    _, ran = cascade(border_trim=(0.2, False), isnet_general_use=(0.3, True))
+    assert ran == ["border-trim", "isnet-general-use"]
+
+
+def test_failed_stage_is_not_cached(cascade, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_cutout_cache", server._DiskLruCache("cutout-cache", str(tmp_path), 64))
+    outcomes = {"border_trim": (0.2, False), "u2net": RuntimeError("load failed"), "isnet_general_use": (0.3, True)}
+    cascade(**outcomes)
+    _, ran = cascade(**outcomes)
+    assert ran == ["border-trim", "u2net", "isnet-general-use"]
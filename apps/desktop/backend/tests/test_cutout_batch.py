@@ -0,0 +1,59 @@
+"""/cutout/batch streams each image's line as soon as that image is done."""
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from cutout_service import server
+
+
+def test_lines_stream_in_completion_order(tmp_path, monkeypatch):
+    # One chunk of three; the first image is slow, so it must not hold back the others.
+    widths = [120, 40, 60]
+    paths = []
+    for i, width in enumerate(widths):
+        path = tmp_path / f"in{i}.png"
+        Image.new("RGB", (width, 30), "white").save(path)
+        paths.append(str(path))
+
+    async def fake_classical(src_opaque, analysis, model_name):
+        await asyncio.sleep(0.3 if src_opaque.width == 120 else 0.01 * src_opaque.width / 20)
+        quality = {"alpha_coverage": 0.5, "quality_reason": None}
+        return Image.new("RGBA", src_opaque.size), quality, model_name
+
+    monkeypatch.setattr(server, "_classical_cutout", fake_classical)
+    monkeypatch.setattr(server, "_CUTOUT_BATCH_SIZE", 3)
+    monkeypatch.setattr(server._cutout_workers, "capacity", 3)
+    response = TestClient(server.app).post(
+        "/cutout/batch", data={"model": "border-trim", "image_paths": paths + ["/missing.png"]}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line.get("index") for line in lines[:-1]] == [1, 2, 0, 3]
+    assert "error" in lines[3]
+    assert all(line["model"] == "border-trim" for line in lines[:3])
+    assert lines[-1] == {**lines[-1], "done": True, "count": 4, "failed": 1}
+
+
+def test_repeat_images_are_cache_hits(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "_cutout_cache", server._DiskLruCache("cutout-cache", str(tmp_path / "cache"), 64))
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"in{i}.png"
+        Image.new("RGB", (40 + i * 10, 30), "white").save(path)
+        paths.append(str(path))
+    client = TestClient(server.app)
+
+    def run(image_paths):
+        response = client.post("/cutout/batch", data={"model": "border-trim", "image_paths": image_paths})
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    first = run(paths[:2])
+    assert first[-1]["cached"] == 0
+    second = run(paths)
+    assert second[-1]["cached"] == 2
+    before = {line["index"]: line for line in first[:-1]}
+    after = {line["index"]: line for line in second[:-1]}
+    assert after[0]["cached"] and after[1]["cached"]
+    assert "cached" not in after[2]
+    assert after[1]["alpha_coverage"] == before[1]["alpha_coverage"]
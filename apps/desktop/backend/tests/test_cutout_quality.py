@@ -0,0 +1,198 @@
+"""
+_cutout_quality's fused metrics against the per-metric helpers it replaced:
+same numbers and verdicts on fixed RGBA arrays, exactly and in the sampled
+(UFM_QUALITY_SAMPLE_EDGE_PX) mode.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+from cutout_service import server
+
+
+# ── The original helpers, each re-reading the alpha channel ─────────────────
+def _alpha_coverage(img):
+    return float(np.mean(np.array(img.getchannel("A")) > 10))
+
+
+def _alpha_border_fraction(img, threshold=10, border_px=6):
+    alpha = np.array(img.getchannel("A"), dtype=np.uint8)
+    h, w = alpha.shape[:2]
+    b = max(1, min(border_px, h // 4, w // 4))
+    strips = [alpha[:b, :], alpha[h - b:, :], alpha[b:h - b, :b], alpha[b:h - b, w - b:]]
+    return float(np.mean(np.concatenate([s.reshape(-1) for s in strips]) > threshold))
+
+
+def _alpha_bbox_metrics(img, threshold=10):
+    alpha = np.array(img.getchannel("A"), dtype=np.uint8)
+    mask = alpha > threshold
+    if not np.any(mask):
+        return {"bbox_area_ratio": 0.0, "bbox_fill_ratio": 0.0}
+    ys, xs = np.where(mask)
+    bbox_area = int((xs.max() - xs.min() + 1) * (ys.max() - ys.min() + 1))
+    img_area = int(alpha.shape[0] * alpha.shape[1])
+    return {
+        "bbox_area_ratio": bbox_area / img_area,
+        "bbox_fill_ratio": int(np.count_nonzero(mask)) / bbox_area,
+    }
+
+
+def _component_count(img, threshold=10, min_area=75):
+    import cv2
+    mask = (np.array(img.getchannel("A"), dtype=np.uint8) > threshold).astype(np.uint8) * 255
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    return sum(1 for i in range(1, num_labels) if int(stats[i, cv2.CC_STAT_AREA]) >= min_area)
+
+
+def _light_halo_fraction(img):
+    arr = np.array(img.convert("RGBA"), dtype=np.uint8)
+    rgb, alpha = arr[:, :, :3], arr[:, :, 3]
+    fg = alpha > 10
+    fg_count = int(np.count_nonzero(fg))
+    if fg_count == 0:
+        return 0.0
+    light = np.all(rgb > 215, axis=2)
+    semi = (alpha > 10) & (alpha < 250)
+    return float(np.count_nonzero(fg & light & semi) / fg_count)
+
+
+def _baseline_quality(img, is_white_bg):
+    coverage = _alpha_coverage(img)
+    border_alpha = _alpha_border_fraction(img)
+    bbox = _alpha_bbox_metrics(img)
+    component_count = _component_count(img)
+    light_halo = _light_halo_fraction(img)
+    reason = None
+    if coverage < 0.04:
+        reason = "foreground-too-small"
+    elif (not is_white_bg) and coverage > 0.87 and bbox["bbox_area_ratio"] > 0.94:
+        reason = "background-retained"
+    elif border_alpha > 0.55:
+        reason = "opaque-border"
+    elif border_alpha > 0.22 and coverage > 0.65:
+        reason = "border-background-retained"
+    elif bbox["bbox_area_ratio"] > 0.94 and coverage > 0.80:
+        reason = "full-rectangle-mask"
+    elif component_count > 25:
+        reason = "fragmented-mask"
+    elif border_alpha > 0.12 and light_halo > 0.30:
+        reason = "light-gray-halo"
+    return {
+        "alpha_coverage": round(coverage, 3),
+        "border_alpha": round(border_alpha, 3),
+        "component_count": component_count,
+        "bbox_area_ratio": round(bbox["bbox_area_ratio"], 3),
+        "bbox_fill_ratio": round(bbox["bbox_fill_ratio"], 3),
+        "light_halo": round(light_halo, 3),
+        "quality_reason": reason,
+    }
+
+
+# ── Fixed 800x600 cutouts, one per verdict ───────────────────────────────────
+def _blank(h=600, w=800):
+    arr = np.zeros((h, w, 4), np.uint8)
+    arr[:, :, :3] = (90, 60, 40)
+    return arr
+
+
+def _good_product():
+    arr = _blank()
+    arr[150:450, 250:550, 3] = 255
+    arr[140:150, 250:550, 3] = 120  # soft top edge
+    return arr
+
+
+def _tiny():
+    arr = _blank()
+    arr[280:320, 380:420, 3] = 255
+    return arr
+
+
+def _background_retained():
+    arr = _blank()
+    arr[:, :, 3] = 255
+    arr[:40, :60, 3] = 0
+    return arr
+
+
+def _opaque_border():
+    arr = _blank()
+    arr[:, :, 3] = 255
+    arr[60:540, 60:740, 3] = 0
+    return arr
+
+
+def _border_background_retained():
+    arr = _blank()
+    arr[90:600, 70:730, 3] = 255  # mostly kept, resting on the bottom edge
+    return arr
+
+
+def _fragmented():
+    arr = _blank()
+    arr[200:400, 300:500, 3] = 255
+    for i in range(40):  # 40 islands of 16x16 px, well above min_area
+        y, x = 30 + (i // 10) * 40, 30 + (i % 10) * 70
+        arr[y:y + 16, x:x + 16, 3] = 255
+    return arr
+
+
+def _light_halo():
+    arr = _blank()
+    arr[200:400, 250:550, 3] = 255
+    arr[0:100, :, 3] = 180  # pale semi-transparent band along the top
+    arr[0:100, :, :3] = 235
+    return arr
+
+
+CASES = {
+    "good-product": (_good_product, None),
+    "tiny": (_tiny, "foreground-too-small"),
+    "background-retained": (_background_retained, "background-retained"),
+    "opaque-border": (_opaque_border, "opaque-border"),
+    "border-background-retained": (_border_background_retained, "border-background-retained"),
+    "fragmented": (_fragmented, "fragmented-mask"),
+    "light-halo": (_light_halo, "light-gray-halo"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_cases_cover_each_verdict(name):
+    make, reason = CASES[name]
+    assert _baseline_quality(Image.fromarray(make(), "RGBA"), False)["quality_reason"] == reason
+
+
+@pytest.mark.parametrize("is_white_bg", [False, True])
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_exact_metrics_match_baseline(name, is_white_bg):
+    arr = CASES[name][0]()
+    expected = _baseline_quality(Image.fromarray(arr, "RGBA"), is_white_bg)
+    assert server._cutout_quality(arr, is_white_bg, sample_edge_px=0) == expected
+    assert server._cutout_quality(Image.fromarray(arr, "RGBA"), is_white_bg, sample_edge_px=0) == expected
+
+
+@pytest.mark.parametrize("sample_edge_px", [400, 200])
+@pytest.mark.parametrize("is_white_bg", [False, True])
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_sampled_mode_keeps_verdicts(name, is_white_bg, sample_edge_px):
+    arr = CASES[name][0]()
+    expected = _baseline_quality(Image.fromarray(arr, "RGBA"), is_white_bg)
+    sampled = server._cutout_quality(arr, is_white_bg, sample_edge_px=sample_edge_px)
+    # quality_reason is None exactly when the cutout is not low-confidence.
+    assert sampled["quality_reason"] == expected["quality_reason"]
+    assert sampled["border_alpha"] == expected["border_alpha"]  # always measured at full resolution
+    assert abs(sampled["alpha_coverage"] - expected["alpha_coverage"]) <= 0.01
+    assert abs(sampled["light_halo"] - expected["light_halo"]) <= 0.01
+
+
+def test_sampling_is_off_for_small_images():
+    arr = _good_product()[:300, :400]
+    assert server._cutout_quality(arr, False, sample_edge_px=400) == server._cutout_quality(arr, False, sample_edge_px=0)
+
+
+def test_sample_edge_px_defaults_from_env(monkeypatch):
+    arr = _fragmented()
+    monkeypatch.setenv("UFM_QUALITY_SAMPLE_EDGE_PX", "200")
+    assert server._cutout_quality(arr, False) == server._cutout_quality(arr, False, sample_edge_px=200)
+    monkeypatch.setenv("UFM_QUALITY_SAMPLE_EDGE_PX", "not-a-number")
+    assert server._cutout_quality(arr, False) == server._cutout_quality(arr, False, sample_edge_px=0)
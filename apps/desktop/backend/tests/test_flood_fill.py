@@ -0,0 +1,149 @@
+"""
+_flood_fill_mask / border_trim_background against the per-pixel deque BFS
+they replaced, on synthetic images with the awkward cases: solid and gradient
+borders, foreground touching the edge, and 1-px gaps in an enclosing wall.
+"""
+import sys
+from collections import deque
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from cutout_service import server
+
+
+def _bfs_fill(is_bg, seeds, shape):
+    """The original border-trim fill: a deque BFS calling is_bg(y, x) per pixel."""
+    h, w = shape
+    visited = np.zeros((h, w), dtype=bool)
+    queue = deque()
+    for y, x in zip(*np.nonzero(seeds)):
+        if not visited[y, x] and is_bg(y, x):
+            visited[y, x] = True
+            queue.append((y, x))
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < h and 0 <= nx < w and not visited[ny, nx] and is_bg(ny, nx):
+                visited[ny, nx] = True
+                queue.append((ny, nx))
+    return visited
+
+
+def _perimeter(shape):
+    seeds = np.zeros(shape, dtype=bool)
+    seeds[0, :] = seeds[-1, :] = True
+    seeds[:, 0] = seeds[:, -1] = True
+    return seeds
+
+
+def _solid_border():
+    img = np.full((120, 160, 3), 255, np.uint8)
+    img[30:90, 40:120] = (200, 30, 30)
+    return img
+
+
+def _gradient_border():
+    # Warm backdrop drifting across the frame, within border-trim's tolerance.
+    img = np.zeros((120, 160, 3), np.uint8)
+    ramp = np.linspace(0, 18, 160)
+    img[:, :, 0] = 150 + ramp
+    img[:, :, 1] = 120 + ramp
+    img[:, :, 2] = 90 + ramp
+    img[35:85, 50:110] = (20, 60, 160)
+    return img
+
+
+def _touching_foreground():
+    img = np.full((120, 160, 3), 255, np.uint8)
+    img[20:100, 100:160] = (40, 40, 40)  # runs off the right edge
+    img[0:15, 0:30] = (40, 120, 40)  # and into a corner
+    return img
+
+
+def _wall(gap: bool):
+    # A dark ring around white floor, optionally with a 1-px gap in its wall.
+    img = np.full((120, 160, 3), 255, np.uint8)
+    img[20:100, 30:130] = (30, 30, 30)
+    img[22:98, 32:128] = 255
+    if gap:
+        img[20:22, 80] = 255
+    return img
+
+
+IMAGES = {
+    "solid-border": _solid_border,
+    "gradient-border": _gradient_border,
+    "touching-foreground": _touching_foreground,
+    "wall-closed": lambda: _wall(False),
+    "wall-1px-gap": lambda: _wall(True),
+}
+
+
+@pytest.mark.parametrize("name", sorted(IMAGES))
+def test_border_trim_fill_matches_bfs(name, monkeypatch):
+    rgb = IMAGES[name]()
+    analysis = server.ImageAnalysis(Image.fromarray(rgb, "RGB"))
+    captured = {}
+    real_fill = server._flood_fill_mask
+
+    def spy(candidate, seeds):
+        captured["filled"] = real_fill(candidate, seeds)
+        return captured["filled"]
+
+    monkeypatch.setattr(server, "_flood_fill_mask", spy)
+    server.border_trim_background(None, analysis=analysis)
+
+    tolerance = 25
+    bg = analysis.bg_color
+    edge_stop = 8.0 if analysis.bg_is_near_white else 15.0
+    sobel = analysis.sobel_magnitude
+    pixels = rgb.astype(np.int32)
+
+    def is_bg(y, x):
+        return bool(np.all(np.abs(pixels[y, x] - bg) <= tolerance)) and sobel[y, x] < edge_stop
+
+    expected = _bfs_fill(is_bg, _perimeter(rgb.shape[:2]), rgb.shape[:2])
+    assert np.array_equal(captured["filled"], expected)
+    assert expected.any()
+
+
+def test_one_pixel_gap_connects_enclosed_region():
+    # On a mask a 1-px opening is enough (in an image the Sobel gate closes it).
+    candidate = np.ones((40, 40), dtype=bool)
+    candidate[10, 10:30] = candidate[29, 10:30] = False
+    candidate[10:30, 10] = candidate[10:30, 29] = False
+    seeds = _perimeter(candidate.shape)
+    assert not server._flood_fill_mask(candidate, seeds)[20, 20]
+    candidate[10, 20] = True
+    filled = server._flood_fill_mask(candidate, seeds)
+    assert filled[20, 20]
+    assert np.array_equal(filled, _bfs_fill(lambda y, x: candidate[y, x], seeds, candidate.shape))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("density", [0.45, 0.6, 0.75])
+def test_random_masks_match_bfs(seed, density):
+    rng = np.random.default_rng(seed)
+    candidate = rng.random((64, 96)) < density
+    seeds = _perimeter(candidate.shape)
+    expected = _bfs_fill(lambda y, x: candidate[y, x], seeds, candidate.shape)
+    assert np.array_equal(server._flood_fill_mask(candidate, seeds), expected)
+
+
+def test_seeds_outside_candidate_are_ignored():
+    candidate = np.zeros((10, 10), dtype=bool)
+    candidate[4:6, 4:6] = True
+    seeds = _perimeter(candidate.shape)
+    assert not server._flood_fill_mask(candidate, seeds).any()
+
+
+def test_fallback_without_cv2_matches_bfs(monkeypatch):
+    monkeypatch.setitem(sys.modules, "cv2", None)  # import cv2 -> ImportError
+    rng = np.random.default_rng(7)
+    candidate = rng.random((48, 48)) < 0.6
+    seeds = _perimeter(candidate.shape)
+    expected = _bfs_fill(lambda y, x: candidate[y, x], seeds, candidate.shape)
+    assert np.array_equal(server._flood_fill_mask(candidate, seeds), expected)
@@ -0,0 +1,27 @@
+"""/ocr/batch always ends its stream, whatever a chunk raises."""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cutout_service import server
+
+
+@pytest.mark.parametrize("exc", [ValueError("bad payload"), KeyError("index"), BrokenPipeError("worker pipe")])
+def test_unexpected_chunk_error_is_reported(exc, monkeypatch):
+    async def fake_run(kind, payload, on_item=None):
+        if "boom.png" in payload["image_paths"]:
+            raise exc
+        for i, path in enumerate(payload["image_paths"]):
+            on_item(i, {"rec_texts": [path], "rec_scores": [0.9], "text_blocks": []}, None)
+
+    monkeypatch.setattr(server._ocr_pool, "run", fake_run)
+    monkeypatch.setattr(server, "_OCR_BATCH_SIZE", 2)
+    paths = ["a.png", "b.png", "boom.png", "c.png", "d.png"]
+    response = TestClient(server.app).post("/ocr/batch", json={"image_paths": paths})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert sorted(by_index) == [0, 1, 2, 3, 4]
+    assert "error" in by_index[2] and "error" in by_index[3]  # the chunk that raised
+    assert by_index[4]["rec_texts"] == ["d.png"]
+    assert lines[-1] == {**lines[-1], "done": True, "count": 5, "failed": 2}
@@ -0,0 +1,113 @@
+"""ocr/layout.py on hand-made text_blocks."""
+from ocr.layout import add_layout, group_layout
+
+
+def _block(text, x, y, width=100, height=20, score=0.9):
+    return {"text": text, "score": score, "x": x, "y": y, "width": width, "height": height}
+
+
+def _two_column_flyer():
+    # Three products per column: a title line with its price just below, and
+    # a wide banner across the top that belongs to no column.
+    blocks = [_block("WEEKLY SPECIALS", 20, 10, width=760, height=30)]
+    for column, x in enumerate((20, 420)):
+        for row in range(3):
+            y = 80 + row * 120
+            blocks.append(_block(f"Item {column}-{row}", x, y, width=160))
+            blocks.append(_block(f"${row + 1}.99", x, y + 28, width=60))
+    return blocks
+
+
+def test_two_column_flyer():
+    blocks = _two_column_flyer()
+    layout = group_layout(blocks)
+
+    assert len(layout["lines"]) == 1 + 2 * 3 * 2
+    assert layout["lines"][0]["text"] == "WEEKLY SPECIALS"
+    assert len(layout["columns"]) == 2
+    assert [c["x"] for c in layout["columns"]] == [20, 420]
+    assert all(0 not in c["lines"] for c in layout["columns"])  # the banner is too wide
+
+    cells = layout["cells"]
+    assert len(cells) == 6
+    assert [c["column"] for c in cells] == [0, 0, 0, 1, 1, 1]
+    assert cells[0]["text"] == "Item 0-0\n$1.99"
+    assert cells[5]["text"] == "Item 1-2\n$3.99"
+    assert all(c["has_price"] for c in cells)
+    assert cells[0] == {**cells[0], "x": 20, "y": 80, "width": 160, "height": 48}
+
+
+def test_lines_keep_same_row_columns_apart():
+    # Row-mates from different columns are one row but two lines (wide gap).
+    layout = group_layout(_two_column_flyer())
+    first_row = [line for line in layout["lines"] if line["y"] == 80]
+    assert [line["text"] for line in first_row] == ["Item 0-0", "Item 1-0"]
+
+
+def test_price_next_to_label_joins_the_line():
+    blocks = [
+        _block("Gala Apples", 20, 100, width=120),
+        _block("$1.99/lb", 150, 102, width=70),
+        _block("Fresh from BC", 20, 126, width=130),
+    ]
+    layout = group_layout(blocks)
+    assert [line["text"] for line in layout["lines"]] == ["Gala Apples $1.99/lb", "Fresh from BC"]
+    assert layout["lines"][0]["blocks"] == [0, 1]
+    (cell,) = layout["cells"]
+    assert cell["text"] == "Gala Apples $1.99/lb\nFresh from BC"
+    assert cell["has_price"]
+
+
+def test_single_product_page_is_one_column():
+    # Every line is wider than half the page, so no narrow line defines a column.
+    blocks = [_block("Jasmine Rice 8kg", 10, 10, width=300), _block("$12.99", 10, 40, width=280)]
+    layout = group_layout(blocks)
+    assert len(layout["columns"]) == 1
+    (cell,) = layout["cells"]
+    assert cell["text"] == "Jasmine Rice 8kg\n$12.99"
+    assert cell["has_price"]
+
+
+def test_price_formats():
+    for text, priced in (("2/$5", True), ("3.49", True), ("99¢", True), ("$ 4", True), ("Pack of 12", False)):
+        (cell,) = group_layout([_block(text, 0, 0)])["cells"]
+        assert cell["has_price"] is priced, text
+
+
+def test_skewed_boxes_stay_on_their_row():
+    # A slightly rotated scan: each block on a line sits 3 px lower than the last.
+    blocks = []
+    for row in range(3):
+        for i in range(4):
+            blocks.append(_block(f"r{row}w{i}", 20 + i * 90, 100 + row * 40 + i * 3, width=80))
+    layout = group_layout(blocks)
+    assert [line["text"] for line in layout["lines"]] == [
+        f"r{row}w0 r{row}w1 r{row}w2 r{row}w3" for row in range(3)
+    ]
+
+
+def test_blocks_are_ordered_left_to_right_within_a_line():
+    blocks = [_block("world", 130, 50), _block("hello", 20, 50)]
+    (line,) = group_layout(blocks)["lines"]
+    assert line["text"] == "hello world"
+    assert line["blocks"] == [1, 0]
+    assert line["score"] == 0.9
+
+
+def test_empty_input():
+    assert group_layout([]) == {"lines": [], "columns": [], "cells": []}
+    assert add_layout({})["layout"] == {"lines": [], "columns": [], "cells": []}
+
+
+def test_blocks_without_boxes_are_left_out():
+    blocks = [{"text": "no polygon", "score": 0.5}, _block("placed", 10, 10)]
+    (line,) = group_layout(blocks)["lines"]
+    assert line["blocks"] == [1]
+
+
+def test_add_layout_keeps_the_result():
+    result = {"rec_texts": ["a"], "rec_scores": [0.9], "text_blocks": [_block("a", 0, 0)]}
+    out = add_layout(result)
+    assert "layout" not in result
+    assert {k: out[k] for k in result} == result
+    assert out["layout"]["lines"][0]["text"] == "a"
@@ -0,0 +1,119 @@
+"""ocr/tiling.py: tile plans, seam de-duplication and page-space merging."""
+import numpy as np
+from PIL import Image
+
+from ocr.tiling import _merge_boxes, merge_tile_results, plan_tiles, write_tiles
+
+
+def _block(text, x, y, width=100, height=20, score=0.9):
+    return {"text": text, "score": score, "x": x, "y": y, "width": width, "height": height}
+
+
+def test_small_page_is_one_tile():
+    assert plan_tiles(800, 600, 1600, 160) == [(0, 0, 800, 600)]
+
+
+def test_tiles_cover_the_page_with_overlap():
+    tiles = plan_tiles(3000, 5000, 1600, 160)
+    xs = sorted({t[0] for t in tiles})
+    ys = sorted({t[1] for t in tiles})
+    assert xs == [0, 1400]
+    assert ys == [0, 1440, 2880, 3400]
+    assert len(tiles) == len(xs) * len(ys)
+    assert tiles[:2] == [(0, 0, 1600, 1600), (1400, 0, 3000, 1600)]  # row-major
+    covered = np.zeros((5000, 3000), dtype=bool)
+    for x0, y0, x1, y1 in tiles:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+
+def test_edge_tiles_are_flush_with_the_boundary():
+    # The last tile in each direction ends exactly at the page edge, full size.
+    tiles = plan_tiles(3000, 5000, 1600, 160)
+    assert max(t[2] for t in tiles) == 3000
+    assert max(t[3] for t in tiles) == 5000
+    assert all(x1 - x0 == 1600 and y1 - y0 == 1600 for x0, y0, x1, y1 in tiles)
+    for a, b in zip(sorted({t[1] for t in tiles}), sorted({t[1] for t in tiles})[1:]):
+        assert a + 1600 - b >= 160  # neighbours share at least the overlap
+
+
+def test_page_narrower_than_a_tile():
+    tiles = plan_tiles(900, 4000, 1600, 160)
+    assert {(t[0], t[2]) for t in tiles} == {(0, 900)}
+    assert tiles[-1][3] == 4000
+
+
+def test_write_tiles_crops_each_rect(tmp_path):
+    page = np.zeros((2000, 1700, 3), np.uint8)
+    page[:, :, 0] = np.arange(1700) % 256
+    page[:, :, 1] = (np.arange(2000) % 256)[:, None]
+    src = tmp_path / "page.png"
+    Image.fromarray(page).save(src)
+    width, height, tiles = write_tiles(str(src), str(tmp_path), 1600, 160)
+    assert (width, height) == (1700, 2000)
+    for path, (x0, y0, x1, y1) in tiles:
+        assert np.array_equal(np.asarray(Image.open(path)), page[y0:y1, x0:x1])
+
+
+def test_boxes_are_offset_into_page_coordinates():
+    tiles = [(0, 0, 1600, 1600), (1400, 0, 3000, 1600)]
+    merged = _merge_boxes(tiles, [[_block("left", 10, 20)], [_block("right", 300, 40)]])
+    assert [(b["text"], b["x"], b["y"]) for b in merged] == [("left", 10, 20), ("right", 1700, 40)]
+
+
+def test_seam_duplicate_is_kept_once_and_the_whole_box_wins():
+    tiles = [(0, 0, 1600, 1600), (0, 1440, 1600, 3040)]
+    # A line at page y 1550: clipped at the bottom of tile 0, whole in tile 1.
+    clipped = _block("Gala App", 200, 1550, width=180, height=50)
+    whole = _block("Gala Apples", 200, 110, width=260, height=60)
+    merged = _merge_boxes(tiles, [[clipped], [whole]])
+    assert len(merged) == 1
+    assert merged[0]["text"] == "Gala Apples"
+    assert (merged[0]["x"], merged[0]["y"]) == (200, 1550)
+
+
+def test_overlap_below_threshold_keeps_both():
+    tiles = [(0, 0, 1600, 1600), (0, 1440, 1600, 3040)]
+    upper = _block("upper", 200, 1500, height=40)  # page y 1500-1540
+    lower = _block("lower", 200, 90, height=40)  # page y 1530-1570: 25% of either box
+    assert len(_merge_boxes(tiles, [[upper], [lower]])) == 2
+
+
+def test_overlapping_boxes_in_one_tile_are_not_merged():
+    # De-duplication is only across tiles; PaddleOCR's own boxes are kept as-is.
+    tiles = [(0, 0, 1600, 1600)]
+    merged = _merge_boxes(tiles, [[_block("a", 10, 10), _block("b", 12, 12)]])
+    assert len(merged) == 2
+
+
+def test_boxes_from_tiles_that_do_not_touch_are_not_compared():
+    tiles = [(0, 0, 100, 100), (500, 0, 600, 100)]
+    # Both land on page (510, 10), but tiles that don't overlap can't share a line.
+    merged = _merge_boxes(tiles, [[_block("a", 510, 10)], [_block("b", 10, 10)]])
+    assert len(merged) == 2
+
+
+def test_merge_tile_results_rebuilds_reading_order():
+    tiles = [(0, 0, 1600, 1600), (1400, 0, 3000, 1600), (0, 1440, 1600, 3040)]
+    results = [
+        {"text_blocks": [_block("b", 800, 100), {"text": "unplaced", "score": 0.5}]},
+        None,  # failed tile
+        {"text_blocks": [_block("c", 10, 500)]},
+    ]
+    merged = merge_tile_results(tiles, results)
+    assert merged["rec_texts"] == ["b", "c", "unplaced"]
+    assert merged["rec_scores"] == [0.9, 0.9, 0.5]
+    assert merged["text_blocks"][1]["y"] == 1940
+    assert merged["tiles"] == 3
+    assert "boxes" not in merged
+
+
+def test_merge_tile_results_detect_only_boxes():
+    tiles = [(0, 0, 1600, 1600), (1400, 0, 3000, 1600)]
+    box = {"score": 0.8, "x": 1450, "y": 30, "width": 100, "height": 20}
+    results = [
+        {"text_blocks": [], "boxes": [box]},
+        {"text_blocks": [], "boxes": [{**box, "x": 50}]},  # the same box seen from tile 1
+    ]
+    merged = merge_tile_results(tiles, results)
+    assert merged["boxes"] == [box]
@@ -0,0 +1,47 @@
+"""Memory-policy reloads go through the primary model's lifecycle."""
+import pytest
+
+from cutout_service import server
+
+
+@pytest.fixture
+def primary(monkeypatch):
+    calls = []
+    fail = {"load": False}
+
+    def load():
+        calls.append("load")
+        if fail["load"]:
+            raise RuntimeError("birefnet-general failed to load")
+
+    model = server._ModelLifecycle(
+        "rembg", load, lambda: calls.append("unload"), lambda: calls.append("warmup"), 0.0
+    )
+    monkeypatch.setattr(server, "_primary_model", model)
+    monkeypatch.setattr(server, "_MODEL_WARMUP", True)
+    model.ensure_loaded()
+    calls.clear()
+    return model, calls, fail
+
+
+def test_reload_warms_up_and_counts_the_load(primary):
+    model, calls, _ = primary
+    stats = server._teardown_and_reload_session()
+    assert calls == ["unload", "load", "warmup"]
+    assert model.state == "warm"
+    assert (model.loads, model.unloads) == (2, 1)
+    assert model.load_ms is not None and model.warmup_ms is not None
+    assert set(stats) == {"freed_mb", "reload_ms", "rss_after_mb"}
+    assert server._model_ready.is_set()
+
+
+def test_failed_reload_leaves_the_model_cold(primary):
+    model, calls, fail = primary
+    fail["load"] = True
+    server._teardown_and_reload_session()
+    assert model.state == "cold"
+    assert "failed to load" in model.error
+    assert server._model_ready.is_set()
+    fail["load"] = False
+    model.ensure_loaded()  # the next request's acquire() retries
+    assert model.state == "warm"
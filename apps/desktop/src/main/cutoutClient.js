@@ -38,6 +38,12 @@ function cutoutBaseUrl() {
   return `http://${host}:${port}`;
 }
 
+/** The backend shares our filesystem, so it can read inputs by path instead of by upload. */
+function isLocalBackend() {
+  const host = process.env.UFM_HOST || "127.0.0.1";
+  return host === "127.0.0.1" || host === "localhost" || host === "::1";
+}
+
 /**
  * Poll GET /health until `ready` or timeout. Returns true if cutout backend accepts work.
  */
@@ -62,7 +68,10 @@ export async function waitForCutoutReady({ maxWaitMs = 20000, intervalMs = 400 }
  * Downscale the image in Node.js before sending to Python, matching the same
  * cap the Python server applies. Avoids a large Pillow decode spike on the
  * Python side for high-res user photos (editor cutouts) vs. small Serper images.
- * Returns { sendPath, isTemp } — caller must delete isTemp files after use.
+ * With a local backend the shrunk pixels are written as a raw uint8 buffer that
+ * Python reads in one call (np.fromfile), skipping a JPEG/PNG encode here and
+ * a decode there.
+ * Returns { sendPath, isTemp, raw? } — caller must delete isTemp files after use.
  */
 async function preshrinkForCutout(inputPath, modelOverride = null) {
   // Border-trim is pixel-exact flood-fill — full resolution gives cleaner edges.
@@ -85,25 +94,50 @@ async function preshrinkForCutout(inputPath, modelOverride = null) {
   const maxEdge = Math.max(meta.width || 0, meta.height || 0);
   if (maxEdge <= cap) return { sendPath: inputPath, isTemp: false };
 
+  const resized = sharp(inputPath).resize({ width: cap, height: cap, fit: "inside", withoutEnlargement: true });
+  console.log(`[cutout] pre-shrunk input: ${maxEdge}px → ${cap}px before sending to Python`);
+  if (isLocalBackend()) {
+    const { data, info } = await resized
+      .toColourspace("srgb")
+      .raw({ depth: "uchar" })
+      .toBuffer({ resolveWithObject: true });
+    const rawPath = path.join(os.tmpdir(), `ufm-preshrink-${Date.now()}.raw`);
+    await fs.writeFile(rawPath, data);
+    return {
+      sendPath: rawPath,
+      isTemp: true,
+      raw: { width: info.width, height: info.height, channels: info.channels },
+    };
+  }
+
   const ext = path.extname(inputPath).toLowerCase();
   const tempPath = path.join(os.tmpdir(), `ufm-preshrink-${Date.now()}${ext || ".jpg"}`);
-  await sharp(inputPath)
-    .resize({ width: cap, height: cap, fit: "inside", withoutEnlargement: true })
-    .toFile(tempPath);
-  console.log(`[cutout] pre-shrunk input: ${maxEdge}px → ${cap}px before sending to Python`);
+  await resized.toFile(tempPath);
   return { sendPath: tempPath, isTemp: true };
 }
 
-export async function runCutout(inputPath, externalSignal, options = {}) {
-  await ensureExportDir();
-
-  const modelOverride = options.model || null;
-  const { sendPath, isTemp } = await preshrinkForCutout(inputPath, modelOverride);
-
+/**
+ * POST one cutout input. Local backends get a path (`image_path`, or `raw_path`
+ * + shape for a preshrunk raw buffer) so the file is never streamed through
+ * multipart; remote backends get the usual upload.
+ */
+async function postCutout(endpoint, { sendPath, isTemp, raw }, externalSignal, fields = {}) {
   const form = new FormData();
-  const stream = fsSync.createReadStream(sendPath);
-  form.append("file", stream);
-  if (modelOverride) form.append("model", modelOverride);
+  let stream = null;
+  if (raw) {
+    form.append("raw_path", sendPath);
+    form.append("raw_width", String(raw.width));
+    form.append("raw_height", String(raw.height));
+    form.append("raw_channels", String(raw.channels));
+  } else if (isLocalBackend()) {
+    form.append("image_path", path.resolve(sendPath));
+  } else {
+    stream = fsSync.createReadStream(sendPath);
+    form.append("file", stream);
+  }
+  for (const [key, value] of Object.entries(fields)) {
+    if (value) form.append(key, value);
+  }
 
   const fetchTimeoutMs = getResourceProfile().cutoutFetchTimeoutMs;
   const signal = externalSignal
@@ -112,13 +146,13 @@ export async function runCutout(inputPath, externalSignal, options = {}) {
 
   let res;
   try {
-    res = await fetch(`${cutoutBaseUrl()}/cutout`, {
+    res = await fetch(`${cutoutBaseUrl()}${endpoint}`, {
       method: "POST",
       body: form,
       signal,
     });
   } finally {
-    stream.destroy();
+    stream?.destroy();
     if (isTemp) await fs.unlink(sendPath).catch(() => {});
   }
 
@@ -131,9 +165,19 @@ export async function runCutout(inputPath, externalSignal, options = {}) {
     throw new Error(`Cutout failed: ${detail}`);
   }
 
-  const body = await res.json();
+  return res.json();
+}
+
+const CUTOUT_FILE_SUFFIX = {
+  webp: ".cutout.webp",
+  mask: ".cutout.mask.png",
+};
+
+/** Move the Python temp file into EXPORT_ROOT and map the response to camelCase. */
+async function toCutoutResult(body, inputPath, modelOverride) {
   const {
     output_path,
+    output_format,
     alpha_coverage,
     low_confidence,
     border_alpha,
@@ -143,11 +187,14 @@ export async function runCutout(inputPath, externalSignal, options = {}) {
     light_halo,
     quality_reason,
     model,
+    cached,
   } = body;
 
   const modelSuffix = modelOverride ? `.${String(modelOverride).replace(/[^a-z0-9_-]+/gi, "_")}` : "";
   const finalName =
-    path.basename(inputPath).replace(/\s+/g, "_") + modelSuffix + `-${Date.now()}.cutout.png`;
+    path.basename(inputPath).replace(/\s+/g, "_") +
+    modelSuffix +
+    `-${Date.now()}${CUTOUT_FILE_SUFFIX[output_format] || ".cutout.png"}`;
 
   const finalPath = path.join(EXPORT_ROOT, finalName);
 
@@ -164,5 +211,144 @@ export async function runCutout(inputPath, externalSignal, options = {}) {
     lightHalo: light_halo ?? null,
     qualityReason: quality_reason ?? null,
     model: model ?? modelOverride ?? null,
+    outputFormat: output_format ?? "png",
+    cached: cached ?? false,
   };
 }
+
+/**
+ * Cut out one image via POST /cutout.
+ * options.model overrides the backend model; options.outputFormat overrides the
+ * resource profile's cutoutOutputFormat. With "mask" the returned path is an
+ * 8-bit alpha PNG to be combined with the caller's own RGB. options.priority
+ * ("interactive" | "batch" | "background") places the request in the backend's
+ * model queue; the server default is "batch".
+ */
+export async function runCutout(inputPath, externalSignal, options = {}) {
+  await ensureExportDir();
+
+  const modelOverride = options.model || null;
+  const outputFormat = options.outputFormat || getResourceProfile().cutoutOutputFormat;
+  const input = await preshrinkForCutout(inputPath, modelOverride);
+  const body = await postCutout("/cutout", input, externalSignal, {
+    model: modelOverride,
+    output_format: outputFormat,
+    priority: options.priority,
+  });
+  return toCutoutResult(body, inputPath, modelOverride);
+}
+
+/**
+ * Run the whole border-trim → ML primary → ML fallback cascade in one request
+ * (POST /cutout/auto). The original file is sent as-is: border-trim wants full
+ * resolution and the server downscales per ML stage from the same decode.
+ * Adds `stages` ([{ model, ms, alphaCoverage, lowConfidence, qualityReason, error }])
+ * and `totalMs` to the usual runCutout() result. options are as for runCutout().
+ */
+export async function runCutoutAuto(inputPath, externalSignal, options = {}) {
+  await ensureExportDir();
+
+  const outputFormat = options.outputFormat || getResourceProfile().cutoutOutputFormat;
+  const body = await postCutout("/cutout/auto", { sendPath: inputPath, isTemp: false }, externalSignal, {
+    output_format: outputFormat,
+    priority: options.priority,
+  });
+  const result = await toCutoutResult(body, inputPath, null);
+  return {
+    ...result,
+    stages: (body.stages || []).map((s) => ({
+      model: s.model_used ?? s.model,
+      ms: s.ms ?? null,
+      alphaCoverage: s.alpha_coverage ?? null,
+      lowConfidence: s.low_confidence ?? null,
+      qualityReason: s.quality_reason ?? null,
+      error: s.error ?? null,
+    })),
+    totalMs: body.total_ms ?? null,
+  };
+}
+
+/**
+ * Cut out many images with one model via POST /cutout/batch. The server streams
+ * one NDJSON line per image as it finishes; each is moved into EXPORT_ROOT and
+ * handed to `options.onResult(index, result)` straight away. Resolves to an
+ * array aligned with `inputPaths` holding runCutout()-shaped results, or
+ * `{ error }` for images that failed. model, outputFormat and priority options are
+ * as for runCutout().
+ */
+export async function runCutoutBatch(inputPaths, externalSignal, options = {}) {
+  await ensureExportDir();
+  if (!inputPaths.length) return [];
+
+  const modelOverride = options.model || null;
+  const outputFormat = options.outputFormat || getResourceProfile().cutoutOutputFormat;
+  const form = new FormData();
+  const streams = [];
+  for (const inputPath of inputPaths) {
+    if (isLocalBackend()) {
+      form.append("image_paths", path.resolve(inputPath));
+    } else {
+      const stream = fsSync.createReadStream(inputPath);
+      streams.push(stream);
+      form.append("files", stream);
+    }
+  }
+  if (modelOverride) form.append("model", modelOverride);
+  if (outputFormat) form.append("output_format", outputFormat);
+  if (options.priority) form.append("priority", options.priority);
+
+  // The per-image budget, for the whole batch.
+  const fetchTimeoutMs = getResourceProfile().cutoutFetchTimeoutMs * inputPaths.length;
+  const signal = externalSignal
+    ? AbortSignal.any([externalSignal, AbortSignal.timeout(fetchTimeoutMs)])
+    : AbortSignal.timeout(fetchTimeoutMs);
+
+  const results = new Array(inputPaths.length).fill(null);
+  let res;
+  try {
+    res = await fetch(`${cutoutBaseUrl()}/cutout/batch`, { method: "POST", body: form, signal });
+    if (!res.ok) {
+      let detail = `status ${res.status}`;
+      try {
+        const body = await res.json();
+        if (body?.error) detail = body.error;
+      } catch (_) {}
+      throw new Error(`Cutout batch failed: ${detail}`);
+    }
+
+    let buffered = "";
+    // Streaming decode: a multi-byte character may be split across chunks.
+    const decoder = new TextDecoder("utf-8");
+    let done = null;
+    const handleLine = async (line) => {
+      if (!line.trim()) return;
+      const body = JSON.parse(line);
+      if (body.done) {
+        done = body;
+        return;
+      }
+      const result = body.error
+        ? { error: body.error }
+        : await toCutoutResult(body, inputPaths[body.index], modelOverride);
+      results[body.index] = result;
+      options.onResult?.(body.index, result);
+    };
+    for await (const chunk of res.body) {
+      buffered += decoder.decode(chunk, { stream: true });
+      let newline;
+      while ((newline = buffered.indexOf("\n")) >= 0) {
+        await handleLine(buffered.slice(0, newline));
+        buffered = buffered.slice(newline + 1);
+      }
+    }
+    await handleLine(buffered + decoder.decode());
+    if (!done) throw new Error("Cutout batch failed: stream ended early");
+    console.log(
+      `[cutout] batch of ${done.count} finished in ${done.total_ms} ms (${done.failed} failed)`
+    );
+  } finally {
+    for (const stream of streams) stream.destroy();
+  }
+
+  return results.map((r) => r ?? { error: "no result" });
+}
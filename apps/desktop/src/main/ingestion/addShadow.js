@@ -111,9 +111,9 @@ export async function addShadowToCutout(cutoutPath, options = {}) {
   // ── Step 3: save ──
   // Temp files from the Python backend use names like "tmpXXXXXX.png" (no ".cutout.png"),
   // so the simple string replace would leave outputPath === cutoutPath and corrupt the file.
-  const outputPath = cutoutPath.includes(".cutout.png")
-    ? cutoutPath.replace(".cutout.png", ".cutout.shadow.png")
-    : cutoutPath.replace(/\.png$/i, ".shadow.png");
+  const outputPath = /\.cutout\.(png|webp)$/i.test(cutoutPath)
+    ? cutoutPath.replace(/\.cutout\.(png|webp)$/i, ".cutout.shadow.png")
+    : cutoutPath.replace(/\.(png|webp)$/i, ".shadow.png");
   if (outputPath === cutoutPath) throw new Error("[addShadow] output path must differ from input");
   const buffer = canvas.toBuffer("image/png");
   await fs.writeFile(outputPath, buffer);
@@ -11,23 +11,11 @@
  */
 import path from "path";
 import sharp from "sharp";
-import { runCutout, EXPORT_ROOT } from "../cutoutClient.js";
+import { runCutoutAuto, runCutoutBatch, EXPORT_ROOT } from "../cutoutClient.js";
 import { addShadowToCutout } from "./addShadow.js";
-import { getResourceProfile } from "../resourceProfile.js";
 
 function roundMs(ms) { return Math.round(ms); }
 
-function getCutoutFallbackModel(primaryModel) {
-  const explicit = String(process.env.UFM_CUTOUT_FALLBACK_MODEL || "").trim();
-  if (explicit === "0" || /^none$/i.test(explicit)) return null;
-  if (explicit && explicit !== primaryModel) return explicit;
-  const current = primaryModel || getResourceProfile().rembgModel || "u2net";
-  if (["u2net", "briaai-rmbg", "bria", "briaai-rmbg-1.4"].includes(current)) return "isnet-general-use";
-  if (current === "isnet-general-use") return "birefnet-general-lite";
-  if (current === "birefnet-general-lite") return "birefnet-general";
-  return null;
-}
-
 /**
  * Returns true if the image already has a transparent background.
  *
@@ -68,6 +56,57 @@ export async function isAlreadyTransparent(imagePath) {
   return transparent >= 3;
 }
 
+/** Normalise an already-transparent image to PNG in EXPORT_ROOT and shadow it. */
+async function passthroughCutout(inputPath, stats) {
+  console.log(`[cutoutPipeline] ${path.basename(inputPath)} already transparent — skipping cutout`);
+  const t = stats ? performance.now() : 0;
+  // Normalise to PNG in EXPORT_ROOT so addShadow naming works consistently
+  const base = path.basename(inputPath, path.extname(inputPath)).replace(/\s+/g, "_");
+  const passPath = path.join(EXPORT_ROOT, `${base}-${Date.now()}.passthrough.cutout.png`);
+  await sharp(inputPath).ensureAlpha().png().toFile(passPath);
+  const shadowPath = await addShadowToCutout(passPath, { lowConfidence: false });
+  if (stats) stats.serperShadowMs += roundMs(performance.now() - t);
+  return { path: shadowPath, lowConfidence: false, qualityReason: null, model: "passthrough", skippedCutout: true };
+}
+
+/** POST /cutout/auto for one image and log its stages. */
+async function runCascade(inputPath, signal, stats) {
+  const t0 = stats ? performance.now() : 0;
+  try {
+    const cutoutResult = await runCutoutAuto(inputPath, signal);
+    for (const stage of cutoutResult.stages) {
+      if (stage.error) {
+        console.warn(`[cutoutPipeline] ${stage.model} failed:`, stage.error);
+      } else {
+        console.log(
+          `[cutoutPipeline] ${stage.model}: coverage=${stage.alphaCoverage?.toFixed(2)}, ` +
+          `lowConf=${stage.lowConfidence}, reason=${stage.qualityReason || "ok"} (${stage.ms} ms)`
+        );
+      }
+    }
+    console.log(`[cutoutPipeline] using ${cutoutResult.model} (${cutoutResult.totalMs} ms server-side)`);
+    return cutoutResult;
+  } finally {
+    if (stats) stats.serperRembgMs += roundMs(performance.now() - t0);
+  }
+}
+
+/** Add the drop shadow to a cutout result; returns the result with the shadow's path. */
+async function withShadow(cutoutResult, stats) {
+  const t1 = stats ? performance.now() : 0;
+  try {
+    const shadowPath = await addShadowToCutout(cutoutResult.path, {
+      lowConfidence: cutoutResult.lowConfidence,
+      qualityReason: cutoutResult.qualityReason,
+      borderAlpha: cutoutResult.borderAlpha,
+      bboxAreaRatio: cutoutResult.bboxAreaRatio,
+    });
+    return { ...cutoutResult, path: shadowPath };
+  } finally {
+    if (stats) stats.serperShadowMs += roundMs(performance.now() - t1);
+  }
+}
+
 /**
  * Run the full cutout pipeline for one image:
  *   1. Check if already transparent → if so, skip rembg and go straight to shadow
@@ -91,71 +130,86 @@ export async function runCutoutPipeline(inputPath, options = {}) {
     try { transparent = await isAlreadyTransparent(inputPath); }
     catch (err) { console.warn("[cutoutPipeline] alpha check failed, running normal pipeline:", err?.message); }
 
-    if (transparent) {
-      console.log(`[cutoutPipeline] ${path.basename(inputPath)} already transparent — skipping cutout`);
-      const t = stats ? performance.now() : 0;
-      // Normalise to PNG in EXPORT_ROOT so addShadow naming works consistently
-      const base = path.basename(inputPath, path.extname(inputPath)).replace(/\s+/g, "_");
-      const passPath = path.join(EXPORT_ROOT, `${base}-${Date.now()}.passthrough.cutout.png`);
-      await sharp(inputPath).ensureAlpha().png().toFile(passPath);
-      const shadowPath = await addShadowToCutout(passPath, { lowConfidence: false });
-      if (stats) stats.serperShadowMs += roundMs(performance.now() - t);
-      return { path: shadowPath, lowConfidence: false, qualityReason: null, model: "passthrough", skippedCutout: true };
-    }
+    if (transparent) return passthroughCutout(inputPath, stats);
   }
 
   // ── Slow path: border-trim → ML fallback chain ───────────────────────────────
-  let cutoutResult;
-  const t0 = stats ? performance.now() : 0;
-  try {
-    cutoutResult = await runCutout(inputPath, signal, { model: "border-trim" });
-    console.log(
-      `[cutoutPipeline] border-trim: coverage=${cutoutResult.alphaCoverage?.toFixed(2)}, ` +
-      `lowConf=${cutoutResult.lowConfidence}, reason=${cutoutResult.qualityReason || "ok"}`
-    );
-
-    if (cutoutResult.lowConfidence) {
-      console.log("[cutoutPipeline] border-trim low-confidence — escalating to ML");
-      try {
-        const mlResult = await runCutout(inputPath, signal);
-        console.log(`[cutoutPipeline] ML primary: coverage=${mlResult.alphaCoverage?.toFixed(2)}, lowConf=${mlResult.lowConfidence}`);
-        if (!mlResult.lowConfidence) {
-          cutoutResult = mlResult;
-        } else {
-          const fallbackModel = getCutoutFallbackModel(mlResult.model);
-          if (fallbackModel) {
-            try {
-              console.log(`[cutoutPipeline] Trying ML fallback: ${fallbackModel}`);
-              const fb = await runCutout(inputPath, signal, { model: fallbackModel });
-              if (!fb.lowConfidence || (fb.alphaCoverage ?? 0) > (cutoutResult.alphaCoverage ?? 0)) {
-                cutoutResult = fb;
-              }
-            } catch (err) {
-              console.warn(`[cutoutPipeline] ML fallback (${fallbackModel}) failed:`, err?.message);
-            }
-          } else if ((mlResult.alphaCoverage ?? 0) > (cutoutResult.alphaCoverage ?? 0)) {
-            cutoutResult = mlResult;
-          }
-        }
-      } catch (err) {
-        console.warn("[cutoutPipeline] ML cutout failed:", err?.message);
-      }
-    }
-  } finally {
-    if (stats) stats.serperRembgMs += roundMs(performance.now() - t0);
-  }
+  // The cascade (and its fallback-model choice, UFM_CUTOUT_FALLBACK_MODEL) runs
+  // server-side in POST /cutout/auto: one upload, one decode, one round-trip.
+  const cutoutResult = await runCascade(inputPath, signal, stats);
 
   // ── Shadow ───────────────────────────────────────────────────────────────────
-  const t1 = stats ? performance.now() : 0;
-  try {
-    const shadowPath = await addShadowToCutout(cutoutResult.path, {
-      lowConfidence: cutoutResult.lowConfidence,
-      qualityReason: cutoutResult.qualityReason,
-      borderAlpha: cutoutResult.borderAlpha,
-      bboxAreaRatio: cutoutResult.bboxAreaRatio,
+  return withShadow(cutoutResult, stats);
+}
+
+/**
+ * runCutoutPipeline() for a whole set of images (a dropped folder, a flyer's
+ * photos). The border-trim stage for every image goes to the backend as one
+ * POST /cutout/batch; images it cuts out confidently are shadowed as soon as
+ * their NDJSON line arrives, and only the low-confidence ones make their own
+ * /cutout/auto call to escalate to ML. Results are the same as runCutoutPipeline()
+ * on each image.
+ *
+ * Returns one promise per input path, each settling as soon as that image is
+ * done, so callers can start on early images while later ones are still running.
+ *
+ * @param {string[]} inputPaths
+ * @param {{ signal?: AbortSignal }} options
+ * @returns {Promise<{ path: string, lowConfidence: boolean, qualityReason: string|null, model: string, skippedCutout?: boolean }>[]}
+ */
+export function runCutoutPipelineBatch(inputPaths, options = {}) {
+  const { signal } = options;
+  const transparent = inputPaths.map((inputPath) =>
+    isAlreadyTransparent(inputPath).catch((err) => {
+      console.warn("[cutoutPipeline] alpha check failed, running normal pipeline:", err?.message);
+      return false;
+    })
+  );
+
+  // Border-trim results by input index, resolved as the batch streams them in.
+  const trimmed = inputPaths.map(() => {
+    let resolve;
+    const promise = new Promise((r) => { resolve = r; });
+    return { promise, resolve };
+  });
+  Promise.all(transparent)
+    .then(async (flags) => {
+      const todo = inputPaths.map((_, i) => i).filter((i) => !flags[i]);
+      const results = await runCutoutBatch(todo.map((i) => inputPaths[i]), signal, {
+        model: "border-trim",
+        onResult: (j, result) => trimmed[todo[j]].resolve(result),
+      });
+      results.forEach((result, j) => trimmed[todo[j]].resolve(result));
+    })
+    .catch((err) => {
+      for (const t of trimmed) t.resolve({ error: err?.message || String(err) });
     });
-    return { ...cutoutResult, path: shadowPath };
-  } finally {
-    if (stats) stats.serperShadowMs += roundMs(performance.now() - t1);
-  }
+
+  // Escalation and shadowing run one image at a time, like the per-image path,
+  // so a weak batch doesn't flood the backend with /cutout/auto calls.
+  let queue = Promise.resolve();
+  const serially = (fn) => {
+    const run = queue.then(fn);
+    queue = run.catch(() => {});
+    return run;
+  };
+
+  return inputPaths.map(async (inputPath, i) => {
+    if (await transparent[i]) return serially(() => passthroughCutout(inputPath));
+    const trim = await trimmed[i].promise;
+    return serially(async () => {
+      if (trim.error) {
+        console.warn(`[cutoutPipeline] batch border-trim failed for ${path.basename(inputPath)}:`, trim.error);
+        return runCutoutPipeline(inputPath, { signal, skipTransparentCheck: true });
+      }
+      console.log(
+        `[cutoutPipeline] border-trim: coverage=${trim.alphaCoverage?.toFixed(2)}, ` +
+        `lowConf=${trim.lowConfidence}, reason=${trim.qualityReason || "ok"}`
+      );
+      // Low-confidence: the server cascade repeats the (cheap, deterministic)
+      // border-trim pass and escalates exactly as it would for a single image.
+      const cutoutResult = trim.lowConfidence ? await runCascade(inputPath, signal) : trim;
+      return withShadow(cutoutResult);
+    });
+  });
 }
@@ -152,7 +152,8 @@ export function looksLikeFlyerTitleGraphic(ocrText) {
 
 async function readOcrText(imagePath) {
   try {
-    const ocrResult = await runOCR(imagePath);
+    // Only feeds the banner/price heuristics and the classify prompt: the fast tier is enough.
+    const ocrResult = await runOCR(imagePath, { mode: "fast" });
     const texts = Array.isArray(ocrResult) ? (ocrResult[0]?.rec_texts ?? []) : [];
     return texts.join(" ").trim();
   } catch (err) {
@@ -416,7 +417,7 @@ export async function getImageEmbedding(imagePath) {
   // --- Step 1: OCR — fast, already running, gives Gemini extra context ---
   let ocrText = "";
   try {
-    const ocrResult = await runOCR(imagePath);
+    const ocrResult = await runOCR(imagePath, { mode: "fast" });
     const texts = Array.isArray(ocrResult) ? (ocrResult[0]?.rec_texts ?? []) : [];
     ocrText = texts.join(" ").trim();
     parsed.ocrText = ocrText;
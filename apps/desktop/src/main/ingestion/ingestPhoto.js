@@ -52,9 +52,11 @@ export async function ingestPhotoPhase2(inputPath) {
 }
 
 /* ---------- ORIGINAL (shim — used by JobProcessor + ingestImages) ---------- */
-export async function ingestPhoto(inputPath) {
+// prefetched.ocr / prefetched.cutout: this image's promises from runOCREach() and
+// runCutoutPipelineBatch(), when the caller started them for a whole set of photos.
+export async function ingestPhoto(inputPath, prefetched = {}) {
   // ---------- OCR FIRST ----------
-  const ocrResult = await runOCR(inputPath);
+  const ocrResult = await (prefetched.ocr ?? runOCR(inputPath));
   console.log("OCR DEBUG [ingestPhoto] ocrResult:", ocrResult);
 
   const rec_texts = Array.isArray(ocrResult)
@@ -79,7 +81,7 @@ const title = formatTitle(llmResult);
 
 
   // ---------- CUTOUT + SHADOW ----------
-  const pipelineResult = await runCutoutPipeline(inputPath);
+  const pipelineResult = await (prefetched.cutout ?? runCutoutPipeline(inputPath));
   const cutoutPath = pipelineResult.path;
   console.log(pipelineResult.skippedCutout ? "⚡ [ingestPhoto] Cutout skipped (already transparent):" : "✂️ [ingestPhoto] Cutout + shadow complete:", cutoutPath);
 
@@ -2,7 +2,8 @@ import fetch from "node-fetch";
 
 // PaddleOCR 3.x downloads models lazily on first use — allow up to 90s for routine calls
 const OCR_TIMEOUT_MS = 90_000;
-// Template layout runs OCR once before vision; first cold start can exceed 90s behind ocr_lock
+// Template layout runs OCR once before vision; the first call waits for an OCR worker to
+// start (model download + init), which can exceed 90s
 const LAYOUT_OCR_TIMEOUT_MS = 300_000;
 
 function mergeAbortSignals(abortSignal, timeoutMs) {
@@ -22,11 +23,25 @@ function mergeAbortSignals(abortSignal, timeoutMs) {
   return controller.signal;
 }
 
+function ocrModeFields(options) {
+  const fields = {};
+  if (options.mode) fields.mode = options.mode;
+  if (options.maxSide != null) fields.max_side = options.maxSide;
+  if (options.layout) fields.layout = true;
+  return fields;
+}
+
 /**
  * Calls Python OCR service.
  * FINAL CONTRACT:
- * - Sends JSON { image_path }
+ * - Sends JSON { image_path, mode?, max_side?, tiled?, layout? }
  * - Returns: Array<{ rec_texts: string[], rec_scores: number[] }>
+ * options.mode: "full" | "fast" | "detect" (boxes only, empty rec_texts); default is the
+ * backend's UFM_OCR_MODE. options.maxSide caps the image side fed to detection (0 = none).
+ * options.tiled: OCR a very large page as overlapping tiles across the OCR workers
+ * (default: only pages past the backend's UFM_OCR_TILE_AUTO_SIDE).
+ * options.layout: also return `layout` — text_blocks grouped into lines, columns and
+ * candidate product cells ({ text, has_price, x, y, width, height, ... }).
  */
 export async function runOCR(imagePath, options = {}) {
   const timeoutMs = options.timeoutMs ?? OCR_TIMEOUT_MS;
@@ -43,6 +58,8 @@ export async function runOCR(imagePath, options = {}) {
       },
       body: JSON.stringify({
         image_path: imagePath,
+        ...ocrModeFields(options),
+        ...(options.tiled != null ? { tiled: options.tiled } : {}),
       }),
       signal,
     });
@@ -63,4 +80,102 @@ export async function runOCR(imagePath, options = {}) {
   return Array.isArray(data) ? data : [];
 }
 
+/**
+ * OCR many images via POST /ocr/batch (PaddleOCR's batched predict across the OCR
+ * workers). The server streams one NDJSON line per image as it finishes; each is
+ * handed to `options.onResult(index, result)` straight away. Resolves to an array
+ * aligned with `imagePaths` of runOCR()-shaped results — [] for images that failed.
+ * options.timeoutMs is per image (default 90s); options.mode / maxSide / layout as for runOCR().
+ */
+export async function runOCRBatch(imagePaths, options = {}) {
+  if (!imagePaths.length) return [];
+  const timeoutMs = (options.timeoutMs ?? OCR_TIMEOUT_MS) * imagePaths.length;
+  const signal = options.abortSignal
+    ? mergeAbortSignals(options.abortSignal, timeoutMs)
+    : AbortSignal.timeout(timeoutMs);
+
+  const results = new Array(imagePaths.length).fill(null);
+  let res;
+  try {
+    res = await fetch("http://127.0.0.1:17890/ocr/batch", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        image_paths: imagePaths,
+        ...ocrModeFields(options),
+      }),
+      signal,
+    });
+    if (!res.ok) {
+      return results.map(() => []);
+    }
+
+    let buffered = "";
+    // Streaming decode: a multi-byte character may be split across chunks.
+    const decoder = new TextDecoder("utf-8");
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const body = JSON.parse(line);
+      if (body.done) return;
+      const { index, input: _input, error, ...ocr } = body;
+      if (error) console.warn(`[ocr] batch image ${index} failed: ${error}`);
+      results[index] = error ? [] : [ocr];
+      options.onResult?.(index, results[index]);
+    };
+    for await (const chunk of res.body) {
+      buffered += decoder.decode(chunk, { stream: true });
+      let newline;
+      while ((newline = buffered.indexOf("\n")) >= 0) {
+        handleLine(buffered.slice(0, newline));
+        buffered = buffered.slice(newline + 1);
+      }
+    }
+    handleLine(buffered + decoder.decode());
+  } catch (err) {
+    if (err?.name === "AbortError" || signal.aborted) {
+      const reason = options.abortSignal?.reason;
+      if (reason?.code === "PARSE_CANCELLED") throw reason;
+      throw new Error(err?.message?.includes("timed out") ? "OCR timed out" : "OCR cancelled");
+    }
+    throw err;
+  }
+
+  return results.map((r) => r ?? []);
+}
+
+/**
+ * runOCRBatch() with one promise per image, each settling as soon as the backend
+ * streams that image's result — for callers that work through a set of photos in
+ * order while the batch runs ahead. If the batch request itself fails, images it
+ * had not answered yet fall back to their own runOCR() call.
+ */
+export function runOCREach(imagePaths, options = {}) {
+  const pending = imagePaths.map(() => {
+    let resolve, reject;
+    const promise = new Promise((res, rej) => { resolve = res; reject = rej; });
+    return { promise, resolve, reject, settled: false };
+  });
+  const settle = (index, result) => {
+    if (pending[index].settled) return;
+    pending[index].settled = true;
+    pending[index].resolve(result);
+  };
+  runOCRBatch(imagePaths, { ...options, onResult: settle })
+    .then((results) => results.forEach((result, i) => settle(i, result)))
+    .catch((err) => {
+      const aborted = options.abortSignal?.aborted;
+      if (!aborted) console.warn(`[ocr] batch failed (${err?.message}) — OCR'ing the rest one image at a time`);
+      let chain = Promise.resolve();
+      pending.forEach((p, i) => {
+        if (p.settled) return;
+        p.settled = true;
+        if (aborted) p.reject(err);
+        else chain = chain.then(() => runOCR(imagePaths[i], options).then(p.resolve, p.reject));
+      });
+    });
+  return pending.map((p) => p.promise);
+}
+
 export { LAYOUT_OCR_TIMEOUT_MS };
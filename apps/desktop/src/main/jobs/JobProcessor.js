@@ -8,6 +8,7 @@ import fs from "fs";
 import { fileURLToPath } from "url";
 import { v4 as uuidv4 } from "uuid";
 import { ingestPhoto } from "../ingestion/ingestPhoto.js";
+import { runOCREach } from "../ingestion/ocrService.js";
 import { parseDiscountText } from "../ipc/parseDiscountText.js";
 import { parseDiscountXlsx } from "../ipc/parseDiscountXlsx.js";
 import { exportDiscountImages } from "../ipc/exportDiscountImages.js";
@@ -17,7 +18,7 @@ import { rerankSerperResults } from "../ingestion/serperScorer.js";
 import { recordSerperSignal } from "../ingestion/serperSignalService.js";
 import { getDomain } from "../ingestion/braveSearchService.js";
 import { waitForCutoutReady } from "../cutoutClient.js";
-import { runCutoutPipeline } from "../ingestion/cutoutPipeline.js";
+import { runCutoutPipeline, runCutoutPipelineBatch } from "../ingestion/cutoutPipeline.js";
 import sizeOf from "image-size";
 import sharp from "sharp";
 import { decideSizeFromAspectRatio } from "../../../../shared/flyer/layout/sizeFromImage.js";
@@ -916,9 +917,20 @@ export class JobProcessor extends EventEmitter {
       }
     }
 
+    // Several photos: start all their OCR and cutouts now as one /ocr/batch and one
+    // /cutout/batch stream, so the backend works ahead while each item's LLM step runs.
+    const prefetchAbort = new AbortController();
+    const imagePaths = job.images?.map((t) => t.path) ?? [];
+    const prefetchedOcr = totalImages > 1 ? runOCREach(imagePaths, { abortSignal: prefetchAbort.signal }) : [];
+    const prefetchedCutouts =
+      totalImages > 1 ? runCutoutPipelineBatch(imagePaths, { signal: prefetchAbort.signal }) : [];
+    // Items cut short by abort/timeout never await theirs.
+    for (const p of [...prefetchedOcr, ...prefetchedCutouts]) p.catch(() => {});
+
     for (let i = 0; i < totalImages; i++) {
       if (this.abortedJobs.has(job.id)) {
         this.abortedJobs.delete(job.id);
+        prefetchAbort.abort();
         clearTimeout(watchdogTimer);
         this.emit("aborted", job.id);
         return;
@@ -941,7 +953,7 @@ export class JobProcessor extends EventEmitter {
       const queryLabel = path.basename(imageTask.path || "") || imageTask.path || `image-${i + 1}`;
       try {
         const result = await Promise.race([
-          ingestPhoto(imageTask.path),
+          ingestPhoto(imageTask.path, { ocr: prefetchedOcr[i], cutout: prefetchedCutouts[i] }),
           _abortPromise,
           new Promise((_, reject) =>
             setTimeout(() => reject(new Error(`ingestPhoto timed out after ${INGEST_TIMEOUT_MS}ms`)), INGEST_TIMEOUT_MS)
@@ -998,6 +1010,7 @@ export class JobProcessor extends EventEmitter {
     // If abort was signalled mid-item (broke out of loop), handle it now
     if (this.abortedJobs.has(job.id)) {
       this.abortedJobs.delete(job.id);
+      prefetchAbort.abort();
       clearTimeout(watchdogTimer);
       this.emit("aborted", job.id);
       return;
@@ -477,8 +477,11 @@ ipcMain.handle("ufm:refineCutoutWithClicks", async (_event, args) => {
     if (!cutoutPath || !fs.existsSync(cutoutPath)) {
       throw new Error(`cutout_path does not exist: ${cutoutPath || "(empty)"}`);
     }
+    // The refined file is always renamed to *.png below, so keep it a PNG.
+    const profileFormat = getResourceProfile().cutoutOutputFormat;
     const payload = {
       ...args,
+      output_format: profileFormat.startsWith("png") ? profileFormat : "png-fast",
       cutout_path: toBackendPath(cutoutPath),
       image_path: imagePath && fs.existsSync(imagePath) ? toBackendPath(imagePath) : null,
     };
@@ -662,7 +665,7 @@ ipcMain.handle("ufm:rerunCutout", async (_, id, originalPath, model) => {
           `Please re-add the product image and try again.`
         );
       }
-      const cutoutResult = await runCutout(localOriginal, null, { model });
+      const cutoutResult = await runCutout(localOriginal, null, { model, priority: "interactive" });
       const cutoutPath = await addShadowToCutout(cutoutResult.path, {
         lowConfidence: cutoutResult.lowConfidence,
         qualityReason: cutoutResult.qualityReason,
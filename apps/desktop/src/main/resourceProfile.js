@@ -5,6 +5,12 @@ import os from "os";
 
 const DEFAULT_DISCOUNT_SEARCH_TIMEOUT_MS = 22_000;
 
+/** Encodings the Python /cutout endpoints accept as `output_format`. */
+export const CUTOUT_OUTPUT_FORMATS = ["png", "png-fast", "png-raw", "webp", "mask"];
+
+/** Profiles the Python /ocr endpoints accept as `mode` (backend/src/ocr/modes.py). */
+export const OCR_MODES = ["full", "fast", "detect"];
+
 const PRESETS = {
   normal: {
     batchDelayMs: 0,
@@ -28,6 +34,49 @@ const PRESETS = {
     rembgModel: "border-trim",
     /** Max image edge (px) before sending to rembg. 0 = no cap. */
     cutoutMaxEdgePx: 1024,
+    /**
+     * Cutout result encoding requested from Python: png | png-fast | png-raw | webp.
+     * png-fast (zlib level 1) is ~3x faster to encode than default PNG for ~15% more bytes.
+     */
+    cutoutOutputFormat: "png-fast",
+    /** Unload idle Python ML models (rembg/BRIA, MobileSAM) after this many seconds. 0 = keep resident. */
+    modelIdleUnloadS: 0,
+    /** Concurrent cutout CPU stages (decode, classical, compositing) in Python. 0 = half the cores, max 4. */
+    cutoutWorkers: 0,
+    /** Above this Python RSS (MB) cutout CPU stages run one at a time. 0 = off. */
+    cutoutWorkerRssMb: 0,
+    /**
+     * Python worker processes for classical segmentation (border-trim, contour-bg, blob
+     * removal). ~90 MB each; 0 = run them on threads in the server process. Opt-in.
+     */
+    cpuPoolWorkers: 0,
+    /** On-disk /cutout result cache (MB) for repeat cutouts of the same image. 0 = off. */
+    cutoutCacheMb: 512,
+    /** In-memory MobileSAM image embeddings (MB, ~4 MB per photo) so repeat editor clicks skip the encoder. 0 = off. */
+    samEmbedCacheMb: 64,
+    /** Long-lived PaddleOCR worker processes (~1 GB each once warm). */
+    ocrWorkers: 2,
+    /** Recycle an OCR worker once its RSS (MB) passes this after a job. 0 = off. */
+    ocrWorkerRssMb: 3000,
+    /** On-disk OCR result cache (MB), keyed by image content + OCR config. 0 = off. */
+    ocrCacheMb: 64,
+    /**
+     * OCR profile for /ocr calls that don't ask for one: full (server models) | fast (mobile
+     * models, detection capped at 960px) | detect (boxes only). See backend/src/ocr/modes.py.
+     */
+    ocrMode: "full",
+    /** OCR pages whose longest side passes this (px) as parallel overlapping tiles. 0 = off. */
+    ocrTileAutoSide: 4000,
+    /**
+     * Paddle CPU threads per OCR worker. 0 = auto (cores / ocrWorkers, or the autotuned
+     * count); pythonSingleThread forces 1.
+     */
+    ocrThreads: 0,
+    /**
+     * Opt-in: on first OCR start, time a calibration image at a few thread counts and keep the
+     * fastest (builds one engine per candidate and doubles the first worker's start timeout).
+     */
+    ocrAutotune: false,
   },
   office: {
     batchDelayMs: 400,
@@ -44,6 +93,19 @@ const PRESETS = {
     pHashDedupMaxDocs: 3000,
     rembgModel: "border-trim",
     cutoutMaxEdgePx: 1024,
+    cutoutOutputFormat: "png-fast",
+    modelIdleUnloadS: 600,
+    cutoutWorkers: 2,
+    cutoutWorkerRssMb: 1500,
+    cpuPoolWorkers: 1,
+    cutoutCacheMb: 256,
+    samEmbedCacheMb: 32,
+    ocrWorkers: 1,
+    ocrWorkerRssMb: 2000,
+    ocrCacheMb: 32,
+    ocrMode: "full",
+    ocrTileAutoSide: 4000,
+    ocrAutotune: false,
   },
   low: {
     batchDelayMs: 1200,
@@ -60,6 +122,19 @@ const PRESETS = {
     pHashDedupMaxDocs: 2000,
     rembgModel: "border-trim",
     cutoutMaxEdgePx: 800,
+    cutoutOutputFormat: "png-fast",
+    modelIdleUnloadS: 300,
+    cutoutWorkers: 1,
+    cutoutWorkerRssMb: 1000,
+    cpuPoolWorkers: 0,
+    cutoutCacheMb: 128,
+    samEmbedCacheMb: 16,
+    ocrWorkers: 1,
+    ocrWorkerRssMb: 1500,
+    ocrCacheMb: 32,
+    ocrMode: "fast",
+    ocrTileAutoSide: 0,
+    ocrAutotune: false,
   },
 };
 
@@ -141,6 +216,27 @@ export function getResourceProfile() {
     pHashDedupMaxDocs: readIntEnv("UFM_PHASH_DEDUP_MAX_DOCS", preset.pHashDedupMaxDocs, { min: 0 }),
     rembgModel: process.env.UFM_REMBG_MODEL || preset.rembgModel,
     cutoutMaxEdgePx: readIntEnv("UFM_CUTOUT_MAX_EDGE_PX", preset.cutoutMaxEdgePx, { min: 0, max: 4096 }),
+    cutoutOutputFormat: (() => {
+      const raw = String(process.env.UFM_CUTOUT_OUTPUT_FORMAT || "").trim().toLowerCase();
+      // "mask" is per-call only: every profile-driven caller expects an RGBA cutout.
+      return raw !== "mask" && CUTOUT_OUTPUT_FORMATS.includes(raw) ? raw : preset.cutoutOutputFormat;
+    })(),
+    modelIdleUnloadS: readIntEnv("UFM_MODEL_IDLE_UNLOAD_S", preset.modelIdleUnloadS, { min: 0 }),
+    cutoutWorkers: readIntEnv("UFM_CUTOUT_WORKERS", preset.cutoutWorkers, { min: 0, max: 16 }),
+    cutoutWorkerRssMb: readIntEnv("UFM_CUTOUT_WORKER_RSS_MB", preset.cutoutWorkerRssMb, { min: 0 }),
+    cpuPoolWorkers: readIntEnv("UFM_CPU_POOL_WORKERS", preset.cpuPoolWorkers, { min: 0, max: 8 }),
+    cutoutCacheMb: readIntEnv("UFM_CUTOUT_CACHE_MB", preset.cutoutCacheMb, { min: 0 }),
+    samEmbedCacheMb: readIntEnv("UFM_SAM_EMBED_CACHE_MB", preset.samEmbedCacheMb, { min: 0 }),
+    ocrWorkers: readIntEnv("UFM_OCR_WORKERS", preset.ocrWorkers, { min: 1, max: 8 }),
+    ocrWorkerRssMb: readIntEnv("UFM_OCR_WORKER_RSS_MB", preset.ocrWorkerRssMb, { min: 0 }),
+    ocrCacheMb: readIntEnv("UFM_OCR_CACHE_MB", preset.ocrCacheMb, { min: 0 }),
+    ocrMode: (() => {
+      const raw = String(process.env.UFM_OCR_MODE || "").trim().toLowerCase();
+      return OCR_MODES.includes(raw) ? raw : preset.ocrMode;
+    })(),
+    ocrTileAutoSide: readIntEnv("UFM_OCR_TILE_AUTO_SIDE", preset.ocrTileAutoSide, { min: 0 }),
+    ocrThreads: readIntEnv("UFM_OCR_THREADS", preset.ocrThreads, { min: 0, max: 64 }),
+    ocrAutotune: readBoolEnv("UFM_OCR_AUTOTUNE", preset.ocrAutotune),
   });
 
   console.log(
@@ -148,7 +244,14 @@ export function getResourceProfile() {
       `fsScanCap=${_cache.discountFirestoreScanCap}, serperStepDelay=${_cache.serperStepDelayMs}ms, ` +
       `cutoutHttpTimeout=${_cache.cutoutFetchTimeoutMs}ms, embedCap=${_cache.embedTextCandidateCap}, ` +
       `pythonSingleThread=${_cache.pythonSingleThread}, rssLimit=${_cache.batchPauseIfRssMb}MB, ` +
-      `pHashDedupCap=${_cache.pHashDedupMaxDocs || "unlimited"}, rembgModel=${_cache.rembgModel}, cutoutMaxEdge=${_cache.cutoutMaxEdgePx}px)`
+      `pHashDedupCap=${_cache.pHashDedupMaxDocs || "unlimited"}, rembgModel=${_cache.rembgModel}, cutoutMaxEdge=${_cache.cutoutMaxEdgePx}px, ` +
+      `cutoutOutput=${_cache.cutoutOutputFormat}, modelIdleUnload=${_cache.modelIdleUnloadS || "off"}s, ` +
+      `cutoutWorkers=${_cache.cutoutWorkers || "auto"}, cpuPool=${_cache.cpuPoolWorkers || "off"}, ` +
+      `cutoutCache=${_cache.cutoutCacheMb || "off"}MB, samEmbedCache=${_cache.samEmbedCacheMb || "off"}MB, ` +
+      `ocrWorkers=${_cache.ocrWorkers}, ` +
+      `ocrCache=${_cache.ocrCacheMb || "off"}MB, ocrMode=${_cache.ocrMode}, ` +
+      `ocrTileAutoSide=${_cache.ocrTileAutoSide || "off"}, ` +
+      `ocrThreads=${_cache.pythonSingleThread ? 1 : _cache.ocrThreads || "auto"}, ocrAutotune=${_cache.ocrAutotune})`
   );
   return _cache;
 }
@@ -170,11 +273,29 @@ export function getPythonThreadLimitEnv() {
   };
 }
 
-/** Merge into Python spawn env to select the rembg model and image cap for the current profile. */
+/**
+ * Merge into Python spawn env to select the rembg model, image cap, model idle unload,
+ * cutout worker limits, CPU pool size, cutout / SAM embedding cache sizes and OCR worker pool, modes,
+ * tiling and threads for the current profile.
+ */
 export function getPythonModelEnv() {
   const rp = getResourceProfile();
   return {
     UFM_REMBG_MODEL: rp.rembgModel,
     UFM_CUTOUT_MAX_EDGE_PX: String(rp.cutoutMaxEdgePx),
+    UFM_MODEL_IDLE_UNLOAD_S: String(rp.modelIdleUnloadS),
+    UFM_CUTOUT_WORKERS: String(rp.cutoutWorkers),
+    UFM_CUTOUT_WORKER_RSS_MB: String(rp.cutoutWorkerRssMb),
+    UFM_CPU_POOL_WORKERS: String(rp.cpuPoolWorkers),
+    UFM_CUTOUT_CACHE_MB: String(rp.cutoutCacheMb),
+    UFM_SAM_EMBED_CACHE_MB: String(rp.samEmbedCacheMb),
+    UFM_OCR_WORKERS: String(rp.ocrWorkers),
+    UFM_OCR_WORKER_RSS_MB: String(rp.ocrWorkerRssMb),
+    UFM_OCR_CACHE_MB: String(rp.ocrCacheMb),
+    UFM_OCR_MODE: rp.ocrMode,
+    UFM_OCR_TILE_AUTO_SIDE: String(rp.ocrTileAutoSide),
+    // Single-thread profiles pin OCR too (ocr_engine used to hard-code this for everyone).
+    UFM_OCR_THREADS: String(rp.pythonSingleThread ? 1 : rp.ocrThreads),
+    UFM_OCR_AUTOTUNE: rp.ocrAutotune ? "1" : "0",
   };
 }